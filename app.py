@@ -2,20 +2,42 @@
 Main Flask application for EV route simulation and charger planning
 """
 # Standard library imports
+import atexit
+import contextvars
+import json
 import logging
-from typing import Dict, List, Tuple, Any, Optional
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Tuple, Any, Optional, Union
 
 # Third-party imports
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template
 
 # Local module imports
 from services.map.generateMap import create_map
+from services.route.alternativeRoutes import plan_route_alternatives
 from services.route.getRoadRoute import get_road_route, get_road_route_with_waypoints
-from services.route.haversine import haversine
-from services.chargers.getChargingStations import get_charging_stations
+from services.route.geometryStore import GeometryStore
+from services.route.longHaul import plan_long_haul
+from services.route.multiStopPlanner import plan_multi_stop_trip
+from services.route.planningBudget import PlanningBudget, budget_scope, current_budget
+from services.route.parameterSweep import run_parameter_sweep
+from services.route.planContext import PlanContext, create_context, get_context
+from services.route.reachableRange import calculate_reachable_range
+from services.route.routeGeometry import Route
+from services.route.warmStart import remember_plan, vehicle_class, warm_start_plan
+from services.chargers.candidatePruning import branch_and_bound, lower_bound_road_km, min_charge_time
+from services.chargers.getChargingStations import API_KEY, get_charging_stations
 from services.chargers.findChargingStations import find_charging_stop, plan_multiple_charging_stops
+from services.cache.cacheSnapshot import cache_sizes, load_snapshot, save_snapshot
+from services.cache.staleWhileRevalidate import data_age_scope
+from services.fleet.fleetSimulation import simulate_fleet
+from services.profiling.requestProfiler import profiling_authorized, request_profile
+from services.soc.chargingCurve import charge_time_minutes
 from services.soc.simulateSoc import simulate_soc
 from services.time.calculateTotalTime import calculate_total_time
+from services.upstream.rateLimiter import BATCH, priority_scope
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -26,6 +48,17 @@ app = Flask(__name__)
 # Constants
 ENERGY_CONSUMPTION = 0.2  # kWh per km
 AVG_SPEED = 90  # km/h
+AUTO_DEADLINE = 30  # seconds the auto strategy waits for the individual planners
+PLAN_TIME_BUDGET = 60  # seconds a request may spend planning
+PLAN_CALL_BUDGET = 300  # OSRM/OpenChargeMap requests a request may make
+DEFAULT_RANGE_BANDS = [50, 30, 10]  # Arrival SOC (%) bands of the reachable range
+DEFAULT_CONNECTORS = 2  # Connectors per charger in fleet simulations
+CACHE_SNAPSHOT = os.environ.get('CACHE_SNAPSHOT')  # Optional route/charger cache snapshot file
+PROFILE_HEADER = 'X-Profile-Token'  # Header opting a /calculate request into profiling
+
+# Warm the route/charger caches before serving. Under gunicorn with preload_app
+# this runs once in the master and the forked workers share the entries.
+snapshot_entries = load_snapshot(CACHE_SNAPSHOT) if CACHE_SNAPSHOT else {}
 
 @app.route('/')
 def index() -> str:
@@ -37,6 +70,23 @@ def index() -> str:
     """
     return render_template('index.html')
 
+@app.route('/ready')
+def ready() -> Tuple[Dict[str, Any], int]:
+    """
+    Readiness probe for the load balancer
+    
+    The app is ready once imported (caches warmed) if charger data can be fetched.
+    
+    Returns:
+        JSON with cache sizes and snapshot entries loaded; 503 if not ready
+    """
+    is_ready = bool(API_KEY)
+    return {
+        "ready": is_ready,
+        "caches": cache_sizes(),
+        "snapshot_entries": snapshot_entries
+    }, 200 if is_ready else 503
+
 @app.route('/calculate', methods=['POST', 'GET'])
 def calculate_route() -> Dict[str, Any]:
     """
@@ -56,23 +106,351 @@ def calculate_route() -> Dict[str, Any]:
     # Get the routing strategy from request or default to 'standard'
     strategy = data.get('routingStrategy', 'standard')
     
+    # Opt-in profiling of a single request, for trips that are slow in production
+    profile_token = request.headers.get(PROFILE_HEADER)
+    if profile_token is not None and not profiling_authorized(profile_token):
+        return {"error": "Profiling is disabled or the token is invalid"}, 403
+    
     try:
+        # Hard ceiling on planning time and external calls for this request
+        budget = request_budget(data)
+        
         logger.info(f"Calculating route with strategy: {strategy}")
-        if strategy == 'standard':
-            return standard_route_planning(data)
-        elif strategy == 'optimized_waypoints':
-            return optimized_waypoints_routing(data)
-        elif strategy == 'dijkstra':
-            return dijkstra_route_planning(data)
-        elif strategy == 'time_efficient':
-            return time_efficient_route(data)
-        else:
-            return {"error": f"Unknown routing strategy: {strategy}"}, 400
+        with budget_scope(budget), data_age_scope() as data_age, \
+                request_profile(profile_token is not None) as profile:
+            if strategy == 'standard':
+                result = standard_route_planning(data)
+            elif strategy == 'optimized_waypoints':
+                result = optimized_waypoints_routing(data)
+            elif strategy == 'dijkstra':
+                result = dijkstra_route_planning(data)
+            elif strategy == 'time_efficient':
+                result = time_efficient_route(data)
+            elif strategy == 'alternatives':
+                result = alternative_routes_planning(data)
+            elif strategy == 'auto':
+                result = auto_route_planning(data)
+            elif strategy == 'long_haul':
+                result = long_haul_planning(data)
+            elif strategy == 'corridor':
+                result = corridor_route_planning(data)
+            else:
+                return {"error": f"Unknown routing strategy: {strategy}"}, 400
+        
+        # Age of the oldest cached route/charger data the plan is based on
+        if isinstance(result, dict):
+            result["data_age_seconds"] = data_age.max_age
+        # Planners report failures as (error_dict, status) tuples; profile those too
+        if profile is not None:
+            (result[0] if isinstance(result, tuple) else result)["profile"] = profile.breakdown(strategy)
+        return result
     
     except Exception as e:
         logger.error(f"Error calculating route: {str(e)}")
         return {"error": str(e)}, 400
 
+@app.route('/range', methods=['POST'])
+def calculate_range() -> Dict[str, Any]:
+    """
+    Endpoint for the area reachable from a start point, per arrival-SOC band
+    
+    Returns:
+        JSON response with one polygon per SOC band and a map, or error
+    """
+    data = request.get_json()
+    
+    try:
+        start = [float(coord) for coord in data["start"].split(",")]
+        battery_capacity = float(data['battery'])
+        initial_soc = float(data.get('soc', 80))
+        soc_bands = [float(band) for band in data.get('bands', DEFAULT_RANGE_BANDS)]
+        
+        result = calculate_reachable_range(
+            start, initial_soc, battery_capacity, ENERGY_CONSUMPTION, soc_bands,
+            include_charge=bool(data.get('oneCharge', False)),
+            min_kw=data.get('minKw', 50),
+            max_kw=data.get('maxKw', 350),
+            use_road_costs=bool(data.get('roadCosts', False))
+        )
+        
+        from services.map.generateRangeMap import create_range_map
+        result["map_html"] = create_range_map(start, result["bands"], result["chargers"])
+        return result
+    
+    except Exception as e:
+        logger.error(f"Error calculating range: {str(e)}")
+        return {"error": str(e)}, 400
+
+@app.route('/sweep', methods=['POST'])
+def parameter_sweep() -> Dict[str, Any]:
+    """
+    Endpoint evaluating one trip over a grid of battery, SOC and charger power filters
+    
+    Returns:
+        JSON response with a results table (one row per grid cell) or error
+    """
+    data = request.get_json()
+    
+    try:
+        start = data["start"].split(",")
+        end = data["end"].split(",")
+        battery_capacities = [float(battery) for battery in data["batteries"]]
+        initial_socs = [float(soc) for soc in data.get("socs", [80])]
+        kw_filters = [(int(min_kw), int(max_kw)) for min_kw, max_kw in data.get("kwFilters", [[50, 350]])]
+        
+        budget = request_budget(data)
+        with budget_scope(budget), priority_scope(BATCH):
+            result = run_parameter_sweep(start, end, battery_capacities, initial_socs, kw_filters,
+                                         ENERGY_CONSUMPTION, AVG_SPEED)
+        result["external_calls"] = budget.calls
+        return result
+    
+    except Exception as e:
+        logger.error(f"Error running parameter sweep: {str(e)}")
+        return {"error": str(e)}, 400
+
+@app.route('/fleet/simulate', methods=['POST'])
+def fleet_simulation() -> Dict[str, Any]:
+    """
+    Endpoint simulating a fleet of vehicles sharing chargers with finite connectors
+    
+    Returns:
+        JSON response with waiting time, queue and charger utilization statistics, or error
+    """
+    data = request.get_json()
+    
+    try:
+        # Trip templates are fetched as batch traffic, behind interactive plans
+        with priority_scope(BATCH):
+            return simulate_fleet(
+                data["trips"],
+                int(data.get("connectorsPerCharger", DEFAULT_CONNECTORS)),
+                ENERGY_CONSUMPTION,
+                AVG_SPEED,
+                seed=int(data.get("seed", 0))
+            )
+    
+    except Exception as e:
+        logger.error(f"Error simulating fleet: {str(e)}")
+        return {"error": str(e)}, 400
+
+@app.route('/multistop', methods=['POST'])
+def multi_stop_trip() -> Dict[str, Any]:
+    """
+    Endpoint planning a trip through several mandatory stops in the fastest order
+    
+    Returns:
+        JSON response with the visit order, charging stops and map, or error
+    """
+    data = request.get_json()
+    
+    try:
+        start = data["start"].split(",")
+        end = data.get("end", data["start"]).split(",")
+        stops = [stop.split(",") for stop in data["stops"]]
+        
+        budget = request_budget(data)
+        with budget_scope(budget):
+            result = plan_multi_stop_trip(start, end, stops, float(data.get('soc', 80)), float(data['battery']),
+                                          ENERGY_CONSUMPTION, int(data.get('minKw', 50)), int(data.get('maxKw', 350)),
+                                          AVG_SPEED)
+        
+        routes = result.pop("routes")
+        soc_values = result.pop("soc_values")
+        if data.get('map', True):
+            result["map_html"] = create_map(routes, soc_values, result["charging_stops"], start, end, AVG_SPEED)
+        result["external_calls"] = budget.calls
+        return result
+    
+    except Exception as e:
+        logger.error(f"Error planning multi-stop trip: {str(e)}")
+        return {"error": str(e)}, 400
+
+@app.route('/longhaul', methods=['POST'])
+def long_haul_stream() -> Union[Response, Tuple[Dict[str, Any], int]]:
+    """
+    Endpoint streaming a long trip's plan leg by leg
+    
+    The response is newline-delimited JSON: one segment per leg as soon as
+    its charging stops are settled, then a summary. The server never holds
+    the whole trip, so memory stays flat however long it is.
+    
+    Returns:
+        Streaming NDJSON response
+    """
+    data = request.get_json()
+    
+    try:
+        budget = request_budget(data)
+    except Exception as e:
+        logger.error(f"Error streaming long-haul plan: {str(e)}")
+        return {"error": str(e)}, 400
+    
+    def generate():
+        # The generator runs after this view returns, so it opens its own budget scope
+        try:
+            with budget_scope(budget):
+                for item in plan_long_haul(
+                    data["start"].split(","), data["end"].split(","), float(data.get('soc', 80)),
+                    float(data['battery']), ENERGY_CONSUMPTION, int(data.get('minKw', 50)),
+                    int(data.get('maxKw', 350)), AVG_SPEED
+                ):
+                    yield json.dumps(item) + "\n"
+        except Exception as e:
+            logger.error(f"Error streaming long-haul plan: {str(e)}")
+            yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/replan', methods=['POST'])
+def replan() -> Dict[str, Any]:
+    """
+    Endpoint re-planning a trip after vehicle or charger filter changes
+    
+    Every request sends start and end. The first builds a plan context
+    (direct route and all corridor chargers) and returns its planId.
+    Requests that send the planId back re-run only the stop selection on the
+    cached data, without external calls. Contexts are kept by the worker
+    process that built them, so the planId is only a hint: a request served
+    by another worker, or after the context expired, builds it again.
+    The map is rendered only when 'map' is true.
+    
+    Returns:
+        JSON response with the plan and its planId, or error
+    """
+    data = request.get_json()
+    
+    try:
+        start = data["start"].split(",")
+        end = data["end"].split(",")
+        
+        plan_id = data.get('planId')
+        context = get_context(plan_id)
+        if context is None or not context.matches(start, end):
+            plan_id, context = create_context(start, end)
+        
+        return plan_context_response(plan_id, context, data)
+    
+    except Exception as e:
+        logger.error(f"Error re-planning route: {str(e)}")
+        return {"error": str(e)}, 400
+
+def request_budget(data: Dict[str, Any]) -> PlanningBudget:
+    """
+    Planning budget of a request, capped at the server's limits
+    
+    Args:
+        data: Request data with optional timeBudget (seconds) and callBudget
+        
+    Returns:
+        Budget of at most PLAN_TIME_BUDGET seconds and PLAN_CALL_BUDGET calls
+        
+    Raises:
+        ValueError: If a budget is not a number
+    """
+    # The server limit comes first so that NaN compares as not smaller
+    return PlanningBudget(
+        min(PLAN_TIME_BUDGET, float(data.get('timeBudget', PLAN_TIME_BUDGET))),
+        min(PLAN_CALL_BUDGET, int(data.get('callBudget', PLAN_CALL_BUDGET)))
+    )
+
+def plan_context_response(plan_id: str, context: PlanContext, data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Plan charging on a plan context for the request's vehicle and power filter
+    
+    Args:
+        plan_id: Id of the context
+        context: Plan context of the trip
+        data: Request data with battery, optional soc (default 80), minKw/maxKw and map
+        
+    Returns:
+        Dictionary with planId, the plan and the map if requested
+    """
+    battery_capacity = float(data['battery'])
+    initial_soc = float(data.get('soc', 80))
+    plan = context.plan(initial_soc, battery_capacity, ENERGY_CONSUMPTION,
+                        int(data.get('minKw', 50)), int(data.get('maxKw', 350)), AVG_SPEED)
+    
+    result = {
+        "planId": plan_id,
+        "feasible": plan["feasible"],
+        "total_time": plan["total_time"],
+        "charging_stops": plan["charging_stops"],
+        "total_distance": context.route.length_km
+    }
+    if data.get('map'):
+        soc_values = context.soc_profile(plan, initial_soc, battery_capacity, ENERGY_CONSUMPTION)
+        result["map_html"] = create_map([context.route], [soc_values], plan["charging_stops"],
+                                        context.start, context.end, AVG_SPEED)
+    return result
+
+def auto_route_planning(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run all routing strategies concurrently and return the fastest plan
+    
+    The planners share the process-wide route and charger caches, so they
+    mostly wait on the same lookups, and split the request's call budget.
+    Their budgets end at the deadline, so strategies still running then are
+    abandoned and stop at their next budget check.
+    
+    Args:
+        data: Request data containing route parameters, optionally 'deadline' in seconds
+        
+    Returns:
+        Dictionary with route data of the best plan plus per-strategy timings
+    """
+    deadline = float(data.get('deadline', AUTO_DEADLINE))
+    started = time.monotonic()
+    timings = {}
+    
+    budget = current_budget()
+    
+    def run(planner, planner_budget):
+        with budget_scope(planner_budget):
+            result = planner(data)
+        return result, time.monotonic() - started
+    
+    # Each planner gets its own share of the request's budget, ending at the deadline
+    if budget is None:
+        budget = PlanningBudget(deadline, PLAN_CALL_BUDGET)
+    executor = ThreadPoolExecutor(max_workers=len(AUTO_STRATEGIES))
+    futures = {
+        executor.submit(contextvars.copy_context().run, run, planner,
+                        budget.child(len(AUTO_STRATEGIES), deadline)): name
+        for name, planner in AUTO_STRATEGIES.items()
+    }
+    done, _ = wait(futures, timeout=deadline)
+    executor.shutdown(wait=False, cancel_futures=True)
+    
+    best_name, best_result = None, None
+    for future, name in futures.items():
+        if future not in done:
+            timings[name] = {"seconds": deadline, "status": "timeout"}
+            continue
+        
+        result, seconds = future.result()
+        # Planners report failures as (error_dict, status) tuples
+        if isinstance(result, tuple):
+            timings[name] = {"seconds": seconds, "status": "error", "error": result[0].get("error")}
+            continue
+        
+        # Partial plans that do not reach the destination are not plans
+        if result.get("feasible") is False:
+            timings[name] = {"seconds": seconds, "status": "infeasible", "total_time": result["total_time"]}
+            continue
+        
+        timings[name] = {"seconds": seconds, "status": "ok", "total_time": result["total_time"]}
+        # Plans cut short by the budget only win if no complete plan exists
+        rank = (bool(result.get("budget_exhausted")), result["total_time"])
+        if best_result is None or rank < (bool(best_result.get("budget_exhausted")), best_result["total_time"]):
+            best_name, best_result = name, result
+    
+    logger.info(f"Auto routing picked '{best_name}' after {time.monotonic() - started:.1f}s")
+    if best_result is None:
+        return {"error": "No routing strategy found a plan", "strategy_timings": timings}, 400
+    
+    return {**best_result, "strategy": best_name, "strategy_timings": timings}
+
 def optimized_waypoints_routing(data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Calculate route with optimized waypoints using OSRM
@@ -100,7 +478,7 @@ def optimized_waypoints_routing(data: Dict[str, Any]) -> Dict[str, Any]:
             map_html = create_map([direct_route], [soc_values], [], start, end, AVG_SPEED)
             return {
                 "map_html": map_html,
-                "total_time": (len(direct_route) / AVG_SPEED) * 60,  # Estimate time in minutes
+                "total_time": calculate_total_time([direct_route], [], AVG_SPEED),
                 "charging_stops": []
             }
         
@@ -144,10 +522,8 @@ def optimized_waypoints_routing(data: Dict[str, Any]) -> Dict[str, Any]:
             if i < len(charging_stops):
                 current_soc = min(segment_soc[-1] + charging_stops[i]["charge_amount"], 100)
         
-        # Calculate total journey time including driving and charging
-        total_drive_time = full_route_data["duration"]  # Already in minutes
-        total_charge_time = sum(stop["charge_time"] for stop in charging_stops)
-        total_time = total_drive_time + total_charge_time
+        # Calculate total journey time at the average speed, as the other strategies do
+        total_time = calculate_total_time(route_segments, charging_stops, AVG_SPEED)
         
         # Generate map visualization
         map_html = create_map(route_segments, soc_values_segments, charging_stops, start, end, AVG_SPEED)
@@ -182,91 +558,94 @@ def standard_route_planning(data: Dict[str, Any]) -> Dict[str, Any]:
         battery_capacity = float(data['battery'])
         initial_soc = float(data.get('soc', 80))
         
+        geometry = GeometryStore()
+        budget = current_budget()
+        
+        # Trips close to an already solved one reuse its chargers and only
+        # route the first and last legs
+        vehicle = vehicle_class(battery_capacity, initial_soc, min_kw, max_kw)
+        if data.get('warmStart', True):
+            warm_plan = warm_start_plan(start, end, vehicle, initial_soc, battery_capacity,
+                                        ENERGY_CONSUMPTION, geometry)
+            if warm_plan is not None:
+                map_html = create_map(warm_plan["routes"], warm_plan["soc_values"], warm_plan["charging_stops"],
+                                      start, end, AVG_SPEED)
+                return {
+                    "map_html": map_html,
+                    "total_time": calculate_total_time(warm_plan["routes"], warm_plan["charging_stops"], AVG_SPEED),
+                    "charging_stops": warm_plan["charging_stops"],
+                    "feasible": True,
+                    "budget_exhausted": False,
+                    "warm_start": True
+                }
+        
         # Get direct route first
-        direct_route = get_road_route(start, end)
+        direct_route = geometry.get_route(start, end)
         soc_values = simulate_soc(direct_route, initial_soc, battery_capacity, ENERGY_CONSUMPTION)
         
-        # Identify all needed charging stops
-        potential_stops = []
+        # Plan stop by stop, assembling the final segments and SOC arrays as we go
+        routes = []
+        soc_values_full = []
+        charging_stops = []
         temp_route = direct_route
-        temp_soc = initial_soc
         temp_soc_values = soc_values
         
         while True:
+            # Out of budget: keep the stops found so far
+            if budget is not None and budget.exhausted():
+                break
+            
             logger.debug("Finding charging stop")
             charging_stop = find_charging_stop(
                 temp_route, temp_soc_values, battery_capacity, 
-                ENERGY_CONSUMPTION, min_kw, max_kw, AVG_SPEED
+                ENERGY_CONSUMPTION, min_kw, max_kw, AVG_SPEED, budget
             )
             
             if not charging_stop:
                 break
                 
-            potential_stops.append(charging_stop)
-            
-            # Calculate SOC after charging
-            route_to_charger = temp_route[:charging_stop["route_index"] + 1]
-            if len(route_to_charger) > 0:
-                route_to_charger += get_road_route(
-                    temp_route[charging_stop["route_index"]], 
-                    charging_stop["station"]["location"]
-                )
-            else:
-                route_to_charger = get_road_route(
-                    temp_route[0], 
-                    charging_stop["station"]["location"]
-                )
-                
-            temp_soc_to_charger = simulate_soc(route_to_charger, temp_soc, battery_capacity, ENERGY_CONSUMPTION)
-            temp_soc = min(temp_soc_to_charger[-1] + charging_stop["charge_amount"], 100)
-            
-            # Get remaining route from charger to destination
-            route_from_charger = get_road_route(charging_stop["station"]["location"], end)
-            temp_soc_values = simulate_soc(route_from_charger, temp_soc, battery_capacity, ENERGY_CONSUMPTION)
+            charging_stops.append(charging_stop)
+            route_index = charging_stop["route_index"]
             
-            temp_route = route_from_charger
-        
-        # Generate optimized route with all charging stops
-        if potential_stops:
-            # Create waypoints list
-            waypoints = [start]
-            for stop in potential_stops:
-                waypoints.append(stop["station"]["location"])
-            waypoints.append(end)
+            # Leave the current route at the chosen point and drive to the charger.
+            # SOC up to that point is unchanged, so only the approach is simulated.
+            approach = geometry.get_route(temp_route[route_index], charging_stop["station"]["location"])
+            approach_soc = simulate_soc(approach, temp_soc_values[route_index], battery_capacity, ENERGY_CONSUMPTION)
             
-            # Create routes between consecutive waypoints
-            routes = []
-            soc_values_full = []
-            current_soc = initial_soc
+            routes.append(Route.concat([temp_route[:route_index + 1], approach[1:]]))
+            soc_values_full.append(temp_soc_values[:route_index + 1] + approach_soc[1:])
             
-            for i in range(len(waypoints) - 1):
-                segment_route = get_road_route(waypoints[i], waypoints[i+1])
-                segment_soc = simulate_soc(segment_route, current_soc, battery_capacity, ENERGY_CONSUMPTION)
-                
-                routes.append(segment_route)
-                soc_values_full.append(segment_soc)
-                
-                # Update SOC after charging
-                if i < len(potential_stops):
-                    current_soc = min(segment_soc[-1] + potential_stops[i]["charge_amount"], 100)
-            
-            charging_stops = potential_stops
-        else:
-            # No charging stops needed
-            routes = [direct_route]
-            soc_values_full = [soc_values]
-            charging_stops = []
+            # Charge, then continue on the remaining route from charger to destination
+            temp_soc = min(approach_soc[-1] + charging_stop["charge_amount"], 100)
+            temp_route = geometry.get_route(charging_stop["station"]["location"], end)
+            temp_soc_values = simulate_soc(temp_route, temp_soc, battery_capacity, ENERGY_CONSUMPTION)
+        
+        # Final leg to the destination is the last remaining route
+        routes.append(temp_route)
+        soc_values_full.append(temp_soc_values)
         
         # Calculate total journey time
         total_time = calculate_total_time(routes, charging_stops, AVG_SPEED)
         
+        # A plan that does not reach the destination with the 10% safety buffer
+        # (no station found, or cut short by the budget) is returned as a partial plan
+        budget_exhausted = budget is not None and budget.cut_short
+        feasible = min(temp_soc_values) > 10
+        
+        # Complete, feasible plans can seed later trips between nearby places
+        if feasible and not budget_exhausted:
+            remember_plan(start, end, vehicle, charging_stops, routes, soc_values_full)
+        
         # Generate map visualization
         map_html = create_map(routes, soc_values_full, charging_stops, start, end, AVG_SPEED)
         
         return {
             "map_html": map_html,
             "total_time": total_time,
-            "charging_stops": charging_stops
+            "charging_stops": charging_stops,
+            "feasible": feasible,
+            "budget_exhausted": budget_exhausted,
+            "warm_start": False
         }
     
     except Exception as e:
@@ -301,7 +680,8 @@ def dijkstra_route_planning(data: Dict[str, Any]) -> Dict[str, Any]:
             energy_consumption=ENERGY_CONSUMPTION,
             min_kw=min_kw,
             max_kw=max_kw,
-            avg_speed=AVG_SPEED
+            avg_speed=AVG_SPEED,
+            budget=current_budget()
         )
         
         # Find the optimal route
@@ -323,13 +703,51 @@ def dijkstra_route_planning(data: Dict[str, Any]) -> Dict[str, Any]:
         return {
             "map_html": map_html,
             "total_time": total_time,
-            "charging_stops": charging_stops
+            "charging_stops": charging_stops,
+            "budget_exhausted": result.get("budget_exhausted", False)
         }
         
     except Exception as e:
         logger.error(f"Error in Dijkstra route planning: {str(e)}")
         return {"error": str(e)}, 400
 
+def alternative_routes_planning(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Plan charging on each OSRM alternative route in parallel and keep the fastest trip
+    
+    Args:
+        data: Request data containing route parameters
+        
+    Returns:
+        Dictionary with route data and a summary of every alternative
+    """
+    try:
+        start = data["start"].split(",")
+        end = data["end"].split(",")
+        min_kw = int(data["minKw"])
+        max_kw = int(data["maxKw"])
+        battery_capacity = float(data['battery'])
+        initial_soc = float(data.get('soc', 80))
+        
+        result = plan_route_alternatives(start, end, initial_soc, battery_capacity, ENERGY_CONSUMPTION,
+                                         min_kw, max_kw, AVG_SPEED)
+        plan = result["plan"]
+        
+        map_html = create_map([result["route"]], [result["soc_values"]], plan["charging_stops"],
+                              start, end, AVG_SPEED)
+        
+        return {
+            "map_html": map_html,
+            "total_time": plan["total_time"],
+            "charging_stops": plan["charging_stops"],
+            "chosen_alternative": result["chosen"],
+            "alternatives": result["alternatives"]
+        }
+        
+    except Exception as e:
+        logger.error(f"Error in alternative route planning: {str(e)}")
+        return {"error": str(e)}, 400
+
 def time_efficient_route(data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Find the most time-efficient route balancing driving and charging times
@@ -348,15 +766,19 @@ def time_efficient_route(data: Dict[str, Any]) -> Dict[str, Any]:
         battery_capacity = float(data['battery'])
         initial_soc = float(data.get('soc', 80))
         
+        # Every road geometry of this request goes through the store so
+        # no origin/destination pair is fetched twice
+        geometry = GeometryStore()
+        budget = current_budget()
+        
         # Get direct route first
-        direct_route = get_road_route(start, end)
+        direct_route = geometry.get_route(start, end)
         soc_values = simulate_soc(direct_route, initial_soc, battery_capacity, ENERGY_CONSUMPTION)
         
         # If we can make it without charging, return the direct route
         if min(soc_values) > 10:  # 10% safety buffer
             map_html = create_map([direct_route], [soc_values], [], start, end, AVG_SPEED)
-            total_distance = sum(haversine(direct_route[i], direct_route[i+1]) for i in range(len(direct_route)-1))
-            total_time = (total_distance / AVG_SPEED) * 60  # Minutes
+            total_time = (direct_route.length_km / AVG_SPEED) * 60  # Minutes
             
             return {
                 "map_html": map_html,
@@ -370,101 +792,121 @@ def time_efficient_route(data: Dict[str, Any]) -> Dict[str, Any]:
         # Sample points along the route at regular intervals
         sample_interval = max(1, len(direct_route) // 10)  # Sample ~10 points along the route
         for i in range(0, len(direct_route), sample_interval):
+            # Out of budget: evaluate the candidates collected so far
+            if budget is not None and budget.exhausted():
+                break
+            
             point = direct_route[i]
             soc = soc_values[i]
             
             # If SOC is getting low, search for stations
             if soc < 40:  # Start looking when SOC drops below 40%
                 stations = get_charging_stations(point[0], point[1], 15, min_kw, max_kw)
-                
-                for station in stations:
-                    # Calculate detour impact
-                    detour_to_station = get_road_route(point, station["location"])
-                    detour_distance = sum(haversine(detour_to_station[j], detour_to_station[j+1]) 
-                                         for j in range(len(detour_to_station)-1))
-                    
-                    # Calculate energy used and remaining SOC at station
-                    energy_used = detour_distance * ENERGY_CONSUMPTION
-                    soc_at_station = soc - (energy_used / battery_capacity) * 100
-                    
-                    # Only consider stations we can reach
-                    if soc_at_station > 10:
-                        # Calculate time metrics
-                        detour_time = (detour_distance / AVG_SPEED) * 60  # Minutes
-                        
-                        # Calculate route from station to destination
-                        route_to_dest = get_road_route(station["location"], end)
-                        dest_distance = sum(haversine(route_to_dest[j], route_to_dest[j+1]) 
-                                           for j in range(len(route_to_dest)-1))
-                        
-                        # Add this station to our potential list
-                        potential_stations.append({
-                            "station": station,
-                            "route_index": i,
-                            "soc_at_arrival": soc_at_station,
-                            "detour_time": detour_time,
-                            "distance_to_dest": dest_distance,
-                            "point_on_route": point
-                        })
-        
-        # Find optimal combination of charging stops
-        best_time = float('inf')
-        best_stops = []
-        best_routes = []
-        best_soc_values = []
+                potential_stations.extend({
+                    "station": station,
+                    "route_index": i,
+                    "soc_at_point": soc,
+                    "point_on_route": point
+                } for station in stations)
+        
+        # Range left after charging to 80% with a 10% safety buffer
+        max_dest_distance = (80 - 10) / 100 * battery_capacity / ENERGY_CONSUMPTION
+        
+        def lower_bound(candidate: Dict[str, Any]) -> Optional[float]:
+            # Straight-line bounds on both legs, without routing either
+            point, location = candidate["point_on_route"], candidate["station"]["location"]
+            detour_distance = lower_bound_road_km(point, location)
+            dest_distance = lower_bound_road_km(location, end)
+            max_soc_at_station = (candidate["soc_at_point"]
+                                  - (detour_distance * ENERGY_CONSUMPTION / battery_capacity) * 100)
+            if max_soc_at_station <= 10 or dest_distance >= max_dest_distance:
+                return None
+            
+            # Charging to 80% is fastest when arriving with the most charge
+            charge_time = min_charge_time(battery_capacity, candidate["station"]["power"],
+                                          10, max_soc_at_station, lambda soc: 80)
+            distance = direct_route.distances[candidate["route_index"]] + detour_distance + dest_distance
+            return (distance / AVG_SPEED) * 60 + charge_time + 5
         
-        # Try various combinations of 0-3 stops
-        # For simplicity, we'll just try each station individually first
-        for station in potential_stations:
-            # Calculate SOC needs
-            soc_at_station = station["soc_at_arrival"]
+        def evaluate(candidate: Dict[str, Any]) -> Optional[Tuple[float, Dict[str, Any]]]:
+            # Calculate detour impact
+            point, station = candidate["point_on_route"], candidate["station"]
+            station_detour = geometry.get_route(point, station["location"])
+            detour_distance = station_detour.length_km
+            
+            # Calculate energy used and remaining SOC at station
+            energy_used = detour_distance * ENERGY_CONSUMPTION
+            soc_at_station = candidate["soc_at_point"] - (energy_used / battery_capacity) * 100
+            
+            # Only consider stations we can reach
+            if soc_at_station <= 10:
+                return None
             
             # Calculate route from station to destination
-            route_to_dest = get_road_route(station["station"]["location"], end)
+            route_to_dest = geometry.get_route(station["location"], end)
             dest_soc_values = simulate_soc(route_to_dest, 80, battery_capacity, ENERGY_CONSUMPTION)
             
             # Check if this single stop is sufficient
-            if min(dest_soc_values) > 10:
-                # Calculate charging amount and time
-                charge_amount = 80 - soc_at_station
-                energy_to_add = (charge_amount / 100) * battery_capacity
-                charge_time = (energy_to_add / station["station"]["power"]) * 60  # Minutes
-                
-                # Calculate total route time
-                route_to_station = get_road_route(start, station["point_on_route"])
-                station_detour = get_road_route(station["point_on_route"], station["station"]["location"])
-                
-                segment1 = route_to_station + station_detour[1:]  # Avoid duplicate point
-                segment1_soc = simulate_soc(segment1, initial_soc, battery_capacity, ENERGY_CONSUMPTION)
-                
-                total_time = (
-                    calculate_total_time([segment1, route_to_dest], 
-                                        [{
-                                            "station": station["station"],
-                                            "charge_time": charge_time,
-                                            "charge_amount": charge_amount
-                                        }], 
-                                        AVG_SPEED)
-                )
-                
-                if total_time < best_time:
-                    best_time = total_time
-                    best_stops = [{
-                        "station": station["station"],
-                        "charge_time": charge_time,
-                        "charge_amount": charge_amount,
-                        "route_index": station["route_index"]
-                    }]
-                    best_routes = [segment1, route_to_dest]
-                    best_soc_values = [segment1_soc, dest_soc_values]
+            if min(dest_soc_values) <= 10:
+                return None
+            
+            # Calculate charging amount and time
+            charge_amount = 80 - soc_at_station
+            charge_time = charge_time_minutes(battery_capacity, station["power"], soc_at_station, 80)
+            
+            # Calculate total route time; the point lies on the direct route so
+            # the way there is a slice of it rather than a new OSRM request
+            route_to_station = geometry.prefix(direct_route, candidate["route_index"])
+            
+            segment1 = Route.concat([route_to_station, station_detour[1:]])  # Avoid duplicate point
+            segment1_soc = simulate_soc(segment1, initial_soc, battery_capacity, ENERGY_CONSUMPTION)
+            
+            total_time = (
+                calculate_total_time([segment1, route_to_dest], 
+                                    [{
+                                        "station": station,
+                                        "charge_time": charge_time,
+                                        "charge_amount": charge_amount
+                                    }], 
+                                    AVG_SPEED)
+            )
+            return total_time, {
+                "stop": {
+                    "station": station,
+                    "charge_time": charge_time,
+                    "charge_amount": charge_amount,
+                    "route_index": candidate["route_index"]
+                },
+                "routes": [segment1, route_to_dest],
+                "soc_values": [segment1_soc, dest_soc_values],
+                "total_time": total_time
+            }
+        
+        # Try each station as a single stop, routing only those whose lower
+        # bound could still beat the best stop found so far
+        best_time = float('inf')
+        best_stops = []
+        best_routes = []
+        best_soc_values = []
+        
+        best = branch_and_bound(potential_stations, lower_bound, evaluate,
+                                should_stop=budget.exhausted if budget is not None else None)
+        if best is not None:
+            best_plan = best[1]
+            best_time = best_plan["total_time"]
+            best_stops = [best_plan["stop"]]
+            best_routes = best_plan["routes"]
+            best_soc_values = best_plan["soc_values"]
         
         # If we found a good single-stop solution, use it
         if best_stops:
+            logger.info(f"Time-efficient route used {geometry.fetch_count} OSRM requests")
             map_html = create_map(best_routes, best_soc_values, best_stops, start, end, AVG_SPEED)
             return {
                 "map_html": map_html,
                 "total_time": best_time,
-                "charging_stops": best_stops
+                "charging_stops": best_stops,
+                "budget_exhausted": budget is not None and budget.cut_short
             }
         
         # If no single stop works, use the multi-stop planning algorithm
@@ -488,7 +930,7 @@ def time_efficient_route(data: Dict[str, Any]) -> Dict[str, Any]:
         current_soc = initial_soc
         
         for i in range(len(waypoints) - 1):
-            segment = get_road_route(waypoints[i], waypoints[i+1])
+            segment = geometry.get_route(waypoints[i], waypoints[i+1])
             segment_soc = simulate_soc(segment, current_soc, battery_capacity, ENERGY_CONSUMPTION)
             
             routes.append(segment)
@@ -507,7 +949,8 @@ def time_efficient_route(data: Dict[str, Any]) -> Dict[str, Any]:
         return {
             "map_html": map_html,
             "total_time": total_time,
-            "charging_stops": charging_stops
+            "charging_stops": charging_stops,
+            "budget_exhausted": budget is not None and budget.cut_short
         }
         
     except Exception as e:
@@ -515,5 +958,92 @@ def time_efficient_route(data: Dict[str, Any]) -> Dict[str, Any]:
         return {"error": str(e)}, 400
 
 
+def long_haul_planning(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Plan a long trip leg by leg, rendering the map from simplified geometry
+    
+    Args:
+        data: Request data containing route parameters
+        
+    Returns:
+        Dictionary with route data
+    """
+    try:
+        start = data["start"].split(",")
+        end = data["end"].split(",")
+        
+        routes = []
+        soc_values = []
+        charging_stops = []
+        summary = None
+        for item in plan_long_haul(start, end, float(data.get('soc', 80)), float(data['battery']),
+                                   ENERGY_CONSUMPTION, int(data.get('minKw', 50)), int(data.get('maxKw', 350)),
+                                   AVG_SPEED):
+            if item["type"] == "summary":
+                summary = item
+                continue
+            routes.append(item["points"])
+            soc_values.append(item["soc"])
+            charging_stops.extend(item["charging_stops"])
+        
+        if summary is None:
+            raise Exception("Long-haul planning ended without a trip summary")
+        if not summary["feasible"] and not summary["budget_exhausted"]:
+            raise Exception("Could not find suitable charging stops for this journey")
+        
+        map_html = create_map(routes, soc_values, charging_stops, start, end, AVG_SPEED)
+        return {
+            "map_html": map_html,
+            "total_time": summary["total_time"],
+            "charging_stops": charging_stops,
+            "total_distance": summary["total_distance"],
+            "budget_exhausted": summary["budget_exhausted"]
+        }
+    
+    except Exception as e:
+        logger.error(f"Error in long-haul planning: {str(e)}")
+        return {"error": str(e)}, 400
+
+def corridor_route_planning(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Choose the fastest stops among the chargers along the direct route
+    
+    Only the direct route and its corridor chargers are fetched; the stops
+    are selected locally by dynamic programming. The plan context is kept,
+    so /replan accepts the returned planId.
+    
+    Args:
+        data: Request data containing route parameters
+        
+    Returns:
+        Dictionary with route data
+    """
+    try:
+        start = data["start"].split(",")
+        end = data["end"].split(",")
+        
+        plan_id, context = create_context(start, end)
+        result = plan_context_response(plan_id, context, {**data, 'map': True})
+        if not result["feasible"]:
+            raise Exception("Could not find suitable charging stops for this journey")
+        return result
+    
+    except Exception as e:
+        logger.error(f"Error in corridor route planning: {str(e)}")
+        return {"error": str(e)}, 400
+
+# Strategies raced by the auto mode
+AUTO_STRATEGIES = {
+    'standard': standard_route_planning,
+    'optimized_waypoints': optimized_waypoints_routing,
+    'dijkstra': dijkstra_route_planning,
+    'time_efficient': time_efficient_route,
+    'alternatives': alternative_routes_planning,
+    'corridor': corridor_route_planning,
+}
+
+
 if __name__ == '__main__':
+    if CACHE_SNAPSHOT:
+        atexit.register(save_snapshot, CACHE_SNAPSHOT)
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""
+ASGI entry point for EV route planning
+
+POST /plan is served natively on the event loop: route and charger fetches
+await the shared async HTTP client, so one process keeps many plans in
+flight while they wait on OSRM and OpenChargeMap. It takes the /replan
+request format and returns a planId that /replan accepts as well.
+Every other route is the Flask app, run on a thread pool of WSGI_THREADS.
+
+Run with:
+    uvicorn asgi:app --port 10000
+"""
+# Standard library imports
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Dict, Tuple
+
+# Third-party imports
+from a2wsgi import WSGIMiddleware
+
+# Local module imports
+from app import app as flask_app, plan_context_response, request_budget
+from services.cache.staleWhileRevalidate import data_age_scope
+from services.route.planContext import create_context_async, get_context
+from services.route.planningBudget import budget_scope
+from services.upstream.asyncClient import close_async_client
+
+logger = logging.getLogger(__name__)
+
+# Threads serving the Flask routes; each request holds one until it is answered
+WSGI_THREADS = int(os.environ.get('WSGI_THREADS', 10))
+
+_flask = WSGIMiddleware(flask_app, workers=WSGI_THREADS)
+
+
+async def plan(data: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+    """
+    Plan a trip, fetching the route and corridor chargers asynchronously
+
+    Args:
+        data: Request data as for /replan (start, end, battery, optional planId,
+              soc, minKw, maxKw, map, timeBudget and callBudget)
+
+    Returns:
+        Tuple of the response body and HTTP status
+    """
+    try:
+        budget = request_budget(data)
+        with budget_scope(budget), data_age_scope() as data_age:
+            start = data["start"].split(",")
+            end = data["end"].split(",")
+
+            # The planId is only a hint; contexts are kept per worker process
+            plan_id = data.get('planId')
+            context = get_context(plan_id)
+            if context is None or not context.matches(start, end):
+                try:
+                    plan_id, context = await asyncio.wait_for(create_context_async(start, end),
+                                                              budget.max_seconds)
+                except asyncio.TimeoutError:
+                    raise Exception(f"Planning took longer than {budget.max_seconds:.0f}s")
+
+            # Map rendering is CPU-bound and would stall the other plans on the loop
+            if data.get('map'):
+                result = await asyncio.to_thread(plan_context_response, plan_id, context, data)
+            else:
+                result = plan_context_response(plan_id, context, data)
+
+        result["data_age_seconds"] = data_age.max_age
+        return result, 200
+
+    except Exception as e:
+        logger.error(f"Error planning route: {str(e)}")
+        return {"error": str(e)}, 400
+
+
+async def _read_body(receive) -> bytes:
+    """Complete request body of an HTTP scope"""
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def _send_json(send, body: Dict[str, Any], status: int) -> None:
+    """Send a JSON response"""
+    payload = json.dumps(body).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())]
+    })
+    await send({"type": "http.response.body", "body": payload})
+
+
+async def app(scope, receive, send) -> None:
+    """
+    ASGI application
+
+    Args:
+        scope: Connection scope
+        receive: Awaitable returning the next event
+        send: Awaitable sending an event
+    """
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await close_async_client()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    if scope["type"] == "http" and scope["path"] == "/plan":
+        if scope["method"] != "POST":
+            await _send_json(send, {"error": "Method not allowed"}, 405)
+            return
+        try:
+            data = json.loads(await _read_body(receive) or b"{}")
+        except ValueError:
+            await _send_json(send, {"error": "Request body must be JSON"}, 400)
+            return
+        await _send_json(send, *(await plan(data)))
+        return
+
+    await _flask(scope, receive, send)
@@ -0,0 +1,38 @@
+"""
+Gunicorn configuration (picked up automatically by `gunicorn app:app`)
+
+The app is preloaded in the master so imports and the cache snapshot
+(CACHE_SNAPSHOT) are loaded once and shared by the forked workers. Workers
+import the map libraries in the background after start, so the first plan
+is not held up by them, and write the caches back to the snapshot on exit.
+Set GUNICORN_PRELOAD=0 to load the app in each worker instead.
+"""
+# Standard library imports
+import os
+import threading
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = 120
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+
+def _import_map_modules():
+    import folium  # noqa: F401
+    import matplotlib.colors  # noqa: F401
+
+
+def post_worker_init(worker):
+    threading.Thread(target=_import_map_modules, name="map-import", daemon=True).start()
+
+
+def worker_exit(server, worker):
+    from app import CACHE_SNAPSHOT
+    from services.cache.cacheSnapshot import save_snapshot
+
+    if CACHE_SNAPSHOT:
+        try:
+            save_snapshot(CACHE_SNAPSHOT)
+        except Exception as e:
+            server.log.warning(f"Could not save cache snapshot: {str(e)}")
@@ -0,0 +1,115 @@
+# Standard library imports
+import logging
+import os
+import pickle
+import tempfile
+import time
+from typing import Dict
+
+# Local module imports
+from services.cache.ttlCache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+# Process-wide caches included in snapshots, by name
+_caches: Dict[str, TTLCache] = {}
+
+
+def register_cache(name: str, cache: TTLCache) -> TTLCache:
+    """
+    Include a cache in snapshots
+
+    Args:
+        name: Stable name of the cache in the snapshot file
+        cache: Cache to include
+
+    Returns:
+        The cache, so it can be registered where it is created
+    """
+    _caches[name] = cache
+    return cache
+
+
+def cache_sizes() -> Dict[str, int]:
+    """
+    Number of entries in each registered cache
+
+    Returns:
+        Entry count per cache name
+    """
+    return {name: len(cache) for name, cache in _caches.items()}
+
+
+def save_snapshot(path: str) -> Dict[str, int]:
+    """
+    Write all registered caches to a snapshot file
+
+    The file is written to a temporary name and renamed, so concurrent
+    writers (one per worker) never leave a truncated snapshot.
+
+    Args:
+        path: Snapshot file path
+
+    Returns:
+        Number of entries saved per cache
+    """
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "saved_at": time.time(),
+        "caches": {name: cache.export() for name, cache in _caches.items()}
+    }
+
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temp_path = tempfile.mkstemp(dir=directory, prefix=".cache-snapshot-")
+    try:
+        with os.fdopen(handle, "wb") as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+    except Exception:
+        os.unlink(temp_path)
+        raise
+
+    counts = {name: len(entries) for name, entries in snapshot["caches"].items()}
+    logger.info(f"Saved cache snapshot to {path}: {counts}")
+    return counts
+
+
+def load_snapshot(path: str) -> Dict[str, int]:
+    """
+    Warm the registered caches from a snapshot file
+
+    Entries keep the age they had when saved plus the time since, so stale
+    data is refreshed as usual. The file is unpickled and must therefore
+    come from a trusted location (it is written by save_snapshot only).
+
+    Args:
+        path: Snapshot file path
+
+    Returns:
+        Number of entries restored per cache; empty if there is no usable snapshot
+    """
+    if not os.path.exists(path):
+        logger.info(f"No cache snapshot at {path}")
+        return {}
+
+    try:
+        with open(path, "rb") as f:
+            snapshot = pickle.load(f)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable cache snapshot {path}: {str(e)}")
+        return {}
+
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        logger.warning(f"Ignoring cache snapshot {path} with version {snapshot.get('version')}")
+        return {}
+
+    elapsed = max(time.time() - snapshot["saved_at"], 0)
+    counts = {}
+    for name, entries in snapshot["caches"].items():
+        if name in _caches:
+            counts[name] = _caches[name].restore(entries, extra_age=elapsed)
+
+    logger.info(f"Loaded cache snapshot from {path} ({elapsed:.0f} s old): {counts}")
+    return counts
@@ -0,0 +1,112 @@
+# Standard library imports
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class _Flight:
+    """One in-flight call and its outcome"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one
+
+    The first caller for a key runs the function; callers arriving while it
+    runs wait and receive the same value (or exception). Nothing is kept
+    once the call finishes, so this complements a cache rather than being one.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn for key unless an identical call is already running
+
+        Args:
+            key: Identity of the call
+            fn: Callable doing the actual work
+
+        Returns:
+            Result of fn, from this call or the one already in flight
+
+        Raises:
+            Exception: Whatever fn raised
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = fn()
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutines running on one event loop
+
+    Waiting callers await the leader's future instead of blocking a thread.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await fn() for key unless an identical call is already in flight
+
+        Args:
+            key: Identity of the call
+            fn: Coroutine function doing the actual work
+
+        Returns:
+            Result of fn, from this call or the one already in flight
+
+        Raises:
+            Exception: Whatever fn raised
+        """
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            # Shielded so a cancelled waiter does not cancel the leader's result
+            return await asyncio.shield(flight)
+
+        flight = self._flights[key] = asyncio.get_running_loop().create_future()
+        try:
+            value = await fn()
+            flight.set_result(value)
+            return value
+        except BaseException as e:
+            flight.set_exception(e)
+            # Mark retrieved so a flight without waiters does not log a warning
+            flight.exception()
+            raise
+        finally:
+            del self._flights[key]
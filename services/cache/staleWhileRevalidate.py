@@ -0,0 +1,182 @@
+# Standard library imports
+import contextvars
+import heapq
+import itertools
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Hashable, Iterator, Optional
+
+# Local module imports
+from services.cache.singleFlight import AsyncSingleFlight, SingleFlight
+from services.cache.ttlCache import TTLCache
+from services.upstream.rateLimiter import BATCH, priority_scope
+
+logger = logging.getLogger(__name__)
+
+# Pending refreshes beyond this are dropped; the entry is refreshed on a later read
+MAX_PENDING_REFRESHES = 64
+
+
+class DataAge:
+    """Oldest cached upstream data used while planning a request"""
+
+    def __init__(self):
+        self.max_age = 0.0
+        self.stale_hits = 0
+
+    def record(self, age: float, stale: bool) -> None:
+        self.max_age = max(self.max_age, age)
+        if stale:
+            self.stale_hits += 1
+
+
+_data_age: contextvars.ContextVar[Optional[DataAge]] = contextvars.ContextVar("data_age", default=None)
+
+
+@contextmanager
+def data_age_scope() -> Iterator[DataAge]:
+    """
+    Track the age of cached data used by the enclosed planning code
+
+    Yields:
+        DataAge collecting the oldest entry served
+    """
+    token = _data_age.set(DataAge())
+    try:
+        yield _data_age.get()
+    finally:
+        _data_age.reset(token)
+
+
+class BackgroundRefresher:
+    """
+    Bounded single-worker queue refreshing stale cache entries
+
+    Refreshes run in order of how often the entry was read, so hot
+    corridors are refreshed first. Duplicate requests for a key that is
+    already queued are ignored.
+    """
+
+    def __init__(self, max_pending: int = MAX_PENDING_REFRESHES):
+        self.max_pending = max_pending
+        self._queue = []
+        self._pending = set()
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+
+    def schedule(self, key: Hashable, refresh: Callable[[], None], priority: int) -> bool:
+        """
+        Queue a refresh unless it is already queued or the queue is full
+
+        Args:
+            key: Cache key being refreshed
+            refresh: Callable fetching and storing the fresh value
+            priority: Access count of the entry (higher runs first)
+
+        Returns:
+            True if the refresh was queued
+        """
+        with self._condition:
+            if key in self._pending or len(self._pending) >= self.max_pending:
+                return False
+            self._pending.add(key)
+            heapq.heappush(self._queue, (-priority, next(self._counter), key, refresh))
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="cache-refresher", daemon=True)
+                self._worker.start()
+            self._condition.notify()
+            return True
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+                _, _, key, refresh = heapq.heappop(self._queue)
+            try:
+                # Refreshes yield to interactive requests at the rate limiters
+                with priority_scope(BATCH):
+                    refresh()
+            except Exception as e:
+                logger.warning(f"Background refresh of {key} failed: {str(e)}")
+            finally:
+                with self._condition:
+                    self._pending.discard(key)
+
+
+refresher = BackgroundRefresher()
+
+# Concurrent misses on the same cache key share one upstream fetch
+flights = SingleFlight()
+async_flights = AsyncSingleFlight()
+
+
+def cached_fetch(cache: TTLCache, key: Hashable, fetch: Callable[[], Any]) -> Any:
+    """
+    Get a value through a cache, serving stale entries while they are refreshed
+
+    Fresh entries are returned as is. Expired entries within the cache's
+    grace period are returned immediately and refreshed in the background.
+    Anything older is fetched synchronously, once for all concurrent callers.
+
+    Args:
+        cache: Cache holding the values
+        key: Cache key
+        fetch: Callable fetching the value from upstream
+
+    Returns:
+        Cached or freshly fetched value
+    """
+    entry = cache.get_entry(key)
+    tracker = _data_age.get()
+
+    if entry is not None:
+        if tracker is not None:
+            tracker.record(entry.age, entry.stale)
+        if entry.stale:
+            refresher.schedule(key, lambda: cache.set(key, fetch()), entry.hits)
+        return entry.value
+
+    def fetch_and_store():
+        value = fetch()
+        cache.set(key, value)
+        return value
+
+    return flights.do((id(cache), key), fetch_and_store)
+
+
+async def cached_fetch_async(cache: TTLCache, key: Hashable, fetch: Callable[[], Awaitable[Any]],
+                             refresh: Callable[[], Any]) -> Any:
+    """
+    Async cached_fetch: same cache and staleness rules, but misses are awaited
+
+    Stale entries are still refreshed by the background refresher thread,
+    which needs the blocking fetch.
+
+    Args:
+        cache: Cache holding the values
+        key: Cache key
+        fetch: Coroutine function fetching the value from upstream
+        refresh: Blocking function fetching the value, for background refreshes
+
+    Returns:
+        Cached or freshly fetched value
+    """
+    entry = cache.get_entry(key)
+    tracker = _data_age.get()
+
+    if entry is not None:
+        if tracker is not None:
+            tracker.record(entry.age, entry.stale)
+        if entry.stale:
+            refresher.schedule(key, lambda: cache.set(key, refresh()), entry.hits)
+        return entry.value
+
+    async def fetch_and_store():
+        value = await fetch()
+        cache.set(key, value)
+        return value
+
+    return await async_flights.do((id(cache), key), fetch_and_store)
@@ -0,0 +1,143 @@
+# Standard library imports
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, List, NamedTuple, Optional, Tuple
+
+
+class CacheEntry(NamedTuple):
+    """Cached value with its age and how often it was read"""
+    value: Any
+    age: float
+    stale: bool
+    hits: int
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after a fixed time-to-live
+
+    Shared by all requests (and all strategies of a request) in the process,
+    so repeated route and charger lookups are served from memory. Expired
+    entries are kept for a further stale_ttl seconds so they can be served
+    while a background refresh replaces them.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, stale_ttl: float = 0):
+        """
+        Initialize the cache
+
+        Args:
+            maxsize: Maximum number of entries kept
+            ttl: Time-to-live of an entry in seconds
+            stale_ttl: Grace period after expiry during which an entry may still be served
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[Hashable, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_entry(self, key: Hashable) -> Optional[CacheEntry]:
+        """
+        Get a cached entry, fresh or within the stale grace period
+
+        Args:
+            key: Cache key
+
+        Returns:
+            CacheEntry, or None if missing or past the grace period
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored_at, hits = entry
+            age = time.monotonic() - stored_at
+            if age > self.ttl + self.stale_ttl:
+                del self._entries[key]
+                return None
+            entry[2] = hits + 1
+            self._entries.move_to_end(key)
+            return CacheEntry(value, age, age > self.ttl, hits + 1)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Get a fresh cached value
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value, or None if missing or expired
+        """
+        entry = self.get_entry(key)
+        if entry is None or entry.stale:
+            return None
+        return entry.value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Store a value, evicting the least recently used entry if full
+
+        Args:
+            key: Cache key
+            value: Value to store
+        """
+        with self._lock:
+            # Keep the access count so refresh priority survives a refresh
+            hits = self._entries[key][2] if key in self._entries else 0
+            self._entries[key] = [value, time.monotonic(), hits]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def export(self) -> List[Tuple[Hashable, Any, float, int]]:
+        """
+        Copy out all entries still within the grace period, least recently used first
+
+        Returns:
+            List of (key, value, age in seconds, hits) tuples
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (key, value, now - stored_at, hits)
+                for key, (value, stored_at, hits) in self._entries.items()
+                if now - stored_at <= self.ttl + self.stale_ttl
+            ]
+
+    def restore(self, entries: List[Tuple[Hashable, Any, float, int]], extra_age: float = 0) -> int:
+        """
+        Load exported entries, keeping their age so they expire as if never unloaded
+
+        Entries already in the cache are left alone, as they are newer.
+
+        Args:
+            entries: Entries from export(), least recently used first
+            extra_age: Seconds to add to every entry's age (time spent outside the cache)
+
+        Returns:
+            Number of entries restored
+        """
+        now = time.monotonic()
+        restored = 0
+        with self._lock:
+            for key, value, age, hits in entries:
+                age += extra_age
+                if key in self._entries or age > self.ttl + self.stale_ttl:
+                    continue
+                self._entries[key] = [value, now - age, hits]
+                self._entries.move_to_end(key)
+                restored += 1
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return restored
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
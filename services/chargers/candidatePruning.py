@@ -0,0 +1,110 @@
+# Standard library imports
+import logging
+from typing import Any, Callable, Iterable, Optional, Sequence, Tuple
+
+# Local module imports
+from services.route.haversine import haversine
+from services.soc.chargingCurve import SOC_STEP, get_charging_curve
+
+logger = logging.getLogger(__name__)
+
+
+def lower_bound_road_km(start: Sequence[float], end: Sequence[float]) -> float:
+    """
+    Lower bound on the road distance between two points, without routing
+
+    The great-circle distance: road routes from get_road_route include the
+    way from each requested point to where OSRM snapped it, so they are never
+    shorter. It does not depend on earlier requests, so the same trip always
+    prunes the same candidates.
+
+    Args:
+        start: Start coordinates [lat, lon]
+        end: End coordinates [lat, lon]
+
+    Returns:
+        Distance in km
+    """
+    # Coordinates may still be strings from the request
+    return haversine([float(start[0]), float(start[1])], [float(end[0]), float(end[1])])
+
+
+def min_charge_time(battery_capacity: float, power: float, min_arrival: float, max_arrival: float,
+                    departure: Callable[[float], float], breakpoints: Iterable[float] = ()) -> float:
+    """
+    Smallest charge time over a range of arrival SOCs
+
+    Charge time is piecewise linear between the charging curve's SOC steps,
+    so with a departure SOC that is piecewise linear in the arrival SOC
+    (kinks at 'breakpoints') the minimum lies on a step, a kink or an end
+    of the range, and evaluating those is exact.
+
+    Args:
+        battery_capacity: Battery capacity in kWh
+        power: Charger power in kW
+        min_arrival: Lowest possible arrival SOC
+        max_arrival: Highest possible arrival SOC
+        departure: Departure SOC for an arrival SOC
+        breakpoints: Arrival SOCs where 'departure' changes slope
+
+    Returns:
+        Charge time in minutes
+    """
+    if max_arrival < min_arrival:
+        return 0.0
+    curve = get_charging_curve(battery_capacity, power)
+    first_step = int(min_arrival / SOC_STEP) + 1
+    last_step = int(max_arrival / SOC_STEP)
+    arrivals = [min_arrival, max_arrival] + [step * SOC_STEP for step in range(first_step, last_step + 1)]
+    arrivals += [soc for soc in breakpoints if min_arrival <= soc <= max_arrival]
+    return min(curve.charge_time(soc, departure(soc)) for soc in arrivals)
+
+
+def branch_and_bound(candidates: Sequence[Any], lower_bound: Callable[[Any], Optional[float]],
+                     evaluate: Callable[[Any], Optional[Tuple[float, Any]]],
+                     max_evaluated: Optional[int] = None,
+                     should_stop: Optional[Callable[[], bool]] = None) -> Optional[Tuple[int, Any]]:
+    """
+    Find the lowest-scoring candidate while evaluating as few as possible
+
+    Candidates are evaluated in order of their lower bound; once the best
+    score found is below the next bound, no remaining candidate can win.
+    Ties go to the earlier candidate, as a linear scan with min() would.
+
+    Args:
+        candidates: Candidates in their original order
+        lower_bound: Cheap admissible bound on a candidate's score, or None if
+                     the candidate is certainly infeasible
+        evaluate: Expensive exact (score, value) of a candidate, or None if infeasible
+        max_evaluated: Evaluate at most this many candidates (best bounds first);
+                       None keeps the result exact
+        should_stop: Checked before every evaluation (e.g. budget exhausted)
+
+    Returns:
+        Tuple of (index of the best candidate, its value), or None if no candidate is feasible
+    """
+    bounds = []
+    for index, candidate in enumerate(candidates):
+        bound = lower_bound(candidate)
+        if bound is not None:
+            bounds.append((bound, index))
+    bounds.sort()
+
+    best = None  # (score, index, value)
+    evaluated = 0
+    for bound, index in bounds:
+        if best is not None and bound > best[0]:
+            break
+        if (max_evaluated is not None and evaluated >= max_evaluated) or (should_stop is not None and should_stop()):
+            break
+        evaluated += 1
+        result = evaluate(candidates[index])
+        if result is None:
+            continue
+        score, value = result
+        if best is None or (score, index) < (best[0], best[1]):
+            best = (score, index, value)
+
+    logger.debug(f"Branch and bound evaluated {evaluated} of {len(candidates)} candidates "
+                 f"({len(candidates) - len(bounds)} infeasible by bound)")
+    return None if best is None else (best[1], best[2])
@@ -0,0 +1,121 @@
+# Standard library imports
+import logging
+from typing import Dict, List
+
+# Third-party imports
+import numpy as np
+
+# Local module imports
+from services.chargers.getChargingStations import get_all_stations, prefetch_stations, prefetch_stations_async
+from services.route.haversine import pairwise_haversine
+from services.route.routeGeometry import Route, as_route
+
+logger = logging.getLogger(__name__)
+
+CORRIDOR_RADIUS = 15  # km searched on either side of the route
+PROBE_SPACING = 25  # km between probe points along the route
+
+
+def fetch_corridor_chargers(route: Route, radius: float = CORRIDOR_RADIUS) -> List[Dict]:
+    """
+    Fetch every charger near a route and project it onto along-route distance
+
+    Probes go through the tiled charger cache without a power filter, so the
+    result can be filtered locally for any min/max kW.
+
+    Args:
+        route: Route (or list of coordinate points) to search along
+        radius: Corridor half-width in km
+
+    Returns:
+        List of chargers sorted by along-route distance, each with name, location,
+        powers, route_index, along_km (distance from the start to the nearest
+        route point) and offset_km (straight-line distance from that point)
+    """
+    route = as_route(route)
+    probe_indices = _probe_indices(route)
+    prefetch_stations(route.points[probe_indices], radius)
+    return _collect_corridor(route, probe_indices, radius)
+
+
+async def fetch_corridor_chargers_async(route: Route, radius: float = CORRIDOR_RADIUS) -> List[Dict]:
+    """
+    Fetch every charger near a route without blocking the event loop
+
+    Args:
+        route: Route (or list of coordinate points) to search along
+        radius: Corridor half-width in km
+
+    Returns:
+        Chargers along the route, as fetch_corridor_chargers
+    """
+    route = as_route(route)
+    probe_indices = _probe_indices(route)
+    await prefetch_stations_async(route.points[probe_indices], radius)
+    # Every probe is answered from the tile cache now
+    return _collect_corridor(route, probe_indices, radius)
+
+
+def _probe_indices(route: Route) -> np.ndarray:
+    """Route indices of probe points spaced so neighbouring search circles overlap"""
+    distances = route.distances
+    probe_targets = np.arange(0, distances[-1] + PROBE_SPACING, PROBE_SPACING)
+    return np.unique(np.minimum(np.searchsorted(distances, probe_targets), len(route) - 1))
+
+
+def _collect_corridor(route: Route, probe_indices: np.ndarray, radius: float) -> List[Dict]:
+    """Chargers found around the probe points, projected onto the route"""
+    distances = route.distances
+    points = route.points
+
+    stations = {}
+    for index in probe_indices:
+        for _, station in get_all_stations(points[index][0], points[index][1], radius):
+            stations[tuple(station["location"])] = station
+    if not stations:
+        return []
+
+    # Nearest route point of every station, on a ~1 km subsample of the route
+    step = max(1, int(len(points) / max(distances[-1], 1)))
+    sample_indices = np.arange(0, len(points), step)
+    station_list = list(stations.values())
+    locations = np.array([station["location"] for station in station_list], dtype=float)
+    offsets = pairwise_haversine(locations, points[sample_indices])
+    nearest = offsets.argmin(axis=1)
+
+    corridor = []
+    for station, sample, offset in zip(station_list, nearest, offsets[np.arange(len(station_list)), nearest]):
+        if offset > radius:
+            continue
+        route_index = int(sample_indices[sample])
+        corridor.append({
+            **station,
+            "route_index": route_index,
+            "along_km": float(distances[route_index]),
+            "offset_km": float(offset)
+        })
+
+    corridor.sort(key=lambda charger: charger["along_km"])
+    logger.info(f"Found {len(corridor)} chargers along a {distances[-1]:.0f} km corridor")
+    return corridor
+
+
+def filter_by_power(corridor: List[Dict], min_kw: int, max_kw: int) -> List[Dict]:
+    """
+    Keep chargers with a connection inside the power filter
+
+    Args:
+        corridor: Corridor chargers from fetch_corridor_chargers
+        min_kw: Minimum charging power in kW
+        max_kw: Maximum charging power in kW
+
+    Returns:
+        Chargers with 'power' set to the first matching connection
+    """
+    filtered = []
+    for charger in corridor:
+        for power in charger["powers"]:
+            if int(min_kw) <= power <= int(max_kw):
+                filtered.append({**charger, "power": power})
+                break
+    return filtered
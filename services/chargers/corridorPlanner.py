@@ -0,0 +1,224 @@
+# Standard library imports
+import logging
+from typing import Dict, List
+
+# Third-party imports
+import numpy as np
+
+# Local module imports
+from services.soc.chargingCurve import SOC_STEP, charge_time_minutes, get_charging_curve
+
+logger = logging.getLogger(__name__)
+
+RESERVE_SOC = 10  # Minimum SOC on arrival at a charger or the destination
+TARGET_SOC = 80  # Charge at most up to this SOC
+STOP_BUFFER = 5  # Minutes per stop for parking and plugging in (as calculate_total_time)
+SOC_BUCKET = 0.5  # SOC resolution (%) of the optimal planner's states
+
+
+def plan_corridor_stops(total_distance: float, corridor: List[Dict], initial_soc: float,
+                        battery_capacity: float, energy_consumption: float, speed: float) -> Dict:
+    """
+    Greedy stop selection over chargers projected onto the route, without external calls
+
+    From the current position the car drives to the furthest charger it can
+    reach with the reserve left, charges just enough to finish (at most to
+    TARGET_SOC) and continues. Detours are the charger offset there and back.
+
+    Args:
+        total_distance: Route length in km
+        corridor: Power-filtered corridor chargers sorted by 'along_km'
+        initial_soc: Initial state of charge as percentage
+        battery_capacity: Battery capacity in kWh
+        energy_consumption: Energy consumption in kWh per km
+        speed: Average speed in km/h
+
+    Returns:
+        Dictionary with 'feasible', 'charging_stops', 'drive_time', 'charge_time' and
+        'total_time' (minutes)
+    """
+    soc_per_km = energy_consumption / battery_capacity * 100
+    position = 0.0
+    soc = initial_soc
+    stops = []
+    detour_distance = 0.0
+    feasible = True
+
+    # Small tolerance so charging to exactly the needed SOC counts as enough
+    while soc - (total_distance - position) * soc_per_km < RESERVE_SOC - 1e-6:
+        best = None
+        for charger in corridor:
+            if charger["along_km"] <= position:
+                continue
+            arrival_soc = soc - (charger["along_km"] - position + charger["offset_km"]) * soc_per_km
+            if arrival_soc < RESERVE_SOC - 1e-6:
+                continue
+            # Furthest reachable charger, higher power on ties
+            if best is None or (charger["along_km"], charger["power"]) > (best[0]["along_km"], best[0]["power"]):
+                best = (charger, arrival_soc)
+
+        if best is None:
+            feasible = False
+            break
+
+        charger, arrival_soc = best
+        # Enough to get back to the route and finish with the reserve, capped at the target
+        needed = RESERVE_SOC + (charger["offset_km"] + total_distance - charger["along_km"]) * soc_per_km
+        departure_soc = max(min(needed, TARGET_SOC), arrival_soc)
+        charge_time = charge_time_minutes(battery_capacity, charger["power"], arrival_soc, departure_soc)
+
+        stops.append({
+            "station": {"name": charger["name"], "location": charger["location"], "power": charger["power"]},
+            "charge_time": charge_time,
+            "charge_amount": departure_soc - arrival_soc,
+            "detour_time": 2 * charger["offset_km"] / speed * 60,
+            "route_index": charger["route_index"]
+        })
+
+        detour_distance += 2 * charger["offset_km"]
+        position = charger["along_km"]
+        soc = departure_soc - charger["offset_km"] * soc_per_km
+
+    drive_time = (total_distance + detour_distance) / speed * 60
+    charge_time = sum(stop["charge_time"] for stop in stops)
+    return {
+        "feasible": feasible,
+        "charging_stops": stops,
+        "drive_time": drive_time,
+        "charge_time": charge_time,
+        "total_time": drive_time + charge_time + len(stops) * STOP_BUFFER
+    }
+
+
+def plan_corridor_stops_optimal(total_distance: float, corridor: List[Dict], initial_soc: float,
+                                battery_capacity: float, energy_consumption: float, speed: float) -> Dict:
+    """
+    Stops minimizing drive + detour + charge time, by dynamic programming over (charger, SOC bucket)
+
+    A state is the SOC the car would have at the route start for the SOC it
+    has now ("SOC + along_km x consumption"), which driving along the route
+    leaves unchanged. Only stops move a state: charging from any lower state
+    is a prefix minimum over the states, so each charger costs O(k) for k
+    SOC buckets and the whole corridor O(n * k), without external calls.
+    Departures land on the SOC_BUCKET grid, so a stop may charge up to one
+    bucket past what is needed or past TARGET_SOC.
+
+    Args:
+        total_distance: Route length in km
+        corridor: Power-filtered corridor chargers sorted by 'along_km'
+        initial_soc: Initial state of charge as percentage
+        battery_capacity: Battery capacity in kWh
+        energy_consumption: Energy consumption in kWh per km
+        speed: Average speed in km/h
+
+    Returns:
+        Plan as returned by plan_corridor_stops; if no plan reaches the
+        destination, the greedy plan with 'feasible' False
+    """
+    soc_per_km = energy_consumption / battery_capacity * 100
+
+    # State grid through the initial SOC, from the reserve up to the highest departure at the destination
+    below = int(np.ceil((initial_soc - RESERVE_SOC) / SOC_BUCKET)) + 1
+    above = int(np.ceil((max(initial_soc, TARGET_SOC) + total_distance * soc_per_km - initial_soc) / SOC_BUCKET)) + 1
+    states = initial_soc + SOC_BUCKET * np.arange(-below, above + 1)
+    indices = np.arange(len(states))
+
+    # Extra minutes (detours, charging, stop buffers) of the best way to each state
+    extra = np.full(len(states), np.inf)
+    extra[below] = 0.0
+    choices = []  # Per charger: source state of a stop there, or -1 if passed by
+
+    curve_socs = np.arange(0, 100 + SOC_STEP / 2, SOC_STEP)
+    curves = {}
+    for charger in corridor:
+        along, offset = charger["along_km"], charger["offset_km"]
+        if charger["power"] not in curves:
+            curves[charger["power"]] = np.asarray(get_charging_curve(battery_capacity, charger["power"]).table)
+        table = curves[charger["power"]]
+
+        # States below the reserve on the route here cannot go on
+        extra[states - along * soc_per_km < RESERVE_SOC - 1e-6] = np.inf
+
+        # Charging from arrival a to departure d takes minutes_to(d) - minutes_to(a)
+        arrival = states - (along + offset) * soc_per_km
+        reachable = np.isfinite(extra) & (arrival >= RESERVE_SOC - 1e-6)
+        before_charge = np.where(reachable, extra - np.interp(np.clip(arrival, 0, 100), curve_socs, table), np.inf)
+        best_before = np.minimum.accumulate(before_charge)
+        best_source = np.maximum.accumulate(np.where(reachable & (before_charge <= best_before), indices, -1))
+
+        # Leaving with d puts the car in state d + (along - offset) x consumption, and any
+        # source state whose arrival is at most d qualifies
+        departure = states - (along - offset) * soc_per_km
+        source_limit = np.minimum(indices + int(np.floor(2 * offset * soc_per_km / SOC_BUCKET + 1e-9)), len(states) - 1)
+        stop = best_before[source_limit] + np.interp(np.clip(departure, 0, 100), curve_socs, table) \
+            + 2 * offset / speed * 60 + STOP_BUFFER
+        stop[(departure >= TARGET_SOC + SOC_BUCKET) | (departure < RESERVE_SOC)] = np.inf
+
+        better = stop < extra
+        choices.append(np.where(better, best_source[source_limit], -1))
+        extra = np.where(better, stop, extra)
+
+    extra[states - total_distance * soc_per_km < RESERVE_SOC - 1e-6] = np.inf
+    state = int(extra.argmin())
+    if not np.isfinite(extra[state]):
+        return plan_corridor_stops(total_distance, corridor, initial_soc, battery_capacity, energy_consumption, speed)
+
+    # Walk back through the chargers where the best path stopped
+    stops = []
+    for charger, choice in zip(reversed(corridor), reversed(choices)):
+        source = int(choice[state])
+        if source < 0:
+            continue
+        along, offset = charger["along_km"], charger["offset_km"]
+        arrival_soc = float(states[source] - (along + offset) * soc_per_km)
+        departure_soc = float(states[state] - (along - offset) * soc_per_km)
+        stops.append({
+            "station": {"name": charger["name"], "location": charger["location"], "power": charger["power"]},
+            "charge_time": charge_time_minutes(battery_capacity, charger["power"], arrival_soc, departure_soc),
+            "charge_amount": departure_soc - arrival_soc,
+            "detour_time": 2 * offset / speed * 60,
+            "route_index": charger["route_index"]
+        })
+        state = source
+    stops.reverse()
+
+    drive_time = total_distance / speed * 60 + sum(stop["detour_time"] for stop in stops)
+    charge_time = sum(stop["charge_time"] for stop in stops)
+    return {
+        "feasible": True,
+        "charging_stops": stops,
+        "drive_time": drive_time,
+        "charge_time": charge_time,
+        "total_time": drive_time + charge_time + len(stops) * STOP_BUFFER
+    }
+
+
+def corridor_soc_profile(distances: np.ndarray, plan: Dict, corridor: List[Dict], initial_soc: float,
+                         battery_capacity: float, energy_consumption: float) -> List[float]:
+    """
+    SOC at every route point with a corridor plan's charging stops applied
+
+    Detours are not part of the route geometry, so their consumption is
+    taken off at the stop.
+
+    Args:
+        distances: Cumulative along-route distances in km
+        plan: Plan from plan_corridor_stops
+        corridor: Corridor chargers the plan was made from
+        initial_soc: Initial state of charge as percentage
+        battery_capacity: Battery capacity in kWh
+        energy_consumption: Energy consumption in kWh per km
+
+    Returns:
+        List of SOC values along the route
+    """
+    offsets = {tuple(charger["location"]): charger["offset_km"] for charger in corridor}
+    soc_per_km = energy_consumption / battery_capacity * 100
+    soc = initial_soc - distances * soc_per_km
+    for stop in plan["charging_stops"]:
+        index = stop["route_index"]
+        offset = offsets.get(tuple(stop["station"]["location"]), 0.0)
+        # Out to the charger, charge, back to the route, then continue from there
+        rejoin_soc = soc[index] - 2 * offset * soc_per_km + stop["charge_amount"]
+        soc[index + 1:] = rejoin_soc - (distances[index + 1:] - distances[index]) * soc_per_km
+    return np.maximum(soc, 0).tolist()
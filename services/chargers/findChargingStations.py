@@ -1,40 +1,56 @@
 # Standard library imports
+import contextvars
 import logging
-import math
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+# Third-party imports
+import numpy as np
 
 # Local module imports
+from services.chargers.candidatePruning import branch_and_bound, lower_bound_road_km, min_charge_time
 from services.chargers.getChargingStations import get_charging_stations
 from services.route.getRoadRoute import get_road_route
-from services.route.haversine import haversine
+from services.route.haversine import pairwise_haversine
+from services.route.planningBudget import PlanningBudget
+from services.route.routeGeometry import Route, as_route
+from services.soc.chargingCurve import charge_time_minutes
 
 logger = logging.getLogger(__name__)
 
-def find_charging_stop(route: List[List[float]], soc_values: List[float], battery_capacity: float, 
-                       energy_consumption: float, min_kw: int, max_kw: int, speed: float) -> Optional[Dict]:
+# Upper bound on concurrent charger/route lookups per plan
+MAX_PREFETCH_WORKERS = 8
+
+def find_charging_stop(route: Route, soc_values: List[float], battery_capacity: float, 
+                       energy_consumption: float, min_kw: int, max_kw: int, speed: float,
+                       budget: Optional[PlanningBudget] = None) -> Optional[Dict]:
     """
     Find optimal charging station along the route with improved station selection
     
+    If the planning budget runs out, the best station evaluated so far is returned.
+    
     Args:
-        route: List of coordinate points along the route
+        route: Route (or list of coordinate points) to search along
         soc_values: List of state of charge values at each point
         battery_capacity: Battery capacity in kWh
         energy_consumption: Energy consumption in kWh per km
         min_kw: Minimum charging power in kW
         max_kw: Maximum charging power in kW
         speed: Average speed in km/h
+        budget: Optional time/call budget checked before every external lookup
         
     Returns:
         Dictionary with charging station details or None if no suitable station found
     """
+    route = as_route(route)
+    distances = route.distances
+    
     # Track distance traveled to check every 10km
-    distance_traveled = 0
     last_check_distance = 0
     
     for i, (point, soc) in enumerate(zip(route, soc_values)):
-        # Calculate distance traveled so far
-        if i > 0:
-            distance_traveled += haversine(route[i-1], point)
+        # Distance traveled so far
+        distance_traveled = distances[i]
         
         # Check for charging stations every 30km or if SOC is critically low
         check_distance = 30  # km
@@ -47,7 +63,7 @@ def find_charging_stop(route: List[List[float]], soc_values: List[float], batter
             logger.debug(f"check_distance: {check_distance}")
             logger.debug(f"soc: {soc}")
             last_check_distance = distance_traveled
-            remaining_distance = sum(haversine(route[j], route[j+1]) for j in range(i, len(route)-1))
+            remaining_distance = distances[-1] - distance_traveled
             energy_needed = remaining_distance * energy_consumption
             soc_needed = (energy_needed / battery_capacity) * 100
 
@@ -83,72 +99,125 @@ def find_charging_stop(route: List[List[float]], soc_values: List[float], batter
                 search_points.append(route[search_index])
             
             # Find stations near all search points
-            all_stations = []
+            nearby_stations = []
             for search_point in search_points:
+                if budget is not None and budget.exhausted():
+                    break
                 logger.debug(f"search_point {search_point}")
-                nearby_stations = get_charging_stations(search_point[0], search_point[1], 10, min_kw, max_kw)
-                for station in nearby_stations:
-
-                    # Calculate detour factors
-                    detour_route = get_road_route(point, station["location"])
-                    detour_distance = sum(haversine(detour_route[j], detour_route[j+1]) 
-                                         for j in range(len(detour_route)-1))
-                    detour_time = (detour_distance / speed) * 60
-
-                    # Calculate time to charge
-                    energy_used_detour = detour_distance * energy_consumption
-                    soc_after_detour = soc - (energy_used_detour / battery_capacity) * 100
-                    soc_after_detour = max(soc_after_detour, 0)
-                    
-                    required_soc = min(80, soc_needed + 15)  # Charge to 80% or what's needed + buffer
-                    charge_amount = max(required_soc - soc_after_detour, 10)
-                    charge_amount = min(charge_amount, 100 - soc_after_detour)
-                    
-                    energy_needed = (charge_amount / 100) * battery_capacity
-                    charge_time = (energy_needed / station["power"]) * 60
-                    
-                    # Calculate efficiency score (lower is better)
-                    # Balance between: detour time, charging time, and remaining route positioning
-                    route_to_destination = get_road_route(station["location"], route[-1])
-                    remaining_route_length = sum(haversine(route_to_destination[j], route_to_destination[j+1])
-                                               for j in range(len(route_to_destination)-1))
-                    
-                    # Penalty for stations that take us far from our route
-                    proximity_to_route = min([haversine(station["location"], r) for r in route[i:min(i+100, len(route))]])
-                    route_deviation_penalty = proximity_to_route * 2
-                    
-                    # Time efficiency score - balance detour time and charging time
-                    time_efficiency = detour_time + charge_time + route_deviation_penalty
-                    logger.debug(f"time_efficiency: {time_efficiency}")
-                    # Ensure we can reach this station with current SOC
-                    if soc_after_detour > 10:
-                        all_stations.append({
-                            "station": station,
-                            "charge_time": charge_time,
-                            "detour_time": detour_time,
-                            "route_index": i,
-                            "charge_amount": charge_amount,
-                            "efficiency_score": time_efficiency,
-                            "remaining_distance": remaining_route_length
-                        })
+                nearby_stations.extend(get_charging_stations(search_point[0], search_point[1], 10, min_kw, max_kw))
             
-            # Sort by efficiency score and return the best station
-            logger.debug(f"all_stations: {all_stations}")
-            if all_stations:
-                # Sort by efficiency (lower is better)
-                best_station = min(all_stations, key=lambda x: x["efficiency_score"])
-                return best_station
+            required_soc = min(80, soc_needed + 15)  # Charge to 80% or what's needed + buffer
+            best = _best_station(route, i, soc, nearby_stations, required_soc, battery_capacity,
+                                 energy_consumption, speed, budget)
+            if best is not None:
+                # Only the chosen station needs its remaining route measured
+                route_to_destination = get_road_route(best["station"]["location"], route[-1])
+                best["remaining_distance"] = route_to_destination.length_km
+                return best
+
+            # Out of budget before any station qualified
+            if budget is not None and budget.exhausted():
+                return None
 
           
     return None
 
-def plan_multiple_charging_stops(route: List[List[float]], initial_soc: float, battery_capacity: float,
+def _best_station(route: Route, index: int, soc: float, stations: List[Dict], required_soc: float,
+                  battery_capacity: float, energy_consumption: float, speed: float,
+                  budget: Optional[PlanningBudget]) -> Optional[Dict]:
+    """
+    Pick the station with the lowest detour + charge time + deviation score
+    
+    Stations are routed in order of a lower bound on their score (straight-line
+    detour, fastest possible charge, exact deviation penalty) and routing stops
+    once no remaining station can beat the best routed one, so the choice is
+    the same as routing every station.
+    
+    Args:
+        route: Route being planned
+        index: Route index the detour starts from
+        soc: State of charge at that point
+        stations: Candidate stations with name, location and power
+        required_soc: SOC to charge up to (at least 10% is always added)
+        battery_capacity: Battery capacity in kWh
+        energy_consumption: Energy consumption in kWh per km
+        speed: Average speed in km/h
+        budget: Optional time/call budget checked before every routing call
+        
+    Returns:
+        Charging stop dictionary or None if no station is reachable
+    """
+    if not stations:
+        return None
+    point = route[index]
+    
+    # Penalty for stations that take us far from our route
+    proximity_to_route = pairwise_haversine([station["location"] for station in stations],
+                                            route.points[index:index + 100]).min(axis=1)
+    penalties = {id(station): proximity * 2 for station, proximity in zip(stations, proximity_to_route)}
+    
+    # Arrival SOC must stay above 10%
+    max_detour = (soc - 10) / 100 * battery_capacity / energy_consumption
+    
+    def departure_soc(arrival_soc: float) -> float:
+        return min(max(required_soc, arrival_soc + 10), 100)
+    
+    def lower_bound(station: Dict) -> Optional[float]:
+        detour_distance = lower_bound_road_km(point, station["location"])
+        if detour_distance >= max_detour:
+            return None
+        max_arrival_soc = soc - detour_distance * energy_consumption / battery_capacity * 100
+        charge_time = min_charge_time(battery_capacity, station["power"], 10, max_arrival_soc,
+                                      departure_soc, (required_soc - 10, 90))
+        return detour_distance / speed * 60 + charge_time + penalties[id(station)]
+    
+    def evaluate(station: Dict) -> Optional[Tuple[float, Dict]]:
+        # Calculate detour factors
+        detour_route = get_road_route(point, station["location"])
+        detour_distance = detour_route.length_km
+        detour_time = (detour_distance / speed) * 60
+        
+        # Calculate time to charge
+        energy_used_detour = detour_distance * energy_consumption
+        soc_after_detour = soc - (energy_used_detour / battery_capacity) * 100
+        soc_after_detour = max(soc_after_detour, 0)
+        
+        charge_amount = max(required_soc - soc_after_detour, 10)
+        charge_amount = min(charge_amount, 100 - soc_after_detour)
+        
+        charge_time = charge_time_minutes(battery_capacity, station["power"],
+                                          soc_after_detour, soc_after_detour + charge_amount)
+        
+        # Time efficiency score - balance detour time and charging time
+        time_efficiency = detour_time + charge_time + penalties[id(station)]
+        logger.debug(f"time_efficiency: {time_efficiency}")
+        # Ensure we can reach this station with current SOC
+        if soc_after_detour <= 10:
+            return None
+        return time_efficiency, {
+            "station": station,
+            "charge_time": charge_time,
+            "detour_time": detour_time,
+            "route_index": index,
+            "charge_amount": charge_amount,
+            "efficiency_score": time_efficiency
+        }
+    
+    best = branch_and_bound(stations, lower_bound, evaluate,
+                            should_stop=budget.exhausted if budget is not None else None)
+    return None if best is None else best[1]
+
+def plan_multiple_charging_stops(route: Route, initial_soc: float, battery_capacity: float,
                               energy_consumption: float, min_kw: int, max_kw: int, speed: float) -> List[Dict]:
     """
     Plan multiple charging stops for the entire route at once
     
+    The route is measured once into a cumulative distance array that drives
+    segmentation and SOC simulation. All critical segments are identified up
+    front and their charger lookups and approach routes are fetched concurrently.
+    
     Args:
-        route: List of coordinate points along the route
+        route: Route (or list of coordinate points) to plan along
         initial_soc: Initial state of charge as percentage
         battery_capacity: Battery capacity in kWh
         energy_consumption: Energy consumption in kWh per km
@@ -159,7 +228,9 @@ def plan_multiple_charging_stops(route: List[List[float]], initial_soc: float, b
     Returns:
         List of dictionaries with charging stop details
     """
-    total_distance = sum(haversine(route[i], route[i+1]) for i in range(len(route)-1))
+    route = as_route(route)
+    distances = route.distances
+    total_distance = distances[-1]
     total_energy = total_distance * energy_consumption
     
     # If we can make it with the initial charge, no stops needed
@@ -168,109 +239,109 @@ def plan_multiple_charging_stops(route: List[List[float]], initial_soc: float, b
     
     # Break the route into segments of ~100km for analysis points
     segment_length = 100  # km
-    num_segments = math.ceil(total_distance / segment_length)
     segments = []
-    
-    current_distance = 0
     segment_start_idx = 0
     
-    for i in range(len(route)-1):
-        distance = haversine(route[i], route[i+1])
-        current_distance += distance
-        
-        if current_distance >= segment_length or i == len(route)-2:
-            segments.append({
-                "start_idx": segment_start_idx,
-                "end_idx": i+1,
-                "distance": current_distance,
-                "coordinates": route[segment_start_idx:i+2]
-            })
-            current_distance = 0
-            segment_start_idx = i+1
+    while segment_start_idx < len(route) - 1:
+        # First point at least segment_length beyond the segment start
+        end_idx = int(np.searchsorted(distances, distances[segment_start_idx] + segment_length))
+        end_idx = min(max(end_idx, segment_start_idx + 1), len(route) - 1)
+        segments.append({
+            "start_idx": segment_start_idx,
+            "end_idx": end_idx,
+            "distance": distances[end_idx] - distances[segment_start_idx]
+        })
+        segment_start_idx = end_idx
     
     # Simulate consumption along the route
-    soc_values = [initial_soc]
-    current_soc = initial_soc
+    soc_values = np.maximum(initial_soc - distances * energy_consumption / battery_capacity * 100, 0)
     
-    for i in range(len(route)-1):
-        distance = haversine(route[i], route[i+1])
-        energy_used = distance * energy_consumption
-        soc_drop = (energy_used / battery_capacity) * 100
-        current_soc -= soc_drop
-        current_soc = max(current_soc, 0)
-        soc_values.append(current_soc)
+    # Identify critical segments where SOC drops below 20%
+    critical_segments = {
+        i for i, segment in enumerate(segments)
+        if soc_values[segment["start_idx"]:segment["end_idx"] + 1].min() < 20
+    }
     
-    # Identify critical points where we need to charge
-    charging_stops = []
-    critical_segments = []
+    # Segments needing a stop search in the segment before them (or themselves)
+    search_segments = {}
+    for i in range(len(segments)):
+        if i in critical_segments or i + 1 in critical_segments:
+            search_segments[i] = max(0, i - 1)
     
-    for i, segment in enumerate(segments):
-        min_soc_in_segment = min(soc_values[segment["start_idx"]:segment["end_idx"]+1])
-        
-        # If SOC drops below 20% in this segment, mark it as critical
-        if min_soc_in_segment < 20:
-            critical_segments.append(i)
+    # Prefetch charger candidates and approach routes for all searches at once
+    lookups = {}
+    unique_searches = sorted(set(search_segments.values()))
+    if unique_searches:
+        with ThreadPoolExecutor(max_workers=min(len(unique_searches), MAX_PREFETCH_WORKERS)) as executor:
+            futures = {
+                j: executor.submit(contextvars.copy_context().run,
+                                   _lookup_segment_station, route, segments[j], min_kw, max_kw)
+                for j in unique_searches
+            }
+            lookups = {j: future.result() for j, future in futures.items()}
     
-    # For each critical segment, find a charging station before it
+    # Walk the segments and place stops using the prefetched lookups
+    charging_stops = []
     current_soc = initial_soc
-    processed_distance = 0
     
-    for i in range(len(segments)):
-        segment = segments[i]
+    for i, segment in enumerate(segments):
+        lookup = lookups.get(search_segments[i]) if i in search_segments else None
         
-        # If this is a critical segment or the next one is, find a charging station
-        if i in critical_segments or (i+1 < len(segments) and i+1 in critical_segments):
-            # Find a charging point in the previous or current segment
-            search_segment = segments[max(0, i-1)] if i > 0 else segment
+        if lookup:
+            best_station, station_distance = lookup
             
-            # Find charging stations near the middle of the search segment
-            mid_idx = (search_segment["start_idx"] + search_segment["end_idx"]) // 2
-            mid_point = route[mid_idx]
+            # Calculate energy used and SOC after reaching the station
+            energy_to_station = station_distance * energy_consumption
+            soc_at_station = current_soc - (energy_to_station / battery_capacity) * 100
+            soc_at_station = max(soc_at_station, 0)
             
-            # Get stations within 15km
-            stations = get_charging_stations(mid_point[0], mid_point[1], 15, min_kw, max_kw)
+            # Charge amount needed (charge to 80% for efficiency)
+            charge_amount = 80 - soc_at_station
+            charge_amount = max(charge_amount, 10)  # At least 10% charge
             
-            if stations:
-                # Choose the station with highest power for efficiency
-                best_station = max(stations, key=lambda x: x["power"])
-                
-                # Calculate route details to this station
-                route_to_station = get_road_route(route[search_segment["start_idx"]], best_station["location"])
-                station_distance = sum(haversine(route_to_station[j], route_to_station[j+1]) 
-                                    for j in range(len(route_to_station)-1))
-                
-                # Calculate energy used and SOC after reaching the station
-                energy_to_station = station_distance * energy_consumption
-                soc_at_station = current_soc - (energy_to_station / battery_capacity) * 100
-                soc_at_station = max(soc_at_station, 0)
-                
-                # Charge amount needed (charge to 80% for efficiency)
-                charge_amount = 80 - soc_at_station
-                charge_amount = max(charge_amount, 10)  # At least 10% charge
-                
-                # Calculate charging time
-                energy_to_add = (charge_amount / 100) * battery_capacity
-                charge_time = (energy_to_add / best_station["power"]) * 60  # Minutes
-                
-                # Add stop to our plan
-                charging_stops.append({
-                    "station": best_station,
-                    "charge_time": charge_time,
-                    "detour_time": 0,  # This needs to be calculated from the main route
-                    "route_index": search_segment["start_idx"],
-                    "charge_amount": charge_amount
-                })
-                
-                # Update current SOC after charging
-                current_soc = soc_at_station + charge_amount
+            # Calculate charging time along the tapered charging curve
+            charge_time = charge_time_minutes(battery_capacity, best_station["power"],
+                                              soc_at_station, soc_at_station + charge_amount)
+            
+            # Add stop to our plan
+            charging_stops.append({
+                "station": best_station,
+                "charge_time": charge_time,
+                "detour_time": 0,  # This needs to be calculated from the main route
+                "route_index": segments[search_segments[i]]["start_idx"],
+                "charge_amount": charge_amount
+            })
+            
+            # Update current SOC after charging
+            current_soc = soc_at_station + charge_amount
         
         # Update the SOC after this segment
-        segment_distance = segment["distance"]
-        energy_used = segment_distance * energy_consumption
-        soc_used = (energy_used / battery_capacity) * 100
-        current_soc -= soc_used
-        current_soc = max(current_soc, 0)
+        soc_used = (segment["distance"] * energy_consumption / battery_capacity) * 100
+        current_soc = max(current_soc - soc_used, 0)
+    
+    return charging_stops
+
+def _lookup_segment_station(route: Route, segment: Dict, min_kw: int, max_kw: int) -> Optional[Tuple[Dict, float]]:
+    """
+    Find the most powerful charger near the middle of a segment and the road distance to it
+    
+    Args:
+        route: Route being planned
+        segment: Segment with start and end indices into the route
+        min_kw: Minimum charging power in kW
+        max_kw: Maximum charging power in kW
         
-        processed_distance += segment_distance
+    Returns:
+        Tuple of (station, road distance in km from the segment start) or None if no station found
+    """
+    mid_point = route[(segment["start_idx"] + segment["end_idx"]) // 2]
+    
+    # Get stations within 15km
+    stations = get_charging_stations(mid_point[0], mid_point[1], 15, min_kw, max_kw)
+    if not stations:
+        return None
     
-    return charging_stops
\ No newline at end of file
+    # Choose the station with highest power for efficiency
+    best_station = max(stations, key=lambda x: x["power"])
+    route_to_station = get_road_route(route[segment["start_idx"]], best_station["location"])
+    return best_station, route_to_station.length_km
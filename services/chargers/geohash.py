@@ -0,0 +1,131 @@
+from typing import List, Tuple
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode(lat: float, lon: float, precision: int) -> str:
+    """
+    Encode a coordinate as a geohash
+
+    Args:
+        lat: Latitude
+        lon: Longitude
+        precision: Number of geohash characters
+
+    Returns:
+        Geohash string
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even = True  # Bits alternate starting with longitude
+
+    while len(geohash) < precision:
+        value, value_range = (lon, lon_range) if even else (lat, lat_range)
+        mid = (value_range[0] + value_range[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            value_range[0] = mid
+        else:
+            bits = bits << 1
+            value_range[1] = mid
+        even = not even
+
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(geohash)
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """
+    Size of a geohash cell in degrees
+
+    Args:
+        precision: Number of geohash characters
+
+    Returns:
+        Tuple of (latitude span, longitude span)
+    """
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def bounding_box(geohash: str) -> Tuple[float, float, float, float]:
+    """
+    Bounding box of a geohash cell
+
+    Args:
+        geohash: Geohash string
+
+    Returns:
+        Tuple of (min_lat, min_lon, max_lat, max_lon)
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+
+    for char in geohash:
+        bits = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            value_range = lon_range if even else lat_range
+            mid = (value_range[0] + value_range[1]) / 2
+            if (bits >> shift) & 1:
+                value_range[0] = mid
+            else:
+                value_range[1] = mid
+            even = not even
+
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def children(geohash: str) -> List[str]:
+    """
+    The 32 cells one precision level finer that make up a geohash cell
+
+    Args:
+        geohash: Geohash string
+
+    Returns:
+        List of geohashes
+    """
+    return [geohash + char for char in _BASE32]
+
+
+def covering_cells(min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+                   precision: int) -> List[str]:
+    """
+    Geohash cells that together cover a bounding box
+
+    Args:
+        min_lat: Southern edge
+        min_lon: Western edge
+        max_lat: Northern edge
+        max_lon: Eastern edge
+        precision: Number of geohash characters
+
+    Returns:
+        List of distinct geohashes
+    """
+    lat_step, lon_step = cell_size(precision)
+    cells = []
+
+    # Walk cell centres row by row, snapped to the geohash grid
+    lat = (min_lat + 90) // lat_step * lat_step - 90 + lat_step / 2
+    while lat - lat_step / 2 <= max_lat:
+        lon = (min_lon + 180) // lon_step * lon_step - 180 + lon_step / 2
+        while lon - lon_step / 2 <= max_lon:
+            cell = encode(max(min(lat, 89.999999), -89.999999), (lon + 180) % 360 - 180, precision)
+            if cell not in cells:
+                cells.append(cell)
+            lon += lon_step
+        lat += lat_step
+
+    return cells
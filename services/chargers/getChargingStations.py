@@ -1,9 +1,22 @@
-from typing import List, Dict, Optional
+from typing import Iterable, List, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import httpx
 import requests
 import os
 from dotenv import load_dotenv
 import logging
-from functools import lru_cache
+import math
+
+from services.cache.cacheSnapshot import register_cache
+from services.cache.staleWhileRevalidate import cached_fetch, cached_fetch_async
+from services.cache.ttlCache import TTLCache
+from services.chargers.geohash import bounding_box, children, covering_cells
+from services.route.haversine import haversine
+from services.route.planningBudget import current_budget
+from services.upstream.asyncClient import async_throttled_get
+from services.upstream.rateLimiter import throttled_get
 
 logger = logging.getLogger(__name__)
 
@@ -12,7 +25,7 @@ load_dotenv()
 API_KEY = os.environ.get('OPENCHARGE_KEY')
 
 # OpenChargeMap API
-OCM_URL = "https://api.openchargemap.io/v3/poi/"
+OCM_URL = os.environ.get('OCM_URL', "https://api.openchargemap.io/v3/poi/")
 OCM_PARAMS = {
     "maxresults": 10,
     "distance": 20,
@@ -20,62 +33,390 @@ OCM_PARAMS = {
     "key": API_KEY
 }
 
-# Cache results to avoid duplicate API calls
-#@lru_cache(maxsize=128)
+# Stations are fetched per geohash tile (precision 4 is ~39 x 20 km) without
+# the power filter, so any radius/kW query near a cached tile is answered locally
+TILE_PRECISION = 4
+TILE_MAX_RESULTS = 500
+MAX_SPLIT_PRECISION = 6  # Finest tiles (~1.2 x 0.6 km) a tile with TILE_MAX_RESULTS stations is split into
+TILE_TTL = 6 * 3600  # seconds
+TILE_STALE_TTL = 24 * 3600  # seconds an expired tile is still served while refreshing
+MAX_TILE_WORKERS = 8  # Concurrent tile fetches when prefetching, and when splitting full tiles
+_tile_cache = register_cache("charger_tiles", TTLCache(maxsize=2048, ttl=TILE_TTL, stale_ttl=TILE_STALE_TTL))
+# Finer tiles of every split are requested here; its workers only send single requests
+_split_pool = ThreadPoolExecutor(max_workers=MAX_TILE_WORKERS, thread_name_prefix="tile-split")
+
+class _PartialTile(Exception):
+    """A full tile could not be split within the planning budget"""
+
+    def __init__(self, tile: str, stations: List[Dict]):
+        super().__init__(f"Tile {tile} was cut short by the planning budget")
+        self.stations = stations
+
 def get_charging_stations(
-    lat: float, 
-    lon: float, 
-    radius: Optional[int] = 6, 
-    min_kw: int = 1, 
+    lat: float,
+    lon: float,
+    radius: Optional[int] = 6,
+    min_kw: int = 1,
     max_kw: int = 150
 ) -> List[Dict]:
     """
     Fetch charging stations near a coordinate
-    
+
+    Args:
+        lat: Latitude
+        lon: Longitude
+        radius: Search radius in km (default: 6)
+        min_kw: Minimum charging power in kW
+        max_kw: Maximum charging power in kW
+
+    Returns:
+        List of charging stations with name, location and power, nearest first
+
+    Raises:
+        Exception: If API request fails
+    """
+    radius = radius or 6
+
+    stations = []
+    for distance, station in get_all_stations(lat, lon, radius):
+        for power in station["powers"]:
+            if int(min_kw) <= power <= int(max_kw):
+                # Only add station once with first matching connection
+                stations.append({
+                    "name": station["name"],
+                    "location": station["location"],
+                    "power": power
+                })
+                break
+        if len(stations) == OCM_PARAMS["maxresults"]:
+            break
+
+    logger.info(f"Found {len(stations)} charging stations near ({lat}, {lon})")
+    return stations
+
+async def get_charging_stations_async(
+    lat: float,
+    lon: float,
+    radius: Optional[int] = 6,
+    min_kw: int = 1,
+    max_kw: int = 150
+) -> List[Dict]:
+    """
+    Fetch charging stations near a coordinate without blocking the event loop
+
+    Missing tiles are fetched asynchronously first; the search itself is then
+    answered from the tile cache exactly as get_charging_stations.
+
     Args:
         lat: Latitude
         lon: Longitude
         radius: Search radius in km (default: 6)
         min_kw: Minimum charging power in kW
         max_kw: Maximum charging power in kW
-        
+
+    Returns:
+        List of charging stations with name, location and power, nearest first
+
+    Raises:
+        Exception: If API request fails
+    """
+    await prefetch_stations_async([(lat, lon)], radius or 6)
+    return get_charging_stations(lat, lon, radius, min_kw, max_kw)
+
+def get_all_stations(lat: float, lon: float, radius: float) -> List[Tuple[float, Dict]]:
+    """
+    All cached-tile stations within a radius, without power filter or result cap
+
+    Args:
+        lat: Latitude
+        lon: Longitude
+        radius: Search radius in km
+
     Returns:
-        List of charging stations with name, location and power
-    
+        List of (distance in km, station) tuples, nearest first; stations carry
+        name, location and the power of every connection
+
     Raises:
         Exception: If API request fails
     """
     if not API_KEY:
         logger.error("OpenChargeMap API key is missing")
         raise ValueError("OpenChargeMap API key is missing. Please set OPENCHARGE_KEY environment variable.")
-    
-    params = OCM_PARAMS.copy()
-    params.update({
-        "latitude": lat, 
-        "longitude": lon, 
-        "distance": radius or 6
-    })
-    
-    logger.info(f"Fetching charging stations near ({lat}, {lon})")
-    
+
+    lat, lon = float(lat), float(lon)
+
+    stations = []
+    for tile in _covering_tiles(lat, lon, radius):
+        for station in _get_tile_stations(tile):
+            distance = haversine([lat, lon], station["location"])
+            if distance <= radius:
+                stations.append((distance, station))
+
+    stations.sort(key=lambda item: item[0])
+    return stations
+
+def prefetch_stations(centers: Iterable[Tuple[float, float]], radius: float) -> int:
+    """
+    Load the tiles needed for several searches concurrently, so the searches
+    themselves are answered from the cache
+
+    Args:
+        centers: (lat, lon) centres of the upcoming searches
+        radius: Search radius in km
+
+    Returns:
+        Number of tiles that were not cached yet
+    """
+    tiles = set()
+    for lat, lon in centers:
+        tiles.update(_covering_tiles(float(lat), float(lon), radius))
+    missing = [tile for tile in tiles if _tile_cache.get(tile) is None]
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(len(missing), MAX_TILE_WORKERS)) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, _get_tile_stations, tile) for tile in missing]
+            for future in futures:
+                future.result()
+    return len(missing)
+
+async def prefetch_stations_async(centers: Iterable[Tuple[float, float]], radius: float) -> int:
+    """
+    Load the tiles needed for several searches concurrently on the event loop
+
+    Args:
+        centers: (lat, lon) centres of the upcoming searches
+        radius: Search radius in km
+
+    Returns:
+        Number of tiles that were not cached yet
+    """
+    if not API_KEY:
+        logger.error("OpenChargeMap API key is missing")
+        raise ValueError("OpenChargeMap API key is missing. Please set OPENCHARGE_KEY environment variable.")
+
+    tiles = set()
+    for lat, lon in centers:
+        tiles.update(_covering_tiles(float(lat), float(lon), radius))
+    missing = [tile for tile in tiles if _tile_cache.get(tile) is None]
+    # Stale tiles are served as is and refreshed in the background
+    results = await asyncio.gather(*(cached_fetch_async(_tile_cache, tile, lambda tile=tile: _fetch_tile_async(tile),
+                                                        lambda tile=tile: _fetch_tile(tile))
+                                     for tile in missing), return_exceptions=True)
+    # Tiles cut short by the budget stay uncached and are served partially by the lookup
+    for result in results:
+        if isinstance(result, Exception) and not isinstance(result, _PartialTile):
+            raise result
+    return len(missing)
+
+def _covering_tiles(lat: float, lon: float, radius: float) -> List[str]:
+    """Tiles overlapping the bounding box of a search circle"""
+    lat_span = radius / 111.32
+    lon_span = radius / (111.32 * max(math.cos(math.radians(lat)), 0.01))
+    return covering_cells(lat - lat_span, lon - lon_span, lat + lat_span, lon + lon_span, TILE_PRECISION)
+
+def _get_tile_stations(tile: str) -> List[Dict]:
+    """
+    Get all stations of a geohash tile, fetching the tile from OpenChargeMap if not cached.
+    Expired tiles are served while being refreshed in the background.
+
+    Args:
+        tile: Geohash of the tile
+
+    Returns:
+        List of stations with name, location and the power of every connection
+
+    Raises:
+        Exception: If API request fails
+    """
+    try:
+        return cached_fetch(_tile_cache, tile, lambda: _fetch_tile(tile))
+    except _PartialTile as e:
+        # Served for this request only; the tile is fetched in full next time
+        return e.stations
+
+def _fetch_tile(tile: str) -> List[Dict]:
+    """
+    Fetch all stations of a geohash tile from OpenChargeMap
+
+    A tile whose response is full is split into finer tiles, one level at a
+    time, until every response is complete.
+
+    Args:
+        tile: Geohash of the tile
+
+    Returns:
+        List of stations inside the tile with name, location and connection powers
+
+    Raises:
+        _PartialTile: If the planning budget ran out before the tile was complete
+        Exception: If API request fails
+    """
+    stations = []
+    responses = [(tile, _request_tile(tile))]
+    while True:
+        complete, truncated = _partition(responses)
+        stations.extend(complete)
+        if not truncated:
+            return stations
+        tiles = [child for parent, _ in truncated for child in children(parent)]
+        if not _split_allowed(tile, len(tiles)):
+            raise _PartialTile(tile, stations + [station for parent, pois in truncated
+                                                 for station in _parse_tile(parent, pois)])
+        futures = [_split_pool.submit(contextvars.copy_context().run, _request_tile, child) for child in tiles]
+        responses = [(child, future.result()) for child, future in zip(tiles, futures)]
+
+async def _fetch_tile_async(tile: str) -> List[Dict]:
+    """
+    Fetch all stations of a geohash tile from OpenChargeMap asynchronously
+
+    Args:
+        tile: Geohash of the tile
+
+    Returns:
+        List of stations inside the tile with name, location and connection powers
+
+    Raises:
+        _PartialTile: If the planning budget ran out before the tile was complete
+        Exception: If API request fails
+    """
+    stations = []
+    responses = [(tile, await _request_tile_async(tile))]
+    while True:
+        complete, truncated = _partition(responses)
+        stations.extend(complete)
+        if not truncated:
+            return stations
+        tiles = [child for parent, _ in truncated for child in children(parent)]
+        if not _split_allowed(tile, len(tiles)):
+            raise _PartialTile(tile, stations + [station for parent, pois in truncated
+                                                 for station in _parse_tile(parent, pois)])
+        responses = list(zip(tiles, await asyncio.gather(*(_request_tile_async(child) for child in tiles))))
+
+def _request_tile(tile: str) -> List[Dict]:
+    """OpenChargeMap response for the query circle of a tile"""
+    logger.info(f"Fetching charging stations for tile {tile}")
+
     try:
-        response = requests.get(OCM_URL, params=params, timeout=3)
+        response = throttled_get("ocm", OCM_URL, params=_tile_params(tile), timeout=3)
         response.raise_for_status()
-        
-        stations = []
-        for station in response.json():
-            for conn in station.get("Connections", []):
-                if conn.get("PowerKW") is not None and int(min_kw) <= conn["PowerKW"] <= int(max_kw):
-                    stations.append({
-                        "name": station["AddressInfo"]["Title"],
-                        "location": [station["AddressInfo"]["Latitude"], station["AddressInfo"]["Longitude"]],
-                        "power": conn["PowerKW"]
-                    })
-                    break  # Only add station once with first matching connection
-        
-        logger.info(f"Found {len(stations)} charging stations")
-        return stations
-    
+        return response.json()
+
     except requests.RequestException as e:
         logger.error(f"Error fetching charging stations: {str(e)}")
-        raise Exception(f"OpenChargeMap API error: {str(e)}")
\ No newline at end of file
+        raise Exception(f"OpenChargeMap API error: {str(e)}")
+
+async def _request_tile_async(tile: str) -> List[Dict]:
+    """OpenChargeMap response for the query circle of a tile, without blocking the event loop"""
+    logger.info(f"Fetching charging stations for tile {tile}")
+
+    try:
+        response = await async_throttled_get("ocm", OCM_URL, params=_tile_params(tile), timeout=3)
+        response.raise_for_status()
+        return response.json()
+
+    except httpx.HTTPError as e:
+        logger.error(f"Error fetching charging stations: {str(e)}")
+        raise Exception(f"OpenChargeMap API error: {str(e)}")
+
+def _partition(responses: List[Tuple[str, List[Dict]]]) -> Tuple[List[Dict], List[Tuple[str, List[Dict]]]]:
+    """
+    Split tile responses into the stations of complete tiles and the tiles to split
+
+    Args:
+        responses: (tile, OpenChargeMap response) pairs
+
+    Returns:
+        Tuple of (stations of the complete tiles, truncated (tile, response) pairs)
+    """
+    stations = []
+    truncated = []
+    for tile, pois in responses:
+        if _truncated(tile, pois):
+            truncated.append((tile, pois))
+        else:
+            stations.extend(_parse_tile(tile, pois))
+    return stations, truncated
+
+def _truncated(tile: str, pois: List[Dict]) -> bool:
+    """
+    Whether stations inside a tile may be missing from its full response
+
+    OpenChargeMap returns the stations nearest the query centre first, so a
+    response with TILE_MAX_RESULTS stations is complete up to its farthest
+    station. Stations from neighbouring tiles count towards the limit, so a
+    full response still covers the tile if that distance reaches its corners.
+
+    Args:
+        tile: Geohash of the tile
+        pois: OpenChargeMap response for the tile
+
+    Returns:
+        True if the tile may be missing stations and can still be split into finer tiles
+    """
+    if len(pois) < TILE_MAX_RESULTS:
+        return False
+    min_lat, min_lon, max_lat, max_lon = bounding_box(tile)
+    center = [(min_lat + max_lat) / 2, (min_lon + max_lon) / 2]
+    farthest = max(haversine(center, [poi["AddressInfo"]["Latitude"], poi["AddressInfo"]["Longitude"]])
+                   for poi in pois)
+    if farthest >= max(haversine(center, [lat, lon]) for lat in (min_lat, max_lat) for lon in (min_lon, max_lon)):
+        return False
+    if len(tile) >= MAX_SPLIT_PRECISION:
+        logger.warning(f"Tile {tile} has {TILE_MAX_RESULTS} stations at the finest split, some may be missing")
+        return False
+    return True
+
+def _split_allowed(tile: str, requests_needed: int) -> bool:
+    """
+    Whether the planning budget leaves room for the next level of finer tiles
+
+    Args:
+        tile: Geohash of the tile being split
+        requests_needed: Number of finer tiles to request
+
+    Returns:
+        True if there is no active budget or it can afford the requests
+    """
+    budget = current_budget()
+    if budget is None:
+        return True
+    if budget.exhausted() or budget.calls + requests_needed > budget.max_calls:
+        logger.warning(f"Planning budget too small to split tile {tile} further, some stations may be missing")
+        budget.cut_short = True
+        return False
+    logger.info(f"Tile {tile} is full, fetching {requests_needed} finer tiles")
+    return True
+
+def _tile_params(tile: str) -> Dict:
+    """OpenChargeMap query for a circle around the tile centre that contains the whole tile"""
+    min_lat, min_lon, max_lat, max_lon = bounding_box(tile)
+    center = [(min_lat + max_lat) / 2, (min_lon + max_lon) / 2]
+
+    params = OCM_PARAMS.copy()
+    params.update({
+        "latitude": center[0],
+        "longitude": center[1],
+        "distance": math.ceil(haversine(center, [max_lat, max_lon])) + 1,
+        "maxresults": TILE_MAX_RESULTS
+    })
+    return params
+
+def _parse_tile(tile: str, pois: List[Dict]) -> List[Dict]:
+    """Stations of an OpenChargeMap response that lie inside the tile"""
+    min_lat, min_lon, max_lat, max_lon = bounding_box(tile)
+
+    stations = []
+    for station in pois:
+        location = [station["AddressInfo"]["Latitude"], station["AddressInfo"]["Longitude"]]
+        # The query circle overlaps neighbouring tiles; keep only our own stations
+        if not (min_lat <= location[0] < max_lat and min_lon <= location[1] < max_lon):
+            continue
+        stations.append({
+            "name": station["AddressInfo"]["Title"],
+            "location": location,
+            "powers": [
+                conn["PowerKW"] for conn in station.get("Connections", [])
+                if conn.get("PowerKW") is not None
+            ]
+        })
+
+    return stations
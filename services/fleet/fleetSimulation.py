@@ -0,0 +1,356 @@
+# Standard library imports
+import heapq
+import logging
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+# Third-party imports
+import numpy as np
+
+# Local module imports
+from services.chargers.corridorChargers import fetch_corridor_chargers, filter_by_power
+from services.chargers.corridorPlanner import RESERVE_SOC, plan_corridor_stops
+from services.route.getRoadRoute import get_road_route
+from services.soc.chargingCurve import charge_time_minutes
+
+logger = logging.getLogger(__name__)
+
+# Event types, ordered so finished charges hand over connectors before arrivals at the same time
+FINISH_CHARGE = 0
+ARRIVE_CHARGER = 1
+APPROACH_CHARGER = 2
+ARRIVE_DESTINATION = 3
+
+REPLAN_QUEUE_LENGTH = 2  # Queued vehicles per connector before a driver looks for another charger
+REPLAN_LOOKAHEAD = 30  # Minutes before arrival at which drivers check the charger's queue
+ALTERNATIVE_WINDOW = 30  # km along the route searched for an alternative charger
+
+
+def build_trip_plan(start: List[float], end: List[float], initial_soc: float, battery_capacity: float,
+                    energy_consumption: float, min_kw: int, max_kw: int, speed: float) -> Dict:
+    """
+    Plan a trip template once with the corridor planner, including fallback chargers per stop
+
+    Args:
+        start: Starting coordinates [lat, lon]
+        end: Destination coordinates [lat, lon]
+        initial_soc: Initial state of charge as percentage
+        battery_capacity: Battery capacity in kWh
+        energy_consumption: Energy consumption in kWh per km
+        min_kw: Minimum charging power in kW
+        max_kw: Maximum charging power in kW
+        speed: Average speed in km/h
+
+    Returns:
+        Dictionary with the planned stops, their drive/charge minutes and alternatives
+    """
+    route = get_road_route(start, end)
+    distances = route.distances
+    corridor = filter_by_power(fetch_corridor_chargers(route), min_kw, max_kw)
+    plan = plan_corridor_stops(float(distances[-1]), corridor, initial_soc, battery_capacity,
+                               energy_consumption, speed)
+    if not plan["feasible"]:
+        raise Exception(f"No feasible charging plan from {start} to {end}")
+
+    stops = []
+    position = 0.0
+    previous_offset = 0.0
+    for stop in plan["charging_stops"]:
+        charger = next(c for c in corridor if c["location"] == stop["station"]["location"])
+        arrival_soc = (initial_soc if not stops else stops[-1]["departure_soc"]) - (
+            charger["along_km"] - position + charger["offset_km"] + previous_offset
+        ) * energy_consumption / battery_capacity * 100
+        stops.append({
+            "charger": charger,
+            "drive_minutes": (previous_offset + charger["along_km"] - position + charger["offset_km"]) / speed * 60,
+            "charge_minutes": stop["charge_time"],
+            "arrival_soc": arrival_soc,
+            "departure_soc": arrival_soc + stop["charge_amount"],
+            "alternatives": [
+                c for c in corridor
+                if c is not charger and abs(c["along_km"] - charger["along_km"]) <= ALTERNATIVE_WINDOW
+            ]
+        })
+        position = charger["along_km"]
+        previous_offset = charger["offset_km"]
+
+    return {
+        "stops": stops,
+        "final_drive_minutes": (previous_offset + float(distances[-1]) - position) / speed * 60,
+        "battery_capacity": battery_capacity,
+        "energy_consumption": energy_consumption,
+        "speed": speed,
+        "planned_total_time": plan["total_time"]
+    }
+
+
+class FleetSimulation:
+    """
+    Discrete-event simulation of many vehicles sharing a finite charger pool
+
+    Vehicles follow their trip plans; at a busy charger they queue, or
+    re-plan to a nearby alternative when the queue is long. State is kept in
+    flat numpy arrays indexed by vehicle and charger id so tens of thousands
+    of vehicles simulate in seconds.
+    """
+
+    def __init__(self, trip_plans: List[Dict], connectors_per_charger: int):
+        """
+        Initialize the simulation
+
+        Args:
+            trip_plans: Trip templates from build_trip_plan
+            connectors_per_charger: Number of connectors at every charger
+        """
+        self.trip_plans = trip_plans
+
+        # Charger ids shared across all templates so vehicles compete for them
+        self.charger_ids: Dict[Tuple[float, float], int] = {}
+        self.chargers: List[Dict] = []
+        for plan in trip_plans:
+            for stop in plan["stops"]:
+                for charger in [stop["charger"]] + stop["alternatives"]:
+                    key = tuple(charger["location"])
+                    if key not in self.charger_ids:
+                        self.charger_ids[key] = len(self.chargers)
+                        self.chargers.append(charger)
+
+        num_chargers = len(self.chargers)
+        self.connectors = np.full(num_chargers, connectors_per_charger, dtype=np.int32)
+        self.in_use = np.zeros(num_chargers, dtype=np.int32)
+        self.busy_minutes = np.zeros(num_chargers)
+        self.max_queue = np.zeros(num_chargers, dtype=np.int32)
+        self.queues = [deque() for _ in range(num_chargers)]
+
+    def run(self, templates: np.ndarray, departures: np.ndarray) -> Dict:
+        """
+        Simulate all vehicles until they reach their destinations
+
+        Args:
+            templates: Trip template index per vehicle
+            departures: Departure time per vehicle in minutes
+
+        Returns:
+            Dictionary with waiting time, queue and utilization statistics
+        """
+        started = time.monotonic()
+        num_vehicles = len(templates)
+        self._templates = templates
+
+        # Per-vehicle state of the stop being driven to or charged at
+        self._stop_index = np.zeros(num_vehicles, dtype=np.int32)
+        self._stop_charger = np.full(num_vehicles, -1, dtype=np.int32)
+        self._arrival_soc = np.zeros(num_vehicles)
+        self._departure_soc = np.zeros(num_vehicles)
+        self._leg_extra = np.zeros(num_vehicles)  # Minutes added to the next leg after a re-plan
+        self._arrive_at = np.zeros(num_vehicles)
+        self._replans = np.zeros(num_vehicles, dtype=np.int32)
+        queued_at = np.zeros(num_vehicles)
+        wait_minutes = np.zeros(num_vehicles)
+        arrival = np.full(num_vehicles, np.nan)
+
+        self._events = []
+        self._sequence = 0
+        for vehicle in range(num_vehicles):
+            self._depart(vehicle, departures[vehicle])
+
+        while self._events:
+            now, event_type, _, vehicle = heapq.heappop(self._events)
+            charger = self._stop_charger[vehicle]
+
+            if event_type == APPROACH_CHARGER:
+                self._approach(vehicle, now)
+
+            elif event_type == ARRIVE_CHARGER:
+                if self.in_use[charger] < self.connectors[charger]:
+                    self.in_use[charger] += 1
+                    self._start_charge(vehicle, now)
+                else:
+                    self.queues[charger].append(vehicle)
+                    queued_at[vehicle] = now
+                    self.max_queue[charger] = max(self.max_queue[charger], len(self.queues[charger]))
+
+            elif event_type == FINISH_CHARGE:
+                # Next queued vehicle takes over the connector, otherwise it is freed
+                if self.queues[charger]:
+                    waiting = self.queues[charger].popleft()
+                    wait_minutes[waiting] += now - queued_at[waiting]
+                    self._start_charge(waiting, now)
+                else:
+                    self.in_use[charger] -= 1
+
+                self._stop_index[vehicle] += 1
+                self._depart(vehicle, now)
+
+            else:
+                arrival[vehicle] = now
+
+        end_time = np.nanmax(arrival) if num_vehicles else 0.0
+        span = max(end_time - (departures.min() if num_vehicles else 0.0), 1e-9)
+        return self._summarize(templates, departures, arrival, wait_minutes, self._replans, span,
+                               time.monotonic() - started)
+
+    def _push(self, event_time: float, event_type: int, vehicle: int) -> None:
+        heapq.heappush(self._events, (event_time, event_type, self._sequence, vehicle))
+        self._sequence += 1
+
+    def _depart(self, vehicle: int, now: float) -> None:
+        """Send a vehicle towards its next stop or its destination"""
+        plan = self.trip_plans[self._templates[vehicle]]
+        leg_extra = self._leg_extra[vehicle]
+        self._leg_extra[vehicle] = 0.0
+
+        if self._stop_index[vehicle] >= len(plan["stops"]):
+            self._push(now + leg_extra + plan["final_drive_minutes"], ARRIVE_DESTINATION, vehicle)
+            return
+
+        stop = plan["stops"][self._stop_index[vehicle]]
+        self._stop_charger[vehicle] = self.charger_ids[tuple(stop["charger"]["location"])]
+        self._arrival_soc[vehicle] = stop["arrival_soc"]
+        self._departure_soc[vehicle] = stop["departure_soc"]
+        self._arrive_at[vehicle] = now + leg_extra + stop["drive_minutes"]
+
+        # The driver checks the charger's queue shortly before arriving
+        self._push(max(now, self._arrive_at[vehicle] - REPLAN_LOOKAHEAD), APPROACH_CHARGER, vehicle)
+
+    def _approach(self, vehicle: int, now: float) -> None:
+        """Re-plan to an alternative charger if the planned one is congested, then arrive"""
+        charger = self._stop_charger[vehicle]
+        arrive_at = self._arrive_at[vehicle]
+
+        if len(self.queues[charger]) >= REPLAN_QUEUE_LENGTH * self.connectors[charger]:
+            plan = self.trip_plans[self._templates[vehicle]]
+            stop = plan["stops"][self._stop_index[vehicle]]
+            alternative = self._find_alternative(plan, stop, charger)
+            if alternative is not None:
+                charger, drive_delta, soc_delta, next_leg_delta, next_leg_soc = alternative
+                self._stop_charger[vehicle] = charger
+                arrive_at = max(now, arrive_at + drive_delta)
+                self._arrival_soc[vehicle] -= soc_delta
+                self._leg_extra[vehicle] = next_leg_delta
+                # Charge a little more when the following leg gets longer
+                self._departure_soc[vehicle] = min(stop["departure_soc"] + max(next_leg_soc, 0), 100)
+                self._replans[vehicle] += 1
+
+        self._push(arrive_at, ARRIVE_CHARGER, vehicle)
+
+    def _start_charge(self, vehicle: int, now: float) -> None:
+        """Occupy a connector for the vehicle's charge duration"""
+        plan = self.trip_plans[self._templates[vehicle]]
+        stop = plan["stops"][self._stop_index[vehicle]]
+        charger = self._stop_charger[vehicle]
+
+        if tuple(stop["charger"]["location"]) == tuple(self.chargers[charger]["location"]):
+            duration = stop["charge_minutes"]
+        else:
+            # Alternatives may have another power and arrival SOC
+            duration = charge_time_minutes(plan["battery_capacity"], self.chargers[charger]["power"],
+                                           self._arrival_soc[vehicle], self._departure_soc[vehicle])
+
+        self.busy_minutes[charger] += duration
+        self._push(now + duration, FINISH_CHARGE, vehicle)
+
+    def _find_alternative(self, plan: Dict, stop: Dict,
+                          charger: int) -> Optional[Tuple[int, float, float, float, float]]:
+        """
+        Pick the least loaded alternative charger that is reachable above the reserve
+
+        Returns:
+            Tuple of (charger id, extra minutes and SOC to reach it, extra minutes and SOC
+            on the following leg), or None if no alternative is better
+        """
+        current = stop["charger"]
+        best, best_load = None, (len(self.queues[charger]) + 1) / self.connectors[charger]
+        soc_per_km = plan["energy_consumption"] / plan["battery_capacity"] * 100
+
+        for candidate in stop["alternatives"]:
+            candidate_id = self.charger_ids[tuple(candidate["location"])]
+            load = (self.in_use[candidate_id] + len(self.queues[candidate_id]) + 1 - self.connectors[candidate_id]) \
+                / self.connectors[candidate_id]
+            if load >= best_load:
+                continue
+
+            # Distance change to reach the candidate instead; later stops are reached
+            # over the along-route difference in the opposite direction
+            delta_km = (candidate["along_km"] + candidate["offset_km"]) - (current["along_km"] + current["offset_km"])
+            if stop["arrival_soc"] - delta_km * soc_per_km < RESERVE_SOC:
+                continue
+
+            next_delta_km = (current["along_km"] - candidate["along_km"]) + (candidate["offset_km"] - current["offset_km"])
+            best, best_load = (
+                candidate_id,
+                delta_km / plan["speed"] * 60,
+                delta_km * soc_per_km,
+                next_delta_km / plan["speed"] * 60,
+                next_delta_km * soc_per_km
+            ), load
+
+        return best
+
+    def _summarize(self, templates: np.ndarray, departures: np.ndarray, arrival: np.ndarray,
+                   wait_minutes: np.ndarray, replans: np.ndarray, span: float, wall_seconds: float) -> Dict:
+        """Aggregate per-vehicle and per-charger results"""
+        utilization = self.busy_minutes / (self.connectors * span)
+        busiest = np.argsort(-self.max_queue)[:10]
+        return {
+            "vehicles": int(len(templates)),
+            "completed": int(np.count_nonzero(~np.isnan(arrival))),
+            "wait_minutes": {
+                "mean": float(wait_minutes.mean()) if len(wait_minutes) else 0.0,
+                "p95": float(np.percentile(wait_minutes, 95)) if len(wait_minutes) else 0.0,
+                "max": float(wait_minutes.max()) if len(wait_minutes) else 0.0,
+                "waited_share": float(np.mean(wait_minutes > 0)) if len(wait_minutes) else 0.0
+            },
+            "trip_minutes_mean": float(np.nanmean(arrival - departures)) if len(arrival) else 0.0,
+            "replans": int(replans.sum()),
+            "chargers": [
+                {
+                    "name": self.chargers[i]["name"],
+                    "location": self.chargers[i]["location"],
+                    "max_queue": int(self.max_queue[i]),
+                    "utilization": float(utilization[i])
+                }
+                for i in busiest if self.max_queue[i] > 0 or utilization[i] > 0
+            ],
+            "simulation_seconds": wall_seconds
+        }
+
+
+def simulate_fleet(trips: List[Dict], connectors_per_charger: int, energy_consumption: float,
+                   speed: float, seed: int = 0) -> Dict:
+    """
+    Plan each trip template once and simulate its vehicles through the shared charger pool
+
+    Args:
+        trips: Trip templates with start, end, battery, soc, minKw, maxKw, count and
+               a departure window (departureStart/departureEnd in minutes)
+        connectors_per_charger: Number of connectors at every charger
+        energy_consumption: Energy consumption in kWh per km
+        speed: Average speed in km/h
+        seed: Random seed for departure times
+
+    Returns:
+        Simulation statistics plus the planned time of each template
+    """
+    trip_plans = [
+        build_trip_plan(
+            trip["start"].split(","), trip["end"].split(","), float(trip.get("soc", 80)),
+            float(trip["battery"]), energy_consumption, trip.get("minKw", 50), trip.get("maxKw", 350), speed
+        )
+        for trip in trips
+    ]
+
+    rng = np.random.default_rng(seed)
+    counts = [int(trip.get("count", 1)) for trip in trips]
+    templates = np.repeat(np.arange(len(trips)), counts)
+    departures = np.concatenate([
+        rng.uniform(float(trip.get("departureStart", 0)), float(trip.get("departureEnd", 0)) + 1e-9, count)
+        for trip, count in zip(trips, counts)
+    ]) if counts else np.zeros(0)
+
+    simulation = FleetSimulation(trip_plans, connectors_per_charger)
+    result = simulation.run(templates, departures)
+    result["planned_trip_minutes"] = [plan["planned_total_time"] for plan in trip_plans]
+    logger.info(f"Simulated {len(templates)} vehicles in {result['simulation_seconds']:.2f}s")
+    return result
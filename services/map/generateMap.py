@@ -1,16 +1,17 @@
 from typing import Dict, List
 
-import folium
+import numpy as np
 
 from services.map.socToColor import soc_to_color
 from services.route.haversine import haversine
+from services.route.routeGeometry import as_route
 
 def create_map(routes, soc_values, charging_stops, start, end, avg_speed):
     """
     Create an HTML map visualization of the route with charging stops
     
     Args:
-        routes: List of route segments
+        routes: List of route segments (Routes or lists of points)
         soc_values: List of SOC values for each segment
         charging_stops: List of charging stop details
         start: Starting coordinates [lat, lon]
@@ -20,11 +21,18 @@ def create_map(routes, soc_values, charging_stops, start, end, avg_speed):
     Returns:
         HTML string of map
     """
+    # Imported on first render so planning-only workers never load folium
+    import folium
+    
     # Create a Folium map centered on the start point
     m = folium.Map(location=start, zoom_start=10)
     
+    routes = [as_route(route) for route in routes]
+    
     # Add route segments with color coding based on SOC
-    for i, (route_segment, segment_soc) in enumerate(zip(routes, soc_values)):
+    for i, (route, segment_soc) in enumerate(zip(routes, soc_values)):
+        # Folium serializes plain lists; convert each segment once
+        route_segment = route.tolist()
         # Create SOC-based color gradient (green to yellow to red)
         route_with_soc = []
         for j in range(len(route_segment)):
@@ -113,12 +121,9 @@ def create_map(routes, soc_values, charging_stops, start, end, avg_speed):
     m.get_root().html.add_child(folium.Element(legend_html))
     
     # Fit map to bounds
-    all_points = [point for route in routes for point in route]
-    if all_points:
-        m.fit_bounds([
-            [min(p[0] for p in all_points), min(p[1] for p in all_points)],
-            [max(p[0] for p in all_points), max(p[1] for p in all_points)]
-        ])
+    all_points = np.concatenate([route.points for route in routes]) if routes else np.empty((0, 2))
+    if len(all_points):
+        m.fit_bounds([all_points.min(axis=0).tolist(), all_points.max(axis=0).tolist()])
     else:
         # If no route points, fit to start and end
         m.fit_bounds([
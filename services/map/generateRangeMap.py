@@ -0,0 +1,57 @@
+from typing import Dict, List
+
+from services.map.socToColor import soc_to_color
+
+def create_range_map(origin, bands, chargers):
+    """
+    Create an HTML map of the reachable area per arrival-SOC band
+    
+    Args:
+        origin: Starting coordinates [lat, lon]
+        bands: List of bands with 'soc' and 'polygon'
+        chargers: List of charging stations considered for the charging stop
+        
+    Returns:
+        HTML string of map
+    """
+    # Imported on first render, as in create_map
+    import folium
+    
+    m = folium.Map(location=origin, zoom_start=7)
+    
+    # Largest area (lowest arrival SOC) first so smaller bands are drawn on top
+    for band in sorted(bands, key=lambda b: b["soc"]):
+        color = soc_to_color(band["soc"])
+        folium.Polygon(
+            locations=band["polygon"],
+            color=color,
+            weight=2,
+            fill=True,
+            fill_color=color,
+            fill_opacity=0.25,
+            tooltip=f"Arrive with at least {band['soc']:.0f}% SOC"
+        ).add_to(m)
+    
+    for charger in chargers:
+        folium.CircleMarker(
+            location=charger["location"],
+            radius=3,
+            color='blue',
+            fill=True,
+            popup=f"{charger['name']} ({charger['power']} kW)"
+        ).add_to(m)
+    
+    folium.Marker(
+        location=origin,
+        popup='Start',
+        icon=folium.Icon(color='green', icon='play', prefix='fa')
+    ).add_to(m)
+    
+    all_points = [point for band in bands for point in band["polygon"]]
+    if all_points:
+        m.fit_bounds([
+            [min(p[0] for p in all_points), min(p[1] for p in all_points)],
+            [max(p[0] for p in all_points), max(p[1] for p in all_points)]
+        ])
+    
+    return m._repr_html_()
@@ -1,6 +1,13 @@
-import matplotlib.colors as mcolors
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def _soc_colormap():
+    """Build the colormap on first use; matplotlib is only imported when a map is drawn"""
+    import matplotlib.colors as mcolors
+    return mcolors.LinearSegmentedColormap.from_list("soc", ["green", "yellow", "red"])
 
 def soc_to_color(soc: float) -> str:
     """Map SOC to a gradient color (green → red)"""
-    cmap = mcolors.LinearSegmentedColormap.from_list("soc", ["green", "yellow", "red"])
-    return mcolors.to_hex(cmap(1 - soc/100))
+    import matplotlib.colors as mcolors
+    return mcolors.to_hex(_soc_colormap()(1 - soc/100))
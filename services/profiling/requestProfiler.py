@@ -0,0 +1,212 @@
+# Standard library imports
+import contextvars
+import cProfile
+import hmac
+import logging
+import os
+import pstats
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Profiling is off unless a token is configured; requests opt in by sending it
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+PROFILE_DIR = os.environ.get('PROFILE_DIR')  # Optional directory for .prof files (snakeviz, flameprof, gprof2dot)
+TOP_FUNCTIONS = 15  # Functions listed in the breakdown
+HAVERSINE_FUNCTIONS = {"haversine", "pairwise_haversine"}
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class UpstreamStats:
+    """Count and latency of OSRM/OpenChargeMap requests made for one request"""
+
+    def __init__(self):
+        self.backends: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _backend(self, backend: str) -> Dict[str, float]:
+        return self.backends.setdefault(backend, {"calls": 0, "latency_ms": 0.0, "max_latency_ms": 0.0,
+                                                  "wait_ms": 0.0, "throttled": 0})
+
+    def record_call(self, backend: str, seconds: float, status: int) -> None:
+        with self._lock:
+            stats = self._backend(backend)
+            stats["calls"] += 1
+            stats["latency_ms"] += seconds * 1000
+            stats["max_latency_ms"] = max(stats["max_latency_ms"], seconds * 1000)
+            if status == 429:
+                stats["throttled"] += 1
+
+    def record_wait(self, backend: str, seconds: float) -> None:
+        with self._lock:
+            self._backend(backend)["wait_ms"] += seconds * 1000
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Per backend: calls, total/mean/max latency, rate-limit wait and 429 responses"""
+        with self._lock:
+            return {
+                backend: {
+                    **{name: round(value, 2) for name, value in stats.items()},
+                    "mean_latency_ms": round(stats["latency_ms"] / stats["calls"], 2) if stats["calls"] else 0.0
+                }
+                for backend, stats in self.backends.items()
+            }
+
+
+# Upstream statistics of the request being profiled (copied into worker threads with the context)
+_upstream_stats: contextvars.ContextVar[Optional[UpstreamStats]] = contextvars.ContextVar(
+    "upstream_stats", default=None
+)
+
+
+def record_upstream_call(backend: str, seconds: float, status: int) -> None:
+    """
+    Record an upstream request for the profiled request, if any
+
+    Args:
+        backend: Backend name ('osrm' or 'ocm')
+        seconds: Time from sending the request to receiving the response
+        status: HTTP status of the response
+    """
+    stats = _upstream_stats.get()
+    if stats is not None:
+        stats.record_call(backend, seconds, status)
+
+
+def record_upstream_wait(backend: str, seconds: float) -> None:
+    """
+    Record time spent waiting for the backend's rate limit, if profiling
+
+    Args:
+        backend: Backend name ('osrm' or 'ocm')
+        seconds: Time waited for a token
+    """
+    stats = _upstream_stats.get()
+    if stats is not None:
+        stats.record_wait(backend, seconds)
+
+
+def profiling_authorized(token: Optional[str]) -> bool:
+    """
+    Check a profiling token against PROFILE_TOKEN
+
+    Args:
+        token: Token sent by the client
+
+    Returns:
+        True if profiling is enabled and the token matches
+    """
+    return bool(PROFILE_TOKEN) and token is not None and hmac.compare_digest(token, PROFILE_TOKEN)
+
+
+class RequestProfile:
+    """
+    cProfile run of one request plus its upstream requests
+
+    cProfile sees the request thread only: time spent in worker threads
+    (auto strategy, concurrent tile fetches) shows up as waiting on futures,
+    while their upstream requests are still counted.
+    """
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.upstream = UpstreamStats()
+        self.started = time.monotonic()
+        self.wall_seconds = 0.0
+
+    def breakdown(self, label: str) -> Dict:
+        """
+        Compact hot-path summary, saving the profile when PROFILE_DIR is set
+
+        Args:
+            label: Name for the saved profile (e.g. the strategy)
+
+        Returns:
+            Dictionary with wall time, top functions by cumulative time,
+            haversine time, upstream statistics and the saved file path
+        """
+        stats = pstats.Stats(self.profiler)
+        entries = [
+            (func, calls, own, cumulative)
+            for func, (_, calls, own, cumulative, _) in stats.stats.items()
+            if "_lsprof" not in func[2] and "cProfile" not in func[0]
+        ]
+
+        top = sorted(entries, key=lambda entry: entry[3], reverse=True)[:TOP_FUNCTIONS]
+        haversine = [entry for entry in entries
+                     if entry[0][2] in HAVERSINE_FUNCTIONS and entry[0][0].endswith("haversine.py")]
+
+        return {
+            "wall_ms": round(self.wall_seconds * 1000, 2),
+            "top_functions": [
+                {"function": _describe(func), "calls": calls,
+                 "cumulative_ms": round(cumulative * 1000, 2), "own_ms": round(own * 1000, 2)}
+                for func, calls, own, cumulative in top
+            ],
+            "haversine": {
+                "calls": sum(entry[1] for entry in haversine),
+                "ms": round(sum(entry[3] for entry in haversine) * 1000, 2)
+            },
+            "upstream": self.upstream.summary(),
+            "profile_file": self.save(label) if PROFILE_DIR else None
+        }
+
+    def save(self, label: str) -> Optional[str]:
+        """
+        Write the raw profile to PROFILE_DIR
+
+        Args:
+            label: Name prefix of the file
+
+        Returns:
+            Path of the .prof file, or None if it could not be written
+        """
+        path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{label}-{uuid.uuid4().hex[:8]}.prof")
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            self.profiler.dump_stats(path)
+            return path
+        except OSError as e:
+            logger.warning(f"Could not save profile to {path}: {str(e)}")
+            return None
+
+
+def _describe(func) -> str:
+    """'file:line(function)' with repository paths shortened"""
+    filename, line, name = func
+    if filename.startswith(_REPO_ROOT):
+        filename = os.path.relpath(filename, _REPO_ROOT)
+    elif filename != "~":
+        filename = os.path.join(os.path.basename(os.path.dirname(filename)), os.path.basename(filename))
+    return f"{filename}:{line}({name})" if filename != "~" else name
+
+
+@contextmanager
+def request_profile(enabled: bool) -> Iterator[Optional[RequestProfile]]:
+    """
+    Profile the enclosed request handling if enabled
+
+    Args:
+        enabled: Whether the request opted in (and was authorized)
+
+    Yields:
+        RequestProfile collecting the run, or None when not profiling
+    """
+    if not enabled:
+        yield None
+        return
+
+    profile = RequestProfile()
+    token = _upstream_stats.set(profile.upstream)
+    profile.profiler.enable()
+    try:
+        yield profile
+    finally:
+        profile.profiler.disable()
+        profile.wall_seconds = time.monotonic() - profile.started
+        _upstream_stats.reset(token)
@@ -0,0 +1,78 @@
+# Standard library imports
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+# Local module imports
+from services.chargers.corridorChargers import fetch_corridor_chargers, filter_by_power
+from services.chargers.corridorPlanner import corridor_soc_profile, plan_corridor_stops
+from services.route.getRoadRoute import get_road_route_alternatives
+
+logger = logging.getLogger(__name__)
+
+
+def plan_route_alternatives(start: List[float], end: List[float], initial_soc: float, battery_capacity: float,
+                            energy_consumption: float, min_kw: int, max_kw: int, speed: float) -> Dict:
+    """
+    Plan charging on every OSRM alternative concurrently and pick the fastest trip
+
+    Each alternative gets its own corridor charger lookup (through the shared
+    tile cache, so overlapping corridors are fetched once) and corridor plan.
+    Trips are timed at the average speed like every other strategy, so the
+    auto mode compares like with like; OSRM's duration is only reported.
+
+    Args:
+        start: Starting coordinates [lat, lon]
+        end: Destination coordinates [lat, lon]
+        initial_soc: Initial state of charge as percentage
+        battery_capacity: Battery capacity in kWh
+        energy_consumption: Energy consumption in kWh per km
+        min_kw: Minimum charging power in kW
+        max_kw: Maximum charging power in kW
+        speed: Average speed in km/h
+
+    Returns:
+        Dictionary with the chosen 'route', its 'plan' and 'soc_values', the
+        'chosen' alternative index and a summary row per alternative
+    """
+    alternatives = get_road_route_alternatives(start, end)
+
+    def evaluate(alternative: Dict) -> Dict:
+        corridor = filter_by_power(fetch_corridor_chargers(alternative["route"]), min_kw, max_kw)
+        plan = plan_corridor_stops(alternative["route"].length_km, corridor, initial_soc,
+                                   battery_capacity, energy_consumption, speed)
+        return {"corridor": corridor, "plan": plan}
+
+    with ThreadPoolExecutor(max_workers=len(alternatives)) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, evaluate, alternative)
+                   for alternative in alternatives]
+        evaluated = [future.result() for future in futures]
+
+    summary = [
+        {
+            "distance": alternative["distance"],
+            "duration": alternative["duration"],
+            "feasible": result["plan"]["feasible"],
+            "stops": len(result["plan"]["charging_stops"]),
+            "total_time": result["plan"]["total_time"]
+        }
+        for alternative, result in zip(alternatives, evaluated)
+    ]
+
+    feasible = [i for i, result in enumerate(evaluated) if result["plan"]["feasible"]]
+    if not feasible:
+        raise Exception("No feasible charging plan on any route alternative")
+    chosen = min(feasible, key=lambda i: evaluated[i]["plan"]["total_time"])
+    logger.info(f"Chose route alternative {chosen} of {len(alternatives)}")
+
+    route = alternatives[chosen]["route"]
+    plan = evaluated[chosen]["plan"]
+    return {
+        "route": route,
+        "plan": plan,
+        "soc_values": corridor_soc_profile(route.distances, plan, evaluated[chosen]["corridor"],
+                                           initial_soc, battery_capacity, energy_consumption),
+        "chosen": chosen,
+        "alternatives": summary
+    }
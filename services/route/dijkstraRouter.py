@@ -4,9 +4,13 @@ import logging
 from typing import List, Dict, Tuple, Optional
 
 # Local module imports
+from services.chargers.candidatePruning import lower_bound_road_km, min_charge_time
 from services.chargers.getChargingStations import get_charging_stations
 from services.route.getRoadRoute import get_road_route
 from services.route.haversine import haversine
+from services.route.planningBudget import PlanningBudget
+from services.route.routeGeometry import Route
+from services.soc.chargingCurve import charge_time_minutes
 from services.soc.simulateSoc import simulate_soc
 
 logger = logging.getLogger(__name__)
@@ -21,7 +25,8 @@ class EVRouter:
     
     def __init__(self, start: List[str], end: List[str], initial_soc: float, 
                  battery_capacity: float, energy_consumption: float, 
-                 min_kw: int, max_kw: int, avg_speed: float):
+                 min_kw: int, max_kw: int, avg_speed: float,
+                 budget: Optional[PlanningBudget] = None):
         """
         Initialize the EV router
         
@@ -34,21 +39,26 @@ class EVRouter:
             min_kw: Minimum charging power in kW
             max_kw: Maximum charging power in kW
             avg_speed: Average speed in km/h
+            budget: Optional time/call budget checked on every queue pop
         """
-        self.start = start
-        self.end = end
+        self.start = [float(coord) for coord in start]
+        self.end = [float(coord) for coord in end]
         self.initial_soc = initial_soc
         self.battery_capacity = battery_capacity
         self.energy_consumption = energy_consumption
         self.min_kw = min_kw
         self.max_kw = max_kw
         self.avg_speed = avg_speed
+        self.budget = budget
         self.chargers_cache = {}  # Cache charger data to avoid repeated API calls
         
     def find_optimal_route(self) -> Optional[Dict]:
         """
         Find the optimal route with charging stops using a modified Dijkstra's algorithm
         
+        When the budget runs out, the fastest complete plan queued so far is
+        returned with 'budget_exhausted' set.
+        
         Returns:
             Dictionary with route details including segments, SOC values, and charging stops,
             or None if no route is found
@@ -56,9 +66,18 @@ class EVRouter:
         # Priority queue: (total_time, current_location, current_soc, path, charging_stops)
         queue = [(0, self.start, self.initial_soc, [self.start], [])]
         visited = set()  # Track visited locations with their SOC levels
+        best_complete = None  # Fastest (total_time, path, stops) that reaches the destination
         
         logger.info("Finding optimal route...")
         while queue:
+            if self.budget is not None and self.budget.exhausted():
+                if best_complete is None:
+                    break
+                _, path, stops = best_complete
+                result = self.construct_final_route(path, stops)
+                result["budget_exhausted"] = True
+                return result
+            
             total_time, current, soc, path, stops = heapq.heappop(queue)
             
             logger.debug(f"Exploring node - total_time: {total_time}, current: {current}")
@@ -81,6 +100,8 @@ class EVRouter:
                     direct_time = self.calculate_drive_time(direct_route)
                     total_path = path + [self.end]
                     heapq.heappush(queue, (total_time + direct_time, self.end, 0, total_path, stops))
+                    if best_complete is None or total_time + direct_time < best_complete[0]:
+                        best_complete = (total_time + direct_time, total_path, stops)
                 except Exception as e:
                     logger.error(f"Error calculating direct route to destination: {str(e)}")
             
@@ -89,6 +110,9 @@ class EVRouter:
                 nearby_chargers = self.get_nearby_chargers(current)
                 
                 for charger in nearby_chargers:
+                    if self.budget is not None and self.budget.exhausted():
+                        break
+                    
                     charger_location = charger["location"]
                     charger_key = f"{charger_location[0]:.4f},{charger_location[1]:.4f}"
                     
@@ -96,13 +120,18 @@ class EVRouter:
                     if charger_key in visited:
                         continue
                     
+                    # Skip chargers that cannot be reached, or cannot beat the best
+                    # complete plan, even at straight-line distance
+                    lower_bound = self.charger_lower_bound(total_time, current, soc, charger)
+                    if lower_bound is None or (best_complete is not None and lower_bound > best_complete[0]):
+                        continue
+                    
                     # Check if we can reach this charger
                     route_to_charger = get_road_route(current, charger_location)
                     drive_time = self.calculate_drive_time(route_to_charger)
                     
                     # Calculate energy consumed and remaining SOC
-                    distance = sum(haversine(route_to_charger[i], route_to_charger[i+1]) 
-                                  for i in range(len(route_to_charger)-1))
+                    distance = route_to_charger.length_km
                     energy_used = distance * self.energy_consumption
                     soc_after_drive = soc - (energy_used / self.battery_capacity) * 100
                     
@@ -110,11 +139,8 @@ class EVRouter:
                         # Calculate charging time (charge to 80% for efficiency)
                         target_soc = 80
                         soc_to_add = target_soc - soc_after_drive
-                        if soc_to_add > 0:
-                            energy_to_add = (soc_to_add / 100) * self.battery_capacity
-                            charge_time = (energy_to_add / charger["power"]) * 60  # Minutes
-                        else:
-                            charge_time = 0
+                        charge_time = charge_time_minutes(self.battery_capacity, charger["power"],
+                                                          soc_after_drive, target_soc)
                         
                         new_stop = {
                             "station": charger,
@@ -134,6 +160,31 @@ class EVRouter:
         logger.warning("No viable route found")
         return None
     
+    def charger_lower_bound(self, total_time: float, current: List[str], soc: float,
+                            charger: Dict) -> Optional[float]:
+        """
+        Lower bound on the time of any complete plan continuing via a charger, without routing
+        
+        Args:
+            total_time: Time spent so far in minutes
+            current: Current location coordinates
+            soc: Current state of charge
+            charger: Charging station dictionary
+            
+        Returns:
+            Time in minutes, or None if the charger is certainly out of reach
+        """
+        distance = lower_bound_road_km(current, charger["location"])
+        max_soc_after_drive = soc - (distance * self.energy_consumption / self.battery_capacity) * 100
+        if max_soc_after_drive <= 10:
+            return None
+        
+        # Charging to 80% is fastest when arriving with the most charge
+        charge_time = min_charge_time(self.battery_capacity, charger["power"], 10, max_soc_after_drive,
+                                      lambda arrival_soc: 80)
+        remaining = 0.0 if self.is_destination(charger["location"]) else lower_bound_road_km(charger["location"], self.end)
+        return total_time + ((distance + remaining) / self.avg_speed) * 60 + charge_time
+    
     def is_destination(self, location: List[str]) -> bool:
         """
         Check if current location is close enough to destination
@@ -159,7 +210,7 @@ class EVRouter:
         """
         try:
             route = get_road_route(current, self.end)
-            distance = sum(haversine(route[i], route[i+1]) for i in range(len(route)-1))
+            distance = route.length_km
             energy_needed = distance * self.energy_consumption
             soc_needed = (energy_needed / self.battery_capacity) * 100
             return soc >= (soc_needed + 10)  # 10% safety margin
@@ -185,18 +236,17 @@ class EVRouter:
         self.chargers_cache[location_key] = chargers
         return chargers
     
-    def calculate_drive_time(self, route: List[List[float]]) -> float:
+    def calculate_drive_time(self, route: Route) -> float:
         """
         Calculate driving time in minutes
         
         Args:
-            route: List of coordinate points along the route
+            route: Road route
             
         Returns:
             Estimated driving time in minutes
         """
-        distance = sum(haversine(route[i], route[i+1]) for i in range(len(route)-1))
-        return (distance / self.avg_speed) * 60
+        return (route.length_km / self.avg_speed) * 60
     
     def construct_final_route(self, path: List[List[str]], stops: List[Dict]) -> Dict:
         """
@@ -0,0 +1,63 @@
+# Standard library imports
+import logging
+from typing import Dict, List, Tuple
+
+# Local module imports
+from services.route.getRoadRoute import get_road_route
+from services.route.routeGeometry import Route
+
+logger = logging.getLogger(__name__)
+
+# Decimal places used when keying coordinates (~1 m)
+KEY_PRECISION = 5
+
+
+class GeometryStore:
+    """
+    Per-request store of road geometries
+
+    Each origin/destination pair is fetched from OSRM at most once per request,
+    and prefixes of an already known route are taken as slices instead of re-routed.
+    """
+
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str], Route] = {}
+        self.fetch_count = 0
+
+    @staticmethod
+    def _key(start: List[float], end: List[float]) -> Tuple[str, str]:
+        return (
+            f"{float(start[0]):.{KEY_PRECISION}f},{float(start[1]):.{KEY_PRECISION}f}",
+            f"{float(end[0]):.{KEY_PRECISION}f},{float(end[1]):.{KEY_PRECISION}f}"
+        )
+
+    def get_route(self, start: List[float], end: List[float]) -> Route:
+        """
+        Get the road route between two points, fetching it only once
+
+        Args:
+            start: Starting coordinates [lat, lon]
+            end: Ending coordinates [lat, lon]
+
+        Returns:
+            Road route
+        """
+        key = self._key(start, end)
+        if key not in self._routes:
+            self._routes[key] = get_road_route(start, end)
+            self.fetch_count += 1
+        return self._routes[key]
+
+    @staticmethod
+    def prefix(route: Route, index: int) -> Route:
+        """
+        Part of a known route from its start up to and including a point index
+
+        Args:
+            route: Known route geometry
+            index: Index of the last point to include
+
+        Returns:
+            Route prefix (a view on the known route)
+        """
+        return route[:index + 1]
@@ -0,0 +1,51 @@
+from typing import Dict, List
+
+import numpy as np
+
+from services.route.getRoadRoute import OSRM_BASE_URL
+from services.upstream.rateLimiter import throttled_get
+
+OSRM_TABLE_URL = OSRM_BASE_URL + "/table/v1/driving/{}"
+
+# Public OSRM rejects tables with many more coordinates than this
+MAX_TABLE_COORDINATES = 100
+
+def get_distance_table(sources: List[List[float]], destinations: List[List[float]]) -> Dict[str, np.ndarray]:
+    """
+    Fetch road distances and durations from every source to every destination
+
+    Large destination sets are split into several OSRM table requests.
+
+    Args:
+        sources: List of [lat, lon] origin coordinates
+        destinations: List of [lat, lon] destination coordinates
+
+    Returns:
+        Dictionary with 'distances' (km) and 'durations' (minutes) arrays of
+        shape (len(sources), len(destinations)); unroutable pairs are NaN
+    """
+    if not sources or not destinations:
+        raise ValueError("Need at least one source and one destination")
+
+    chunk_size = max(1, MAX_TABLE_COORDINATES - len(sources))
+    distances = np.full((len(sources), len(destinations)), np.nan)
+    durations = np.full((len(sources), len(destinations)), np.nan)
+
+    for offset in range(0, len(destinations), chunk_size):
+        chunk = destinations[offset:offset + chunk_size]
+        coords = ";".join(f"{float(point[1])},{float(point[0])}" for point in list(sources) + list(chunk))
+        source_ids = ";".join(str(i) for i in range(len(sources)))
+        destination_ids = ";".join(str(len(sources) + i) for i in range(len(chunk)))
+        url = (f"{OSRM_TABLE_URL.format(coords)}?sources={source_ids}"
+               f"&destinations={destination_ids}&annotations=distance,duration")
+
+        response = throttled_get("osrm", url)
+        if response.status_code != 200:
+            raise Exception(f"OSRM API error: {response.status_code}")
+
+        data = response.json()
+        # OSRM reports unroutable pairs as null
+        distances[:, offset:offset + len(chunk)] = np.array(data["distances"], dtype=float) / 1000
+        durations[:, offset:offset + len(chunk)] = np.array(data["durations"], dtype=float) / 60
+
+    return {"distances": distances, "durations": durations}
@@ -1,116 +1,297 @@
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import contextvars
+import logging
+import os
 
-import requests
+from dotenv import load_dotenv
 
-OSRM_URL = "http://router.project-osrm.org/route/v1/driving/{},{};{},{}?overview=full&geometries=geojson"
+from services.cache.cacheSnapshot import register_cache
+from services.cache.staleWhileRevalidate import cached_fetch, cached_fetch_async
+from services.cache.ttlCache import TTLCache
+from services.route.routeGeometry import Route
+from services.upstream.asyncClient import async_throttled_get
+from services.upstream.rateLimiter import throttled_get
 
-def get_road_route(start: List[float], end: List[float]) -> List[List[float]]:
+logger = logging.getLogger(__name__)
+
+# OSRM server, overridable to point at a private instance or a stub (tools/loadtest)
+load_dotenv()
+OSRM_BASE_URL = os.environ.get('OSRM_BASE_URL', "http://router.project-osrm.org").rstrip("/")
+OSRM_URL = OSRM_BASE_URL + "/route/v1/driving/{},{};{},{}?overview=full&geometries=geojson"
+OSRM_OVERVIEW_URL = OSRM_BASE_URL + "/route/v1/driving/{},{};{},{}?overview=simplified&geometries=geojson"
+MAX_ALTERNATIVES = 3  # OSRM returns at most this many routes per alternatives request
+MAX_WAYPOINTS_PER_REQUEST = 25  # Longer waypoint lists are routed in overlapping chunks
+MAX_CHUNK_WORKERS = 8  # Waypoint chunks requested at once
+CHUNK_RETRIES = 1  # Extra attempts of a failed waypoint chunk before the route fails
+
+# Road geometry rarely changes, so routes are shared across requests for an hour
+# and served for up to a day past that while being refreshed in the background
+_route_cache = register_cache("routes", TTLCache(maxsize=512, ttl=3600, stale_ttl=24 * 3600))
+_alternatives_cache = register_cache("route_alternatives", TTLCache(maxsize=256, ttl=3600, stale_ttl=24 * 3600))
+_overview_cache = register_cache("route_overviews", TTLCache(maxsize=256, ttl=3600, stale_ttl=24 * 3600))
+
+def _route_key(start: List[float], end: List[float]) -> Tuple[float, float, float, float]:
+    """Cache key of a start/end pair, rounded to ~1 m"""
+    return (round(float(start[0]), 5), round(float(start[1]), 5), round(float(end[0]), 5), round(float(end[1]), 5))
+
+def get_road_route(start: List[float], end: List[float]) -> Route:
     """Fetch road route from OSRM API"""
+    return cached_fetch(_route_cache, _route_key(start, end), lambda: _fetch_road_route(start, end))
+
+async def get_road_route_async(start: List[float], end: List[float]) -> Route:
+    """Fetch road route from OSRM API without blocking the event loop (shares get_road_route's cache)"""
+    return await cached_fetch_async(_route_cache, _route_key(start, end),
+                                    lambda: _fetch_road_route_async(start, end),
+                                    lambda: _fetch_road_route(start, end))
+
+def _fetch_road_route(start: List[float], end: List[float]) -> Route:
+    """Fetch road route from OSRM API, bypassing the cache"""
     url = OSRM_URL.format(start[1], start[0], end[1], end[0])
-    response = requests.get(url)
+    response = throttled_get("osrm", url)
+    return _parse_road_route(response.status_code, response.json, start, end)
+
+async def _fetch_road_route_async(start: List[float], end: List[float]) -> Route:
+    """Fetch road route from OSRM API asynchronously, bypassing the cache"""
+    url = OSRM_URL.format(start[1], start[0], end[1], end[0])
+    response = await async_throttled_get("osrm", url)
+    return _parse_road_route(response.status_code, response.json, start, end)
+
+def _parse_road_route(status_code: int, json, start: List[float], end: List[float]) -> Route:
+    """
+    Route of an OSRM response, given its status and a callable returning the body
+
+    OSRM's geometry runs between the points it snapped the request to; where
+    a point lies off the road (waypoints[].distance > 0) the requested point
+    is added back. The route then covers the whole way and is never shorter
+    than the straight line, which candidatePruning.lower_bound_road_km relies on.
+    """
+    if status_code == 200:
+        body = json()
+        coordinates = body["routes"][0]["geometry"]["coordinates"]
+        snapped = body.get("waypoints", [])
+        if snapped and snapped[0]["distance"] > 0:
+            coordinates = [[float(start[1]), float(start[0])]] + coordinates
+        if len(snapped) > 1 and snapped[-1]["distance"] > 0:
+            coordinates = coordinates + [[float(end[1]), float(end[0])]]
+        return Route.from_lonlat(coordinates)
+    else:
+        raise Exception("OSRM API error")
+
+def get_road_route_alternatives(start: List[float], end: List[float]) -> List[Dict]:
+    """
+    Fetch the OSRM route between two points together with its alternatives
+
+    Args:
+        start: Starting coordinates [lat, lon]
+        end: Ending coordinates [lat, lon]
+
+    Returns:
+        List of dictionaries with 'route', 'distance' (km) and 'duration' (minutes),
+        fastest first
+    """
+    return cached_fetch(_alternatives_cache, _route_key(start, end), lambda: _fetch_road_route_alternatives(start, end))
+
+def _fetch_road_route_alternatives(start: List[float], end: List[float]) -> List[Dict]:
+    """Fetch road route alternatives from OSRM API, bypassing the cache"""
+    url = OSRM_URL.format(start[1], start[0], end[1], end[0]) + f"&alternatives={MAX_ALTERNATIVES}"
+    response = throttled_get("osrm", url)
     if response.status_code == 200:
-        route = response.json()["routes"][0]["geometry"]["coordinates"]
-        return [[lat, lon] for lon, lat in route]
+        return [
+            {
+                "route": Route.from_lonlat(route["geometry"]["coordinates"]),
+                "distance": route["distance"] / 1000,  # Convert to km
+                "duration": route["duration"] / 60     # Convert to minutes
+            }
+            for route in response.json()["routes"]
+        ]
     else:
         raise Exception("OSRM API error")
 
-# Add this to services/route/getRoadRoute.py
+def get_road_route_overview(start: List[float], end: List[float]) -> Dict:
+    """
+    Fetch a simplified OSRM route between two points
+
+    The geometry keeps only the points needed at overview zoom, so it stays
+    small however long the trip is.
+
+    Args:
+        start: Starting coordinates [lat, lon]
+        end: Ending coordinates [lat, lon]
+
+    Returns:
+        Dictionary with simplified 'route', 'distance' (km) and 'duration' (minutes)
+    """
+    return cached_fetch(_overview_cache, _route_key(start, end), lambda: _fetch_road_route_overview(start, end))
+
+def _fetch_road_route_overview(start: List[float], end: List[float]) -> Dict:
+    """Fetch a simplified road route from OSRM API, bypassing the cache"""
+    url = OSRM_OVERVIEW_URL.format(start[1], start[0], end[1], end[0])
+    response = throttled_get("osrm", url)
+    if response.status_code == 200:
+        route = response.json()["routes"][0]
+        return {
+            "route": Route.from_lonlat(route["geometry"]["coordinates"]),
+            "distance": route["distance"] / 1000,  # Convert to km
+            "duration": route["duration"] / 60     # Convert to minutes
+        }
+    else:
+        raise Exception("OSRM API error")
 
-def get_road_route_with_waypoints(waypoints):
+def get_road_route_with_waypoints(waypoints: List[List[float]], concurrent: bool = True) -> Dict:
     """
     Get an optimized road route with multiple waypoints using OSRM
     
     Args:
         waypoints: List of [lat, lon] coordinates including start and end points
+        concurrent: Request the chunks of long waypoint lists in parallel, so the
+                    latency is that of the slowest chunk rather than their sum
         
     Returns:
         Dictionary with route data and waypoint indices
     """
+    chunks = _waypoint_chunk_urls(waypoints)
+    if concurrent and len(chunks) > 1:
+        chunk_data = _fetch_chunks_concurrently(chunks)
+    else:
+        chunk_data = [_fetch_chunk(i, url) for i, url in chunks]
+    return _stitch_chunks(chunk_data)
+
+def _fetch_chunk(i: int, url: str) -> Dict:
+    """Fetch one waypoint chunk from OSRM API"""
+    response = throttled_get("osrm", url)
+    return _parse_chunk(i, response.status_code, response.json)
+
+def _fetch_chunks_concurrently(chunks: List[Tuple[int, str]]) -> List[Dict]:
+    """
+    Fetch waypoint chunks in parallel, retrying only the ones that failed
+
+    Args:
+        chunks: (index of the chunk's first waypoint, request URL) from _waypoint_chunk_urls
+
+    Returns:
+        Response bodies in route order, whatever order they arrived in
+
+    Raises:
+        Exception: The last error of a chunk that still failed after CHUNK_RETRIES retries
+    """
+    chunk_data: List[Optional[Dict]] = [None] * len(chunks)
+    pending = list(range(len(chunks)))
+    with ThreadPoolExecutor(max_workers=min(len(chunks), MAX_CHUNK_WORKERS)) as executor:
+        for attempt in range(CHUNK_RETRIES + 1):
+            futures = {
+                position: executor.submit(contextvars.copy_context().run, _fetch_chunk, *chunks[position])
+                for position in pending
+            }
+            pending = []
+            for position, future in futures.items():
+                try:
+                    chunk_data[position] = future.result()
+                except Exception as e:
+                    if attempt == CHUNK_RETRIES:
+                        raise
+                    logger.warning(f"Waypoint chunk {chunks[position][0]} failed, retrying: {str(e)}")
+                    pending.append(position)
+            if not pending:
+                break
+    return chunk_data
+
+async def get_road_route_with_waypoints_async(waypoints: List[List[float]]) -> Dict:
+    """
+    Get a road route with multiple waypoints using OSRM, requesting all chunks concurrently
+
+    Args:
+        waypoints: List of [lat, lon] coordinates including start and end points
+
+    Returns:
+        Dictionary with route data and waypoint indices, as get_road_route_with_waypoints
+    """
+    async def fetch_chunk(i: int, url: str) -> Dict:
+        response = await async_throttled_get("osrm", url)
+        return _parse_chunk(i, response.status_code, response.json)
+
+    chunk_data = await asyncio.gather(*(fetch_chunk(i, url) for i, url in _waypoint_chunk_urls(waypoints)))
+    return _stitch_chunks(chunk_data)
+
+def _waypoint_chunk_urls(waypoints: List[List[float]]) -> List[Tuple[int, str]]:
+    """
+    OSRM requests covering a waypoint list, in route order
+
+    Args:
+        waypoints: List of [lat, lon] coordinates including start and end points
+
+    Returns:
+        List of (index of the chunk's first waypoint, request URL); consecutive
+        chunks share their boundary waypoint
+    """
     if len(waypoints) < 2:
         raise ValueError("Need at least 2 waypoints")
-        
-    # Format coordinates for OSRM (longitude,latitude format)
-    coords = [f"{point[1]},{point[0]}" for point in waypoints]
-    
+
     # For many waypoints, we need to break into chunks due to API limitations
-    MAX_WAYPOINTS_PER_REQUEST = 25
-    
-    if len(waypoints) <= MAX_WAYPOINTS_PER_REQUEST:
-        # Single request for fewer waypoints
-        url = f"http://router.project-osrm.org/route/v1/driving/{';'.join(coords)}?overview=full&geometries=geojson&annotations=true"
-        
-        response = requests.get(url)
-        if response.status_code != 200:
-            raise Exception(f"OSRM API error: {response.status_code}")
-            
-        data = response.json()
-        
-        # Extract route coordinates and convert from [lon, lat] to [lat, lon]
-        geometry = data["routes"][0]["geometry"]["coordinates"]
-        route = [[coord[1], coord[0]] for coord in geometry]
-        
-        # Extract waypoint indices in the route
-        waypoint_indices = [leg["steps"][0]["geometry_index"] for leg in data["routes"][0]["legs"]]
-        waypoint_indices.insert(0, 0)  # Add start index
-        
-        return {
-            "route": route,
-            "waypoint_indices": waypoint_indices,
-            "distance": data["routes"][0]["distance"] / 1000,  # Convert to km
-            "duration": data["routes"][0]["duration"] / 60     # Convert to minutes
-        }
-    else:
-        # For many waypoints, chain multiple requests
-        chunk_size = MAX_WAYPOINTS_PER_REQUEST - 1  # Allow for overlap
-        result_route = []
-        result_indices = [0]
-        total_distance = 0
-        total_duration = 0
-        
-        for i in range(0, len(waypoints) - 1, chunk_size):
-            chunk = waypoints[i:i + chunk_size + 1]
-            
-            if len(chunk) < 2:
-                continue
-                
-            chunk_coords = [f"{point[1]},{point[0]}" for point in chunk]
-            url = f"http://router.project-osrm.org/route/v1/driving/{';'.join(chunk_coords)}?overview=full&geometries=geojson&annotations=true"
-            
-            response = requests.get(url)
-            if response.status_code != 200:
-                raise Exception(f"OSRM API error on chunk {i}: {response.status_code}")
-                
-            data = response.json()
-            
-            # Extract route and convert coordinates
-            geometry = data["routes"][0]["geometry"]["coordinates"]
-            chunk_route = [[coord[1], coord[0]] for coord in geometry]
-            
-            # If not the first chunk, remove the duplicate first point
-            if i > 0 and result_route:
-                chunk_route = chunk_route[1:]
-                
-            # Get waypoint indices relative to this chunk
-            chunk_indices = [leg["steps"][0]["geometry_index"] for leg in data["routes"][0]["legs"]]
-            chunk_indices.insert(0, 0)
-            
-            # Adjust indices to account for previous chunks
-            if result_route:
-                adjusted_indices = [idx + len(result_route) for idx in chunk_indices[1:]]
-                result_indices.extend(adjusted_indices)
-            else:
-                result_indices.extend(chunk_indices[1:])
-                
-            # Combine routes
-            result_route.extend(chunk_route)
-            
-            # Add distances and durations
-            total_distance += data["routes"][0]["distance"] / 1000
-            total_duration += data["routes"][0]["duration"] / 60
-        
-        return {
-            "route": result_route,
-            "waypoint_indices": result_indices,
-            "distance": total_distance,
-            "duration": total_duration
-        }
\ No newline at end of file
+    chunk_size = MAX_WAYPOINTS_PER_REQUEST - 1  # Allow for overlap
+    urls = []
+    for i in range(0, len(waypoints) - 1, chunk_size):
+        chunk = waypoints[i:i + chunk_size + 1]
+
+        if len(chunk) < 2:
+            continue
+
+        # Format coordinates for OSRM (longitude,latitude format)
+        chunk_coords = [f"{point[1]},{point[0]}" for point in chunk]
+        urls.append((i, f"{OSRM_BASE_URL}/route/v1/driving/{';'.join(chunk_coords)}?overview=full&geometries=geojson&annotations=true"))
+    return urls
+
+def _parse_chunk(i: int, status_code: int, json) -> Dict:
+    """OSRM response body of a waypoint chunk, given its status and a callable returning the body"""
+    if status_code != 200:
+        raise Exception(f"OSRM API error on chunk {i}: {status_code}")
+    return json()
+
+def _stitch_chunks(chunk_data: List[Dict]) -> Dict:
+    """
+    Join the OSRM responses of consecutive waypoint chunks into one route
+
+    Args:
+        chunk_data: Response bodies in route order
+
+    Returns:
+        Dictionary with route data and 'waypoint_indices', the position of
+        every waypoint (start and end included) in the joined route
+    """
+    result_route = []  # Chunk routes, joined once at the end
+    result_length = 0
+    result_indices = [0]
+    total_distance = 0
+    total_duration = 0
+
+    for data in chunk_data:
+        # Extract route and convert coordinates
+        chunk_route = Route.from_lonlat(data["routes"][0]["geometry"]["coordinates"])
+
+        # Position of the chunk's first point in the joined route; later chunks
+        # start on the previous chunk's last point, whose duplicate is dropped
+        position = result_length - 1 if result_route else 0
+        if result_route:
+            chunk_route = chunk_route[1:]
+
+        # Each leg's annotation has one entry per geometry segment, so the
+        # running sum of their lengths is the position of every later waypoint
+        for leg in data["routes"][0]["legs"]:
+            position += len(leg["annotation"]["distance"])
+            result_indices.append(position)
+
+        # Combine routes
+        result_route.append(chunk_route)
+        result_length += len(chunk_route)
+
+        # Add distances and durations
+        total_distance += data["routes"][0]["distance"] / 1000  # Convert to km
+        total_duration += data["routes"][0]["duration"] / 60     # Convert to minutes
+
+    return {
+        "route": Route.concat(result_route),
+        "waypoint_indices": result_indices,
+        "distance": total_distance,
+        "duration": total_duration
+    }
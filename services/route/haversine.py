@@ -1,6 +1,8 @@
 import math
 from typing import List
 
+import numpy as np
+
 
 def haversine(coord1: List[float], coord2: List[float]) -> float:
     """Calculate distance between two coordinates (in km)"""
@@ -11,3 +13,45 @@ def haversine(coord1: List[float], coord2: List[float]) -> float:
     dlon = math.radians(lon2 - lon1)
     a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
     return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def cumulative_distances(route: List[List[float]]) -> np.ndarray:
+    """
+    Calculate cumulative along-route distance at every point (in km)
+
+    Vectorized haversine over all consecutive point pairs, so a route is
+    walked once instead of once per consumer.
+
+    Args:
+        route: List of [lat, lon] coordinates
+
+    Returns:
+        Array with the distance from the route start to each point
+    """
+    points = np.radians(np.asarray(route, dtype=np.float64).reshape(-1, 2))
+    if len(points) < 2:
+        return np.zeros(len(points))
+    lat1, lon1 = points[:-1, 0], points[:-1, 1]
+    lat2, lon2 = points[1:, 0], points[1:, 1]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    steps = 6371 * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return np.concatenate(([0.0], np.cumsum(steps)))
+
+
+def pairwise_haversine(points_a: np.ndarray, points_b: np.ndarray) -> np.ndarray:
+    """
+    Great-circle distances between two sets of points (vectorized)
+
+    Args:
+        points_a: Array of [lat, lon] points, shape (A, 2)
+        points_b: Array of [lat, lon] points, shape (B, 2)
+
+    Returns:
+        Distance matrix in km with shape (A, B)
+    """
+    a = np.radians(np.asarray(points_a, dtype=float))[:, None, :]
+    b = np.radians(np.asarray(points_b, dtype=float))[None, :, :]
+    dlat = b[..., 0] - a[..., 0]
+    dlon = b[..., 1] - a[..., 1]
+    h = np.sin(dlat / 2) ** 2 + np.cos(a[..., 0]) * np.cos(b[..., 0]) * np.sin(dlon / 2) ** 2
+    return 6371 * 2 * np.arctan2(np.sqrt(h), np.sqrt(1 - h))
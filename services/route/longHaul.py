@@ -0,0 +1,310 @@
+# Standard library imports
+import logging
+from collections import deque
+from typing import Dict, Iterator, List, Tuple
+
+# Third-party imports
+import numpy as np
+
+# Local module imports
+from services.chargers.corridorChargers import fetch_corridor_chargers, filter_by_power
+from services.chargers.corridorPlanner import RESERVE_SOC, STOP_BUFFER, TARGET_SOC
+from services.route.getRoadRoute import get_road_route, get_road_route_overview
+from services.route.planningBudget import current_budget
+from services.route.routeGeometry import Route
+from services.soc.chargingCurve import charge_time_minutes
+
+logger = logging.getLogger(__name__)
+
+LEG_KM = 200  # Length of the legs the trip is fetched and planned in
+SIMPLIFY_KM = 1.0  # Spacing of the emitted geometry
+
+
+def fetch_legs(start: List[float], end: List[float],
+               leg_km: float = LEG_KM) -> Iterator[Tuple[float, Route, float]]:
+    """
+    Fetch a trip leg by leg
+
+    The trip is split on its simplified overview route, and each leg's full
+    geometry is only fetched when the consumer asks for it. Trip distances are
+    on the OSRM road distance: each leg gets the share of it that its part of
+    the overview covers, so the legs add up to the trip length the stop
+    planner starts from.
+
+    Args:
+        start: Starting coordinates [lat, lon]
+        end: Destination coordinates [lat, lon]
+        leg_km: Approximate leg length in km
+
+    Yields:
+        Tuples of (trip distance to the leg's start in km, leg route,
+        trip km per km of leg geometry)
+    """
+    overview = get_road_route_overview(start, end)
+    distances = overview["route"].distances
+    targets = np.arange(leg_km, distances[-1] - leg_km / 2, leg_km)
+    split_indices = np.unique(np.searchsorted(distances, targets))
+    waypoints = [[float(start[0]), float(start[1])]] + overview["route"].points[split_indices].tolist() \
+        + [[float(end[0]), float(end[1])]]
+    bounds = np.concatenate(([0.0], distances[split_indices], [distances[-1]]))
+    trip_km = bounds * (overview["distance"] / distances[-1]) if distances[-1] > 0 else bounds
+    logger.info(f"Long-haul trip of {overview['distance']:.0f} km split into {len(waypoints) - 1} legs")
+
+    for number, (leg_start, leg_end) in enumerate(zip(waypoints, waypoints[1:])):
+        budget = current_budget()
+        if budget is not None and budget.exhausted():
+            return
+        leg = get_road_route(leg_start, leg_end)
+        leg_trip_km = trip_km[number + 1] - trip_km[number]
+        yield float(trip_km[number]), leg, leg_trip_km / leg.length_km if leg.length_km > 0 else 1.0
+
+
+def corridor_legs(legs: Iterator[Tuple[float, Route, float]], min_kw: int,
+                  max_kw: int) -> Iterator[Tuple[float, Route, float, List[Dict]]]:
+    """
+    Add the power-filtered corridor chargers to each leg
+
+    Chargers are projected onto the leg and their along-route distance is
+    scaled and shifted to the whole trip. A charger near a leg boundary is kept only
+    with the first leg it was found on.
+
+    Args:
+        legs: Legs from fetch_legs
+        min_kw: Minimum charging power in kW
+        max_kw: Maximum charging power in kW
+
+    Yields:
+        Tuples of (leg offset in km, leg route, leg scale, chargers sorted by 'along_km')
+    """
+    previous = set()
+    for offset, leg, scale in legs:
+        chargers = [
+            {**charger, "along_km": charger["along_km"] * scale + offset}
+            for charger in filter_by_power(fetch_corridor_chargers(leg), min_kw, max_kw)
+            if tuple(charger["location"]) not in previous
+        ]
+        previous = {tuple(charger["location"]) for charger in chargers}
+        yield offset, leg, scale, chargers
+
+
+def simplify(route: Route, spacing_km: float = SIMPLIFY_KM) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Thin a route to about one point per spacing_km, keeping both ends
+
+    Args:
+        route: Road route
+        spacing_km: Distance between kept points in km
+
+    Returns:
+        Tuple of (kept [lat, lon] points, their along-route distances in km)
+    """
+    distances = route.distances
+    targets = np.arange(0, distances[-1], spacing_km)
+    indices = np.unique(np.append(np.searchsorted(distances, targets), len(route) - 1))
+    return route.points[indices].copy(), distances[indices].copy()
+
+
+class StreamingStopPlanner:
+    """
+    Greedy stop selection over chargers that arrive leg by leg
+
+    Makes the same choices as plan_corridor_stops: from the current
+    position, drive to the furthest charger reachable with the reserve left
+    and charge just enough to finish (at most to TARGET_SOC). A choice is
+    made as soon as every charger that could be reached has been seen, so
+    only chargers within one range of the current position are held.
+    """
+
+    def __init__(self, total_distance: float, initial_soc: float, battery_capacity: float,
+                 energy_consumption: float):
+        """
+        Start at the beginning of the trip
+
+        Args:
+            total_distance: Trip length in km
+            initial_soc: Initial state of charge as percentage
+            battery_capacity: Battery capacity in kWh
+            energy_consumption: Energy consumption in kWh per km
+        """
+        self.total_distance = total_distance
+        self.initial_soc = initial_soc
+        self.battery_capacity = battery_capacity
+        self.soc_per_km = energy_consumption / battery_capacity * 100
+        self.position = 0.0
+        self.soc = initial_soc
+        self.stops: List[Dict] = []
+        self.feasible = True
+        self._window: List[Dict] = []
+
+    @property
+    def done(self) -> bool:
+        """Whether the destination is reachable or no stop can be found"""
+        # Small tolerance so charging to exactly the needed SOC counts as enough
+        return not self.feasible or \
+            self.soc - (self.total_distance - self.position) * self.soc_per_km >= RESERVE_SOC - 1e-6
+
+    def add_chargers(self, chargers: List[Dict], seen_until: float) -> None:
+        """
+        Add the chargers of the next leg and choose every stop that is now determined
+
+        Args:
+            chargers: Chargers of the leg with trip 'along_km', in order
+            seen_until: Trip distance in km up to which all chargers have been added
+        """
+        self._window.extend(charger for charger in chargers if charger["along_km"] > self.position)
+        self._choose(seen_until)
+
+    def finish(self) -> None:
+        """Choose the remaining stops once every leg has been added"""
+        self._choose(float('inf'))
+
+    def _choose(self, seen_until: float) -> None:
+        while not self.done:
+            reach = self.position + (self.soc - RESERVE_SOC) / self.soc_per_km
+            # A charger not added yet could still be the furthest reachable one
+            if seen_until <= reach:
+                return
+
+            best = None
+            for charger in self._window:
+                arrival_soc = self.soc - (charger["along_km"] - self.position + charger["offset_km"]) * self.soc_per_km
+                if arrival_soc < RESERVE_SOC - 1e-6:
+                    continue
+                # Furthest reachable charger, higher power on ties
+                if best is None or (charger["along_km"], charger["power"]) > (best[0]["along_km"], best[0]["power"]):
+                    best = (charger, arrival_soc)
+
+            if best is None:
+                self.feasible = False
+                return
+
+            charger, arrival_soc = best
+            # Enough to get back to the route and finish with the reserve, capped at the target
+            needed = RESERVE_SOC + (charger["offset_km"] + self.total_distance - charger["along_km"]) * self.soc_per_km
+            departure_soc = max(min(needed, TARGET_SOC), arrival_soc)
+            self.stops.append({
+                "charger": charger,
+                "charge_time": charge_time_minutes(self.battery_capacity, charger["power"],
+                                                   arrival_soc, departure_soc),
+                "charge_amount": departure_soc - arrival_soc,
+                "rejoin_soc": departure_soc - charger["offset_km"] * self.soc_per_km
+            })
+
+            self.position = charger["along_km"]
+            self.soc = departure_soc - charger["offset_km"] * self.soc_per_km
+            self._window = [charger for charger in self._window if charger["along_km"] > self.position]
+
+    def soc_along(self, along: np.ndarray) -> np.ndarray:
+        """
+        SOC at trip distances covered by the stops chosen so far
+
+        Detours are taken off at the stop, as corridor_soc_profile does.
+
+        Args:
+            along: Trip distances in km, at most the current position unless done
+
+        Returns:
+            SOC values
+        """
+        stop_along = np.array([stop["charger"]["along_km"] for stop in self.stops])
+        rejoin_soc = np.array([stop["rejoin_soc"] for stop in self.stops])
+        last_stop = np.searchsorted(stop_along, along, side="left") - 1
+        soc = self.initial_soc - along * self.soc_per_km
+        if len(self.stops):
+            after = last_stop >= 0
+            soc[after] = rejoin_soc[last_stop[after]] - (along[after] - stop_along[last_stop[after]]) * self.soc_per_km
+        return np.maximum(soc, 0)
+
+
+def plan_long_haul(start: List[float], end: List[float], initial_soc: float, battery_capacity: float,
+                   energy_consumption: float, min_kw: int, max_kw: int, speed: float,
+                   leg_km: float = LEG_KM, spacing_km: float = SIMPLIFY_KM) -> Iterator[Dict]:
+    """
+    Plan a long trip as a pipeline of legs with bounded memory
+
+    Each leg is fetched, its chargers added to the stop planner and its
+    geometry thinned, after which the full geometry is dropped. A leg is
+    emitted as soon as no later stop can change the SOC along it, so only
+    the simplified geometry of the legs within one range of the last stop
+    is held, however long the trip.
+
+    Args:
+        start: Starting coordinates [lat, lon]
+        end: Destination coordinates [lat, lon]
+        initial_soc: Initial state of charge as percentage
+        battery_capacity: Battery capacity in kWh
+        energy_consumption: Energy consumption in kWh per km
+        min_kw: Minimum charging power in kW
+        max_kw: Maximum charging power in kW
+        speed: Average speed in km/h
+        leg_km: Approximate leg length in km
+        spacing_km: Distance between emitted points in km
+
+    Yields:
+        One {"type": "segment"} dictionary per leg, with its simplified
+        'points', 'soc' values and 'charging_stops', then one {"type": "summary"}
+        dictionary with feasibility and drive, charge and total time
+    """
+    # Same basis as the leg distances from fetch_legs
+    total_distance = get_road_route_overview(start, end)["distance"]
+    planner = StreamingStopPlanner(total_distance, initial_soc, battery_capacity, energy_consumption)
+    pending = deque()  # (leg number, start km, end km, points, along) waiting for their stops
+    emitted_stops = 0
+    distance = 0.0
+
+    def emit(final: bool) -> Iterator[Dict]:
+        nonlocal emitted_stops
+        while pending and (final or planner.done or pending[0][2] <= planner.position):
+            number, start_km, end_km, points, along = pending.popleft()
+            stops = []
+            for stop in planner.stops[emitted_stops:]:
+                charger = stop["charger"]
+                if charger["along_km"] > end_km:
+                    break
+                emitted_stops += 1
+                stops.append({
+                    "station": {"name": charger["name"], "location": charger["location"], "power": charger["power"]},
+                    "charge_time": stop["charge_time"],
+                    "charge_amount": stop["charge_amount"],
+                    "detour_time": 2 * charger["offset_km"] / speed * 60,
+                    "route_index": int(min(np.searchsorted(along, charger["along_km"]), len(along) - 1)),
+                    "along_km": charger["along_km"]
+                })
+            yield {
+                "type": "segment",
+                "leg": number,
+                "start_km": start_km,
+                "end_km": end_km,
+                "points": points.tolist(),
+                "soc": planner.soc_along(along).tolist(),
+                "charging_stops": stops
+            }
+
+    legs = corridor_legs(fetch_legs(start, end, leg_km), min_kw, max_kw)
+    for number, (offset, leg, scale, chargers) in enumerate(legs):
+        points, along = simplify(leg, spacing_km)
+        distance = offset + leg.length_km * scale
+        pending.append((number, offset, distance, points, along * scale + offset))
+        del leg, points, along
+        planner.add_chargers(chargers, distance)
+        yield from emit(final=False)
+
+    budget = current_budget()
+    budget_exhausted = budget is not None and budget.cut_short
+    if not budget_exhausted:
+        planner.finish()
+    yield from emit(final=True)
+
+    detour_distance = sum(2 * stop["charger"]["offset_km"] for stop in planner.stops)
+    drive_time = (distance + detour_distance) / speed * 60
+    charge_time = sum(stop["charge_time"] for stop in planner.stops)
+    yield {
+        "type": "summary",
+        "feasible": planner.feasible and not budget_exhausted,
+        "total_distance": distance,
+        "drive_time": drive_time,
+        "charge_time": charge_time,
+        "total_time": drive_time + charge_time + len(planner.stops) * STOP_BUFFER,
+        "stops": len(planner.stops),
+        "budget_exhausted": budget_exhausted
+    }
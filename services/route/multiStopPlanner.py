@@ -0,0 +1,445 @@
+# Standard library imports
+import logging
+import math
+from itertools import combinations
+from typing import Dict, List, Optional, Tuple
+
+# Third-party imports
+import numpy as np
+
+# Local module imports
+from services.chargers.corridorPlanner import RESERVE_SOC, STOP_BUFFER, TARGET_SOC
+from services.chargers.getChargingStations import get_charging_stations, prefetch_stations
+from services.route.getDistanceMatrix import get_distance_table
+from services.route.getRoadRoute import get_road_route_with_waypoints
+from services.route.haversine import pairwise_haversine
+from services.soc.chargingCurve import charge_time_minutes
+from services.soc.simulateSoc import simulate_soc
+from services.time.calculateTotalTime import calculate_total_time
+
+logger = logging.getLogger(__name__)
+
+MAX_STOPS = 20  # Mandatory stops per trip
+MAX_EXACT_STOPS = 8  # Visit order is exact (Held-Karp) up to this many stops, 2-opt beyond
+CHARGER_RADIUS = 20  # km searched around probe points for candidate chargers
+PROBE_SPACING = 40  # km between probe points on the lines between nearby waypoints
+NEAREST_WAYPOINTS = 3  # Lines are probed from every waypoint to this many nearest others
+CHARGERS_PER_PROBE = 3  # Most powerful chargers kept per probe point
+MAX_CHARGERS = 40  # Candidate chargers in the matrix
+CHARGERS_PER_LEG = 8  # Chargers with the smallest detour tried as the first stop of a leg
+MAX_LABELS = 4  # Time/SOC trade-offs kept per partial tour
+MAX_2OPT_PASSES = 10
+
+
+def plan_multi_stop_trip(start: List[float], end: List[float], stops: List[List[float]], initial_soc: float,
+                         battery_capacity: float, energy_consumption: float, min_kw: int, max_kw: int,
+                         speed: float) -> Dict:
+    """
+    Plan a trip through several mandatory stops in the fastest order, with charging
+
+    Durations and distances between all waypoints and candidate chargers come
+    from one OSRM table. The visit order and the charging stops between
+    consecutive waypoints are chosen together on those costs, and road
+    geometry is fetched once, for the final order only. The reported total
+    time uses the same average speed model as the other strategies, not the
+    OSRM durations the order was chosen on.
+
+    Args:
+        start: Starting coordinates [lat, lon]
+        end: Destination coordinates [lat, lon]
+        stops: Mandatory stops [lat, lon], in any order
+        initial_soc: Initial state of charge as percentage
+        battery_capacity: Battery capacity in kWh
+        energy_consumption: Energy consumption in kWh per km
+        min_kw: Minimum charging power in kW
+        max_kw: Maximum charging power in kW
+        speed: Average speed in km/h
+
+    Returns:
+        Dictionary with 'visit_order' (indices into stops), 'routes' and
+        'soc_values' per segment, 'charging_stops', 'feasible' (SOC stays
+        above the reserve), 'total_time' (minutes) and 'total_distance' (km)
+
+    Raises:
+        ValueError: If there are too many stops
+        Exception: If no order can be driven with the available chargers
+    """
+    if len(stops) > MAX_STOPS:
+        raise ValueError(f"At most {MAX_STOPS} stops are supported")
+
+    waypoints = [[float(point[0]), float(point[1])] for point in [start] + list(stops) + [end]]
+    chargers = _candidate_chargers(waypoints, min_kw, max_kw)
+    nodes = waypoints + [charger["location"] for charger in chargers]
+    table = get_distance_table(nodes, nodes)
+    logger.info(f"Multi-stop matrix of {len(waypoints)} waypoints and {len(chargers)} chargers")
+
+    solver = _TourSolver(np.nan_to_num(table["durations"], nan=np.inf),
+                         np.nan_to_num(table["distances"], nan=np.inf),
+                         len(waypoints), [charger["power"] for charger in chargers],
+                         battery_capacity, energy_consumption)
+    if len(stops) <= MAX_EXACT_STOPS:
+        label = solver.solve_exact(initial_soc)
+    else:
+        label = solver.solve_local_search(initial_soc)
+    if label is None:
+        raise Exception("No stop order can be driven with the chargers found")
+
+    # Waypoint and charger sequence of the chosen tour
+    legs = []
+    while label[3] is not None:
+        legs.append(label[3])
+        label = label[2]
+    legs.reverse()
+
+    sequence = [0]
+    departure_socs = {}
+    for _, destination, charger_stops in legs:
+        for node, departure_soc in charger_stops:
+            departure_socs[len(sequence)] = departure_soc
+            sequence.append(node)
+        sequence.append(destination)
+
+    return _build_trip(sequence, departure_socs, nodes, chargers, len(waypoints), initial_soc,
+                       battery_capacity, energy_consumption, speed)
+
+
+def _candidate_chargers(waypoints: List[List[float]], min_kw: int, max_kw: int) -> List[Dict]:
+    """
+    Power-filtered chargers around the waypoints and on the lines between nearby ones
+
+    Args:
+        waypoints: Start, stops and end [lat, lon]
+        min_kw: Minimum charging power in kW
+        max_kw: Maximum charging power in kW
+
+    Returns:
+        At most MAX_CHARGERS distinct chargers, most powerful first
+    """
+    points = np.array(waypoints)
+    straight = pairwise_haversine(points, points)
+    pairs = {(0, len(waypoints) - 1)}
+    for i in range(len(waypoints)):
+        for j in np.argsort(straight[i])[1:NEAREST_WAYPOINTS + 1]:
+            pairs.add((min(i, int(j)), max(i, int(j))))
+
+    probes = [tuple(point) for point in waypoints]
+    for i, j in sorted(pairs):
+        count = int(straight[i, j] // PROBE_SPACING)
+        for step in range(1, count + 1):
+            fraction = step / (count + 1)
+            probes.append(tuple(points[i] + (points[j] - points[i]) * fraction))
+    prefetch_stations(probes, CHARGER_RADIUS)
+
+    found = {}
+    for lat, lon in probes:
+        nearby = get_charging_stations(lat, lon, CHARGER_RADIUS, min_kw, max_kw)
+        for station in sorted(nearby, key=lambda station: -station["power"])[:CHARGERS_PER_PROBE]:
+            found.setdefault(tuple(station["location"]), station)
+    return sorted(found.values(), key=lambda station: -station["power"])[:MAX_CHARGERS]
+
+
+class _TourSolver:
+    """
+    Visit order and charging insertion on matrix costs
+
+    A partial tour is a label (time, soc, parent label, leg); a leg is
+    (from waypoint, to waypoint, [(charger node, departure soc)]). Labels of
+    the same visited set and last waypoint are kept on the Pareto front of
+    time and SOC, so a slower tour that arrives with more charge survives.
+    """
+
+    def __init__(self, durations: np.ndarray, distances: np.ndarray, num_waypoints: int,
+                 powers: List[float], battery_capacity: float, energy_consumption: float):
+        """
+        Precompute what every leg evaluation needs
+
+        Args:
+            durations: Minutes between all nodes (waypoints first, then chargers)
+            distances: Km between all nodes
+            num_waypoints: Number of waypoints (start, stops, end)
+            powers: Power of every charger node in kW
+            battery_capacity: Battery capacity in kWh
+            energy_consumption: Energy consumption in kWh per km
+        """
+        self.durations = durations
+        self.soc_used = distances * energy_consumption / battery_capacity * 100
+        self.num_waypoints = num_waypoints
+        self.powers = powers
+        self.battery_capacity = battery_capacity
+        self.chargers = np.arange(num_waypoints, len(durations))
+        self._options = {}
+        self._chains = {}
+
+        # Minutes to top up to TARGET_SOC at charger c2 after leaving charger c1 at TARGET_SOC
+        arrival = TARGET_SOC - self.soc_used[np.ix_(self.chargers, self.chargers)]
+        self._recharge = np.full(arrival.shape, np.inf)
+        for i, j in zip(*np.nonzero(arrival >= RESERVE_SOC)):
+            if i != j:
+                self._recharge[i, j] = charge_time_minutes(battery_capacity, powers[j], arrival[i, j], TARGET_SOC) \
+                    + STOP_BUFFER
+
+    def _chain(self, target: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Fastest way from every charger, leaving at TARGET_SOC, to a waypoint
+
+        Further chargers on the way are topped up to TARGET_SOC again.
+
+        Args:
+            target: Waypoint node
+
+        Returns:
+            Tuple of (minutes, arrival soc at the target, next charger index or -1) per charger
+        """
+        if target not in self._chains:
+            direct = np.where(TARGET_SOC - self.soc_used[self.chargers, target] >= RESERVE_SOC,
+                              self.durations[self.chargers, target], np.inf)
+            time = direct.copy()
+            arrival = TARGET_SOC - self.soc_used[self.chargers, target]
+            following = np.full(len(self.chargers), -1)
+            hop = self.durations[np.ix_(self.chargers, self.chargers)] + self._recharge
+            # Bellman-Ford; chains are short, so this settles in a few rounds
+            for _ in range(len(self.chargers)):
+                via = hop + time[None, :]
+                best = via.argmin(axis=1)
+                improved = via[np.arange(len(best)), best] < time - 1e-9
+                if not improved.any():
+                    break
+                time = np.where(improved, via[np.arange(len(best)), best], time)
+                following = np.where(improved, best, following)
+                arrival = np.where(improved, arrival[best], arrival)
+            self._chains[target] = (time, arrival, following)
+        return self._chains[target]
+
+    def leg_options(self, origin: int, target: int, soc: float) -> List[Tuple[float, float, List]]:
+        """
+        Ways to drive from one waypoint to another, on the time/arrival-SOC Pareto front
+
+        Args:
+            origin: Waypoint node to leave from
+            target: Waypoint node to arrive at
+            soc: SOC when leaving
+
+        Returns:
+            List of (minutes, arrival soc, [(charger node, departure soc)])
+        """
+        # Whole percents, rounded down so rounding never makes a leg look feasible
+        soc = math.floor(soc)
+        key = (origin, target, soc)
+        if key in self._options:
+            return self._options[key]
+
+        options = []
+        if soc - self.soc_used[origin, target] >= RESERVE_SOC:
+            options.append((self.durations[origin, target], soc - self.soc_used[origin, target], []))
+
+        # First charger: the ones adding the least driving time
+        detour = self.durations[origin, self.chargers] + self.durations[self.chargers, target]
+        chain_time, chain_arrival, following = self._chain(target)
+        for index in np.argsort(detour)[:CHARGERS_PER_LEG]:
+            node = int(self.chargers[index])
+            arrival_soc = soc - self.soc_used[origin, node]
+            if arrival_soc < RESERVE_SOC or not np.isfinite(detour[index]):
+                continue
+            to_charger = self.durations[origin, node]
+
+            # Just enough to arrive with the reserve
+            needed = RESERVE_SOC + self.soc_used[node, target]
+            if arrival_soc < needed <= 100:
+                options.append((
+                    to_charger + self._charge(index, arrival_soc, needed) + self.durations[node, target],
+                    RESERVE_SOC,
+                    [(node, needed)]
+                ))
+
+            # Up to TARGET_SOC, continuing through further chargers if needed
+            if arrival_soc < TARGET_SOC and np.isfinite(chain_time[index]):
+                stops = [(node, TARGET_SOC)]
+                step = following[index]
+                while step >= 0:
+                    stops.append((int(self.chargers[step]), TARGET_SOC))
+                    step = following[step]
+                options.append((
+                    to_charger + self._charge(index, arrival_soc, TARGET_SOC) + chain_time[index],
+                    float(chain_arrival[index]),
+                    stops
+                ))
+
+        self._options[key] = _pareto(options)
+        return self._options[key]
+
+    def _charge(self, index: int, arrival_soc: float, departure_soc: float) -> float:
+        """Minutes at a charger including the stop buffer"""
+        return charge_time_minutes(self.battery_capacity, self.powers[index], arrival_soc, departure_soc) + STOP_BUFFER
+
+    def _extend(self, labels: List[Tuple], target: int) -> List[Tuple]:
+        """Labels after driving each label's tour on to a waypoint"""
+        extended = []
+        for label in labels:
+            origin = label[3][1] if label[3] is not None else 0
+            for minutes, arrival_soc, charger_stops in self.leg_options(origin, target, label[1]):
+                extended.append((label[0] + minutes, arrival_soc, label, (origin, target, charger_stops)))
+        return _pareto(extended)
+
+    def solve_exact(self, initial_soc: float) -> Optional[Tuple]:
+        """
+        Fastest tour over every visit order (Held-Karp over visited sets)
+
+        Args:
+            initial_soc: SOC at the start
+
+        Returns:
+            Final label at the end waypoint, or None if no tour is feasible
+        """
+        num_stops = self.num_waypoints - 2
+        end = self.num_waypoints - 1
+        start_label = (0.0, float(initial_soc), None, None)
+        if num_stops == 0:
+            return _fastest(self._extend([start_label], end))
+
+        labels = {(1 << stop, stop): self._extend([start_label], stop + 1) for stop in range(num_stops)}
+        for size in range(2, num_stops + 1):
+            for subset in combinations(range(num_stops), size):
+                mask = sum(1 << stop for stop in subset)
+                for last in subset:
+                    previous = mask & ~(1 << last)
+                    candidates = []
+                    for before in subset:
+                        if before != last:
+                            candidates.extend(self._extend(labels.get((previous, before), []), last + 1))
+                    labels[(mask, last)] = _pareto(candidates)
+
+        full = (1 << num_stops) - 1
+        finals = []
+        for last in range(num_stops):
+            finals.extend(self._extend(labels.get((full, last), []), end))
+        return _fastest(finals)
+
+    def evaluate_order(self, order: List[int], initial_soc: float) -> Optional[Tuple]:
+        """
+        Fastest tour for a fixed visit order
+
+        Args:
+            order: Stop indices in visiting order
+            initial_soc: SOC at the start
+
+        Returns:
+            Final label at the end waypoint, or None if the order is infeasible
+        """
+        labels = [(0.0, float(initial_soc), None, None)]
+        for stop in order:
+            labels = self._extend(labels, stop + 1)
+            if not labels:
+                return None
+        return _fastest(self._extend(labels, self.num_waypoints - 1))
+
+    def solve_local_search(self, initial_soc: float) -> Optional[Tuple]:
+        """
+        Nearest-neighbour visit order improved by 2-opt on the full tour time
+
+        Args:
+            initial_soc: SOC at the start
+
+        Returns:
+            Final label at the end waypoint, or None if no order tried is feasible
+        """
+        num_stops = self.num_waypoints - 2
+        order = []
+        current = 0
+        remaining = set(range(num_stops))
+        while remaining:
+            nearest = min(remaining, key=lambda stop: self.durations[current, stop + 1])
+            order.append(nearest)
+            remaining.remove(nearest)
+            current = nearest + 1
+
+        best = self.evaluate_order(order, initial_soc)
+        for _ in range(MAX_2OPT_PASSES):
+            improved = False
+            for i in range(num_stops - 1):
+                for j in range(i + 1, num_stops):
+                    candidate = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+                    label = self.evaluate_order(candidate, initial_soc)
+                    if label is not None and (best is None or label[0] < best[0] - 1e-9):
+                        order, best, improved = candidate, label, True
+            if not improved:
+                break
+        return best
+
+
+def _pareto(labels: List[Tuple]) -> List[Tuple]:
+    """Labels not beaten on both time and SOC, fastest first, at most MAX_LABELS"""
+    front = []
+    for label in sorted(labels, key=lambda label: (label[0], -label[1])):
+        if not front or label[1] > front[-1][1] + 1e-9:
+            front.append(label)
+    if len(front) > MAX_LABELS:
+        # Keep the fastest and the best-charged, thinning the middle
+        keep = np.unique(np.linspace(0, len(front) - 1, MAX_LABELS).round().astype(int))
+        front = [front[index] for index in keep]
+    return front
+
+
+def _fastest(labels: List[Tuple]) -> Optional[Tuple]:
+    """Fastest label, or None"""
+    return min(labels, key=lambda label: label[0]) if labels else None
+
+
+def _build_trip(sequence: List[int], departure_socs: Dict[int, float], nodes: List[List[float]],
+                chargers: List[Dict], num_waypoints: int, initial_soc: float, battery_capacity: float,
+                energy_consumption: float, speed: float) -> Dict:
+    """
+    Fetch road geometry for the chosen sequence and simulate SOC along it
+
+    Args:
+        sequence: Node of every waypoint and charger in driving order
+        departure_socs: Planned departure SOC by position of each charger in the sequence
+        nodes: Coordinates of every node
+        chargers: Candidate chargers (nodes after the waypoints)
+        num_waypoints: Number of waypoints (start, stops, end)
+        initial_soc: Initial state of charge as percentage
+        battery_capacity: Battery capacity in kWh
+        energy_consumption: Energy consumption in kWh per km
+        speed: Average speed in km/h
+
+    Returns:
+        Trip dictionary as returned by plan_multi_stop_trip
+    """
+    route_data = get_road_route_with_waypoints([nodes[node] for node in sequence])
+    full_route = route_data["route"]
+    indices = route_data["waypoint_indices"]
+    if len(indices) != len(sequence) or indices[-1] != len(full_route) - 1:
+        raise Exception("OSRM route does not match the planned sequence")
+
+    routes = []
+    soc_values = []
+    charging_stops = []
+    soc = initial_soc
+    for position in range(len(sequence) - 1):
+        segment = full_route[indices[position]:indices[position + 1] + 1]
+        segment_soc = simulate_soc(segment, soc, battery_capacity, energy_consumption)
+        routes.append(segment)
+        soc_values.append(segment_soc)
+        soc = segment_soc[-1]
+
+        # Charge at chargers to the planned SOC (road distances may differ a little from the matrix)
+        if position + 1 in departure_socs:
+            charger = chargers[sequence[position + 1] - num_waypoints]
+            departure_soc = max(departure_socs[position + 1], soc)
+            charging_stops.append({
+                "station": charger,
+                "charge_time": charge_time_minutes(battery_capacity, charger["power"], soc, departure_soc),
+                "charge_amount": departure_soc - soc,
+                "route_index": len(segment) - 1
+            })
+            soc = departure_soc
+
+    # Stops charge to arrive with exactly the reserve, so allow for rounding
+    return {
+        "visit_order": [node - 1 for node in sequence if 0 < node < num_waypoints - 1],
+        "routes": routes,
+        "soc_values": soc_values,
+        "charging_stops": charging_stops,
+        "feasible": min(min(values) for values in soc_values) >= RESERVE_SOC - 1e-6,
+        "total_time": calculate_total_time(routes, charging_stops, speed),
+        "total_distance": route_data["distance"]
+    }
@@ -0,0 +1,75 @@
+# Standard library imports
+import logging
+from typing import Dict, List, Tuple
+
+# Local module imports
+from services.chargers.corridorChargers import fetch_corridor_chargers, filter_by_power
+from services.chargers.corridorPlanner import RESERVE_SOC, plan_corridor_stops
+from services.route.getRoadRoute import get_road_route
+from services.soc.simulateSoc import simulate_soc_grid
+
+logger = logging.getLogger(__name__)
+
+
+def run_parameter_sweep(start: List[float], end: List[float], battery_capacities: List[float],
+                        initial_socs: List[float], kw_filters: List[Tuple[int, int]],
+                        energy_consumption: float, speed: float) -> Dict:
+    """
+    Evaluate the corridor planner over a battery x initial SOC x kW-filter grid
+
+    Geometry and corridor chargers are fetched once; every grid cell is then
+    planned locally. SOC along the route is simulated for all battery and
+    initial-SOC combinations in one broadcast, and cells that reach the
+    destination with the reserve skip the planner entirely.
+
+    Args:
+        start: Starting coordinates [lat, lon]
+        end: Destination coordinates [lat, lon]
+        battery_capacities: Battery capacities in kWh
+        initial_socs: Initial SOC percentages
+        kw_filters: (min_kw, max_kw) charger power filters
+        energy_consumption: Energy consumption in kWh per km
+        speed: Average speed in km/h
+
+    Returns:
+        Dictionary with the route distance and one result row per grid cell
+    """
+    route = get_road_route(start, end)
+    distances = route.distances
+    total_distance = float(distances[-1])
+    corridor = fetch_corridor_chargers(route)
+
+    # (battery, initial SOC, point) SOC profiles for the whole grid
+    soc_grid = simulate_soc_grid(distances, initial_socs, battery_capacities, energy_consumption)
+    arrival_soc = soc_grid[:, :, -1]
+
+    filtered = {kw_filter: filter_by_power(corridor, *kw_filter) for kw_filter in kw_filters}
+
+    results = []
+    for b, battery_capacity in enumerate(battery_capacities):
+        for s, initial_soc in enumerate(initial_socs):
+            for min_kw, max_kw in kw_filters:
+                if arrival_soc[b, s] >= RESERVE_SOC:
+                    plan = {"feasible": True, "charging_stops": [], "charge_time": 0.0,
+                            "total_time": total_distance / speed * 60}
+                else:
+                    plan = plan_corridor_stops(total_distance, filtered[(min_kw, max_kw)], initial_soc,
+                                               battery_capacity, energy_consumption, speed)
+                results.append({
+                    "battery": battery_capacity,
+                    "soc": initial_soc,
+                    "min_kw": min_kw,
+                    "max_kw": max_kw,
+                    "feasible": plan["feasible"],
+                    "stops": len(plan["charging_stops"]),
+                    "charge_time": plan["charge_time"],
+                    "total_time": plan["total_time"],
+                    "arrival_soc_without_charging": float(arrival_soc[b, s])
+                })
+
+    logger.info(f"Sweep evaluated {len(results)} cells over {len(corridor)} corridor chargers")
+    return {
+        "distance_km": total_distance,
+        "corridor_chargers": len(corridor),
+        "results": results
+    }
@@ -0,0 +1,145 @@
+# Standard library imports
+import logging
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+# Third-party imports
+import numpy as np
+
+# Local module imports
+from services.cache.ttlCache import TTLCache
+from services.chargers.corridorChargers import fetch_corridor_chargers, fetch_corridor_chargers_async, filter_by_power
+from services.chargers.corridorPlanner import corridor_soc_profile, plan_corridor_stops_optimal
+from services.route.getRoadRoute import get_road_route, get_road_route_async
+from services.route.routeGeometry import Route
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_TTL = 30 * 60  # seconds a plan context is kept after it was last used
+MAX_CONTEXTS = 256
+
+# Kept per worker process; requests always carry start and end, so a worker
+# without the context builds it again
+_contexts = TTLCache(maxsize=MAX_CONTEXTS, ttl=CONTEXT_TTL)
+
+
+class PlanContext:
+    """
+    Everything about a trip that does not depend on the vehicle or the power filter
+
+    Holds the direct route and every charger along it (unfiltered, with the
+    power of each connection and its detour offset), so a plan for new
+    SOC, battery or kW settings is pure computation.
+    """
+
+    def __init__(self, start: List[float], end: List[float], route: Optional[Route] = None,
+                 corridor: Optional[List[Dict]] = None):
+        """
+        Fetch the direct route and the corridor chargers once
+
+        Args:
+            start: Starting coordinates [lat, lon]
+            end: Destination coordinates [lat, lon]
+            route: Direct route if already fetched
+            corridor: Corridor chargers of the route if already fetched
+        """
+        self.start = [float(start[0]), float(start[1])]
+        self.end = [float(end[0]), float(end[1])]
+        self.route: Route = route if route is not None else get_road_route(self.start, self.end)
+        self.corridor = corridor if corridor is not None else fetch_corridor_chargers(self.route)
+
+    def matches(self, start: List[float], end: List[float]) -> bool:
+        """Whether the context was built for the same start and destination"""
+        return np.allclose([self.start, self.end], [[float(c) for c in start], [float(c) for c in end]], atol=1e-5)
+
+    def plan(self, initial_soc: float, battery_capacity: float, energy_consumption: float,
+             min_kw: int, max_kw: int, speed: float) -> Dict:
+        """
+        Select the fastest charging stops for the given vehicle and power filter
+
+        Args:
+            initial_soc: Initial state of charge as percentage
+            battery_capacity: Battery capacity in kWh
+            energy_consumption: Energy consumption in kWh per km
+            min_kw: Minimum charging power in kW
+            max_kw: Maximum charging power in kW
+            speed: Average speed in km/h
+
+        Returns:
+            Corridor plan as returned by plan_corridor_stops
+        """
+        return plan_corridor_stops_optimal(self.route.length_km, filter_by_power(self.corridor, min_kw, max_kw),
+                                           initial_soc, battery_capacity, energy_consumption, speed)
+
+    def soc_profile(self, plan: Dict, initial_soc: float, battery_capacity: float,
+                    energy_consumption: float) -> List[float]:
+        """
+        SOC at every point of the direct route, with the plan's charging stops applied
+
+        Args:
+            plan: Plan from plan()
+            initial_soc: Initial state of charge as percentage
+            battery_capacity: Battery capacity in kWh
+            energy_consumption: Energy consumption in kWh per km
+
+        Returns:
+            List of SOC values along the route
+        """
+        return corridor_soc_profile(self.route.distances, plan, self.corridor, initial_soc,
+                                    battery_capacity, energy_consumption)
+
+
+def create_context(start: List[float], end: List[float]) -> Tuple[str, PlanContext]:
+    """
+    Build and store a plan context for a trip
+
+    Args:
+        start: Starting coordinates [lat, lon]
+        end: Destination coordinates [lat, lon]
+
+    Returns:
+        Tuple of the new context id and the context
+    """
+    return _store(PlanContext(start, end))
+
+
+async def create_context_async(start: List[float], end: List[float]) -> Tuple[str, PlanContext]:
+    """
+    Build and store a plan context for a trip without blocking the event loop
+
+    Args:
+        start: Starting coordinates [lat, lon]
+        end: Destination coordinates [lat, lon]
+
+    Returns:
+        Tuple of the new context id and the context
+    """
+    route = await get_road_route_async([float(start[0]), float(start[1])], [float(end[0]), float(end[1])])
+    corridor = await fetch_corridor_chargers_async(route)
+    return _store(PlanContext(start, end, route, corridor))
+
+
+def _store(context: PlanContext) -> Tuple[str, PlanContext]:
+    """Store a new context under a fresh id"""
+    context_id = uuid.uuid4().hex
+    _contexts.set(context_id, context)
+    logger.info(f"Created plan context {context_id} with {len(context.corridor)} corridor chargers")
+    return context_id, context
+
+
+def get_context(context_id: Optional[str]) -> Optional[PlanContext]:
+    """
+    Look up a plan context, extending its lifetime
+
+    Args:
+        context_id: Id returned by create_context
+
+    Returns:
+        The context, or None if unknown or expired
+    """
+    if not context_id:
+        return None
+    context = _contexts.get(context_id)
+    if context is not None:
+        _contexts.set(context_id, context)
+    return context
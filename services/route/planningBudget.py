@@ -0,0 +1,121 @@
+# Standard library imports
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Budget of the request currently being planned (copied into worker threads
+# with contextvars.copy_context so parallel lookups are counted too)
+_active_budget: contextvars.ContextVar[Optional["PlanningBudget"]] = contextvars.ContextVar(
+    "active_budget", default=None
+)
+
+
+class PlanningBudget:
+    """
+    Wall-time and external-call budget for planning a single request
+
+    Solvers check the budget between steps; once it runs out they stop
+    searching and return the best feasible plan found so far.
+    """
+
+    def __init__(self, max_seconds: float, max_calls: int, parent: Optional["PlanningBudget"] = None):
+        """
+        Initialize the budget
+
+        Args:
+            max_seconds: Wall time allowed for planning in seconds
+            max_calls: Number of OSRM/OpenChargeMap requests allowed
+            parent: Budget this one was split from, which also counts its calls
+        """
+        self.max_seconds = max_seconds
+        self.max_calls = max_calls
+        self.parent = parent
+        self.started = time.monotonic()
+        self.calls = 0
+        self.cut_short = False  # Set once a solver stopped early because of the budget
+        self._lock = threading.Lock()
+
+    def record_call(self) -> None:
+        """Count one external request against the budget"""
+        with self._lock:
+            self.calls += 1
+        if self.parent is not None:
+            self.parent.record_call()
+
+    def child(self, shares: int = 1, max_seconds: Optional[float] = None) -> "PlanningBudget":
+        """
+        Separate budget for one of several planners running within this one
+
+        Each child stops on its own calls only, so a call-heavy planner
+        cannot use up what the others need or mark their plans cut short.
+
+        Args:
+            shares: Number of children the remaining calls are split between
+            max_seconds: Shorter wall time for the child, e.g. a deadline
+
+        Returns:
+            Budget with the time left (at most max_seconds) and an equal
+            share of the calls left
+        """
+        seconds = max(self.max_seconds - self.elapsed, 0.0)
+        if max_seconds is not None:
+            seconds = min(seconds, max_seconds)
+        return PlanningBudget(seconds, max(self.max_calls - self.calls, 0) // shares, parent=self)
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds spent since the budget was created"""
+        return time.monotonic() - self.started
+
+    def exhausted(self) -> bool:
+        """
+        Check whether the time or call budget has run out
+
+        Returns:
+            True if the solver should stop and return its best plan so far
+        """
+        if self.elapsed >= self.max_seconds or self.calls >= self.max_calls:
+            if not self.cut_short:
+                logger.warning(f"Planning budget exhausted after {self.elapsed:.1f}s and {self.calls} calls")
+            self.cut_short = True
+        return self.cut_short
+
+
+def current_budget() -> Optional[PlanningBudget]:
+    """
+    Get the budget of the request being planned
+
+    Returns:
+        Active PlanningBudget or None outside a budget scope
+    """
+    return _active_budget.get()
+
+
+@contextmanager
+def budget_scope(budget: PlanningBudget) -> Iterator[PlanningBudget]:
+    """
+    Make a budget the active one for the enclosed planning code
+
+    Args:
+        budget: Budget for the request
+
+    Yields:
+        The active budget
+    """
+    token = _active_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _active_budget.reset(token)
+
+
+def record_external_call() -> None:
+    """Count an OSRM/OpenChargeMap request against the active budget, if any"""
+    budget = _active_budget.get()
+    if budget is not None:
+        budget.record_call()
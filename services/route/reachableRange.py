@@ -0,0 +1,232 @@
+# Standard library imports
+import logging
+import math
+from typing import Dict, List
+
+# Third-party imports
+import numpy as np
+
+# Local module imports
+from services.chargers.getChargingStations import get_all_stations, prefetch_stations
+from services.route.getDistanceMatrix import get_distance_table
+from services.route.haversine import pairwise_haversine
+from services.soc.simulateSoc import soc_after_distance
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS = 6371  # km
+DEFAULT_CIRCUITY = 1.25  # Typical road distance / straight-line distance
+RESERVE_SOC = 10  # Minimum SOC when arriving at a charger
+CHARGE_TARGET_SOC = 80  # SOC after the optional charging stop
+NUM_BEARINGS = 72  # Polygon resolution (5 degrees)
+NUM_RINGS = 60  # Distance samples per bearing
+ROAD_SAMPLE_BEARINGS = 24  # Bearings sampled with OSRM for road circuity
+ROAD_SAMPLE_RINGS = 4
+CHARGER_PROBE_RINGS = (0.5, 0.9)  # Charger probe rings as fractions of the direct range
+
+
+def destination_points(origin: List[float], bearings: np.ndarray, distances: np.ndarray) -> np.ndarray:
+    """
+    Points at given bearings and distances from an origin (vectorized)
+
+    Args:
+        origin: Origin coordinates [lat, lon]
+        bearings: Array of bearings in degrees, shape (B,)
+        distances: Array of distances in km, shape (D,)
+
+    Returns:
+        Array of [lat, lon] points with shape (B, D, 2)
+    """
+    lat1 = np.radians(float(origin[0]))
+    lon1 = np.radians(float(origin[1]))
+    theta = np.radians(bearings)[:, None]
+    delta = (np.asarray(distances, dtype=float) / EARTH_RADIUS)[None, :]
+
+    lat2 = np.arcsin(np.sin(lat1) * np.cos(delta) + np.cos(lat1) * np.sin(delta) * np.cos(theta))
+    lon2 = lon1 + np.arctan2(np.sin(theta) * np.sin(delta) * np.cos(lat1),
+                             np.cos(delta) - np.sin(lat1) * np.sin(lat2))
+    return np.stack([np.degrees(lat2), (np.degrees(lon2) + 540) % 360 - 180], axis=-1)
+
+
+def bearings_to(origin: List[float], points: np.ndarray) -> np.ndarray:
+    """
+    Initial bearings from an origin to points (vectorized)
+
+    Args:
+        origin: Origin coordinates [lat, lon]
+        points: Array of [lat, lon] points, shape (N, 2)
+
+    Returns:
+        Array of bearings in degrees [0, 360), shape (N,)
+    """
+    lat1 = np.radians(float(origin[0]))
+    lat2 = np.radians(points[:, 0])
+    dlon = np.radians(points[:, 1] - float(origin[1]))
+    bearings = np.degrees(np.arctan2(np.sin(dlon) * np.cos(lat2),
+                                     np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)))
+    return bearings % 360
+
+
+def circuity_at(circuity: np.ndarray, bearings: np.ndarray) -> np.ndarray:
+    """
+    Circuity factor at arbitrary bearings, interpolated between the polygon bearings
+
+    Args:
+        circuity: Circuity factor for each of the NUM_BEARINGS bearings
+        bearings: Bearings in degrees
+
+    Returns:
+        Circuity factors, same shape as bearings
+    """
+    full_bearings = np.linspace(0, 360, NUM_BEARINGS, endpoint=False)
+    return np.interp(bearings, np.append(full_bearings, 360), np.append(circuity, circuity[0]))
+
+
+def road_circuity(origin: List[float], max_distance: float) -> np.ndarray:
+    """
+    Road/straight-line distance ratio per bearing from one OSRM one-to-many table
+
+    Args:
+        origin: Origin coordinates [lat, lon]
+        max_distance: Furthest straight-line distance to sample in km
+
+    Returns:
+        Circuity factor for each of the NUM_BEARINGS bearings
+    """
+    bearings = np.linspace(0, 360, ROAD_SAMPLE_BEARINGS, endpoint=False)
+    distances = np.linspace(max_distance / ROAD_SAMPLE_RINGS, max_distance, ROAD_SAMPLE_RINGS)
+    samples = destination_points(origin, bearings, distances)
+
+    table = get_distance_table([origin], samples.reshape(-1, 2).tolist())
+    ratios = table["distances"][0].reshape(len(bearings), len(distances)) / distances[None, :]
+
+    # Median per bearing ignores unroutable samples (sea, borders)
+    sampled = np.nanmedian(np.where(ratios >= 1, ratios, np.nan), axis=1)
+    sampled = np.where(np.isnan(sampled), np.nanmedian(sampled) if np.any(~np.isnan(sampled)) else DEFAULT_CIRCUITY,
+                       sampled)
+
+    # Interpolate to the full polygon resolution (wrapping around north)
+    full_bearings = np.linspace(0, 360, NUM_BEARINGS, endpoint=False)
+    return np.interp(full_bearings, np.append(bearings, 360), np.append(sampled, sampled[0]))
+
+
+def calculate_reachable_range(origin: List[float], initial_soc: float, battery_capacity: float,
+                              energy_consumption: float, soc_bands: List[float],
+                              include_charge: bool = False, min_kw: int = 50, max_kw: int = 350,
+                              use_road_costs: bool = False) -> Dict:
+    """
+    Compute the area reachable from an origin, as one polygon per arrival-SOC band
+
+    Destinations are evaluated on a polar grid with the same energy model as
+    simulate_soc. Road distance is estimated from straight-line distance with a
+    circuity factor, optionally calibrated per bearing from an OSRM table. The
+    same factors apply on the way via a charger: at the charger's bearing to
+    reach it, and at the destination's bearing from there.
+
+    Args:
+        origin: Origin coordinates [lat, lon]
+        initial_soc: Starting SOC percentage
+        battery_capacity: Battery capacity in kWh
+        energy_consumption: Energy consumption in kWh per km
+        soc_bands: Arrival SOC thresholds, one polygon per value
+        include_charge: Also count destinations reachable after one charging stop
+        min_kw: Minimum charging power in kW
+        max_kw: Maximum charging power in kW
+        use_road_costs: Calibrate circuity with OSRM instead of the default factor
+
+    Returns:
+        Dictionary with a polygon per band, the chargers considered and the circuity used
+    """
+    origin = [float(origin[0]), float(origin[1])]
+    max_direct = max(initial_soc - min(soc_bands), 0) / 100 * battery_capacity / energy_consumption
+    max_after_charge = (CHARGE_TARGET_SOC - min(soc_bands)) / 100 * battery_capacity / energy_consumption
+    max_reach = max_direct + (max_after_charge if include_charge else 0)
+
+    bearings = np.linspace(0, 360, NUM_BEARINGS, endpoint=False)
+    rings = np.linspace(0, max_reach, NUM_RINGS + 1)[1:]
+    grid = destination_points(origin, bearings, rings)  # (B, D, 2)
+
+    if use_road_costs and max_direct > 0:
+        circuity = road_circuity(origin, max_direct)
+    else:
+        circuity = np.full(NUM_BEARINGS, DEFAULT_CIRCUITY)
+
+    # Arrival SOC driving straight from the origin
+    soc_grid = soc_after_distance(rings[None, :] * circuity[:, None], initial_soc,
+                                  battery_capacity, energy_consumption)
+
+    chargers = []
+    if include_charge and max_direct > 0:
+        # Furthest straight-line distance a charger can be reached at, in any direction
+        chargers = find_reachable_chargers(origin, max_direct / circuity.min(), min_kw, max_kw)
+    if chargers:
+        locations = np.array([charger["location"] for charger in chargers], dtype=float)
+        soc_at_chargers = soc_after_distance(
+            pairwise_haversine([origin], locations)[0] * circuity_at(circuity, bearings_to(origin, locations)),
+            initial_soc, battery_capacity, energy_consumption
+        )
+        usable = soc_at_chargers >= RESERVE_SOC
+        if np.any(usable):
+            # Arrival SOC via each usable charger after charging to the target
+            via = pairwise_haversine(locations[usable], grid.reshape(-1, 2)) * np.repeat(circuity, len(rings))
+            soc_via = soc_after_distance(via, CHARGE_TARGET_SOC, battery_capacity, energy_consumption)
+            soc_grid = np.maximum(soc_grid, soc_via.max(axis=0).reshape(soc_grid.shape))
+
+    bands = []
+    for band in sorted(soc_bands, reverse=True):
+        # Arriving with exactly the band's SOC counts, as the band is "at least" that SOC
+        reachable = soc_grid >= band
+        # Furthest reachable ring per bearing gives a star-shaped polygon
+        furthest = np.where(reachable.any(axis=1), NUM_RINGS - 1 - np.argmax(reachable[:, ::-1], axis=1), -1)
+        polygon = [grid[b, d].tolist() if d >= 0 else origin for b, d in enumerate(furthest)]
+        bands.append({
+            "soc": band,
+            "polygon": polygon,
+            "max_distance_km": float(rings[furthest.max()]) if furthest.max() >= 0 else 0.0
+        })
+
+    return {
+        "bands": bands,
+        "chargers": chargers,
+        "circuity": circuity.tolist()
+    }
+
+
+def find_reachable_chargers(origin: List[float], radius: float, min_kw: int, max_kw: int,
+                            probe_radius: float = 15) -> List[Dict]:
+    """
+    Sample chargers within a straight-line radius around an origin
+
+    Probes are placed on CHARGER_PROBE_RINGS, close enough along each ring
+    that their search circles overlap, and every matching station around a
+    probe is kept. The tiles are loaded concurrently through the tiled
+    charger cache, so repeated range queries in the same area are free.
+
+    Args:
+        origin: Origin coordinates [lat, lon]
+        radius: Straight-line radius in km
+        min_kw: Minimum charging power in kW
+        max_kw: Maximum charging power in kW
+        probe_radius: Search radius around each probe point in km
+
+    Returns:
+        List of distinct charging stations
+    """
+    probes = []
+    for fraction in CHARGER_PROBE_RINGS:
+        ring = radius * fraction
+        count = min(max(math.ceil(2 * math.pi * ring / (2 * probe_radius)), 8), NUM_BEARINGS)
+        probes.extend(destination_points(origin, np.linspace(0, 360, count, endpoint=False),
+                                         np.array([ring])).reshape(-1, 2).tolist())
+    prefetch_stations(probes, probe_radius)
+
+    chargers = {}
+    for lat, lon in probes:
+        for _, station in get_all_stations(lat, lon, probe_radius):
+            # Like get_charging_stations: the first connection within the power range
+            power = next((power for power in station["powers"] if int(min_kw) <= power <= int(max_kw)), None)
+            if power is not None:
+                chargers[tuple(station["location"])] = {"name": station["name"], "location": station["location"],
+                                                        "power": power}
+    logger.info(f"Found {len(chargers)} chargers for the reachable range from {len(probes)} probes")
+    return list(chargers.values())
@@ -0,0 +1,137 @@
+# Standard library imports
+from typing import Iterator, List, Optional, Sequence, Union
+
+# Third-party imports
+import numpy as np
+
+# Local module imports
+from services.route.haversine import cumulative_distances
+
+
+class Route:
+    """
+    Road geometry backed by one contiguous (N, 2) float64 array of [lat, lon] points
+
+    Routes are immutable, so they can be shared through the route caches.
+    Slicing returns a view on the same buffer, and the cumulative along-route
+    distance is computed once per route and carried over into slices.
+    Indexing a single point returns a [lat, lon] array row.
+    """
+
+    __slots__ = ("_points", "_distances")
+
+    def __init__(self, points: Union["Route", np.ndarray, Sequence[Sequence[float]]],
+                 distances: Optional[np.ndarray] = None):
+        if isinstance(points, Route):
+            distances = points._distances if distances is None else distances
+            points = points._points
+        owned = not isinstance(points, np.ndarray)
+        points = np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 2)
+        if points.flags.writeable:
+            # Never alias a caller's writable buffer; cached routes must not change under us
+            if not owned:
+                points = points.copy()
+            points.flags.writeable = False
+        self._points = points
+        self._distances = distances
+
+    @classmethod
+    def from_lonlat(cls, coordinates: Sequence[Sequence[float]]) -> "Route":
+        """
+        Build a route from GeoJSON [lon, lat] coordinates as returned by OSRM
+
+        Args:
+            coordinates: List of [lon, lat] pairs
+
+        Returns:
+            Route with the columns swapped to [lat, lon]
+        """
+        return cls(_frozen(np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)[:, ::-1]))
+
+    @classmethod
+    def concat(cls, routes: Sequence[Union["Route", Sequence[Sequence[float]]]]) -> "Route":
+        """
+        Join route pieces into one route with a single copy
+
+        Args:
+            routes: Route pieces in driving order; callers drop duplicated joint points
+
+        Returns:
+            Concatenated route
+        """
+        arrays = [route.points if isinstance(route, Route) else np.asarray(route, dtype=np.float64).reshape(-1, 2)
+                  for route in routes]
+        return cls(_frozen(np.concatenate(arrays)) if arrays else ())
+
+    @property
+    def points(self) -> np.ndarray:
+        """Read-only (N, 2) array of [lat, lon] points"""
+        return self._points
+
+    @property
+    def distances(self) -> np.ndarray:
+        """Cumulative along-route distance in km at every point (computed once)"""
+        if self._distances is None:
+            distances = cumulative_distances(self._points)
+            distances.flags.writeable = False
+            self._distances = distances
+        return self._distances
+
+    @property
+    def length_km(self) -> float:
+        """Total route length in km"""
+        return float(self.distances[-1]) if len(self._points) else 0.0
+
+    def tolist(self) -> List[List[float]]:
+        """Points as a list of [lat, lon] lists, for JSON and map rendering"""
+        return self._points.tolist()
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        return iter(self._points)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self._points[index]
+
+        start, stop, step = index.indices(len(self._points))
+        if step != 1:
+            return Route(self._points[index])
+
+        distances = None
+        if self._distances is not None:
+            # Re-base the parent's distances instead of walking the points again
+            distances = self._distances[start:max(start, stop)]
+            if len(distances):
+                distances = distances - distances[0]
+                distances.flags.writeable = False
+        return Route(self._points[start:max(start, stop)], distances)
+
+    def __reduce__(self):
+        # Pickled as points only (cache snapshots); distances are recomputed on demand
+        return Route, (self._points,)
+
+    def __repr__(self) -> str:
+        return f"Route({len(self._points)} points)"
+
+
+def _frozen(array: np.ndarray) -> np.ndarray:
+    """Contiguous read-only copy of a freshly built array"""
+    array = np.ascontiguousarray(array)
+    array.flags.writeable = False
+    return array
+
+
+def as_route(route: Union[Route, Sequence[Sequence[float]]]) -> Route:
+    """
+    Wrap a list of [lat, lon] points as a Route, passing Routes through unchanged
+
+    Args:
+        route: Route or list of [lat, lon] points
+
+    Returns:
+        Route instance
+    """
+    return route if isinstance(route, Route) else Route(route)
@@ -0,0 +1,202 @@
+# Standard library imports
+import logging
+import math
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Local module imports
+from services.cache.cacheSnapshot import register_cache
+from services.cache.ttlCache import TTLCache
+from services.chargers.geohash import covering_cells, encode
+from services.route.geometryStore import GeometryStore
+from services.route.haversine import haversine
+from services.route.routeGeometry import Route
+from services.soc.chargingCurve import charge_time_minutes
+from services.soc.simulateSoc import simulate_soc
+
+logger = logging.getLogger(__name__)
+
+SNAP_PRECISION = 4  # Geohash cells (~20 km) origins and destinations are snapped to
+MAX_OFFSET_KM = 15  # Furthest a new origin/destination may be from a solved plan's
+MAX_PLANS_PER_CELL = 4  # Solved plans kept per origin cell, destination cell and vehicle class
+SAME_TRIP_KM = 1.0  # A new plan this close at both ends replaces the stored one
+PLAN_TTL = 6 * 3600  # seconds, as long as charger tiles stay fresh
+MAX_PLAN_CELLS = 4096
+BATTERY_BUCKET = 10  # kWh
+SOC_BUCKET = 20  # %
+KM_PER_DEGREE = 111.0  # Length of a degree of latitude
+
+_plans = register_cache("solved_plans", TTLCache(maxsize=MAX_PLAN_CELLS, ttl=PLAN_TTL))
+_lock = threading.Lock()
+
+
+class SolvedPlan(NamedTuple):
+    """Charger sequence of a planned trip with the legs between its chargers"""
+    start: Tuple[float, float]
+    end: Tuple[float, float]
+    stations: List[Dict]
+    departure_socs: List[float]  # SOC leaving each charger
+    legs: List[Route]  # start -> first charger, charger -> charger ..., last charger -> end
+
+
+def vehicle_class(battery_capacity: float, initial_soc: float, min_kw: int, max_kw: int) -> Tuple:
+    """
+    Key of vehicles whose plans can seed each other
+
+    Args:
+        battery_capacity: Battery capacity in kWh
+        initial_soc: Initial state of charge as percentage
+        min_kw: Minimum charging power in kW
+        max_kw: Maximum charging power in kW
+
+    Returns:
+        Hashable vehicle class
+    """
+    return (round(battery_capacity / BATTERY_BUCKET), int(initial_soc // SOC_BUCKET), int(min_kw), int(max_kw))
+
+
+def remember_plan(start: List[str], end: List[str], vehicle: Tuple, charging_stops: List[Dict],
+                  routes: List[Route], soc_values: List[List[float]]) -> None:
+    """
+    Store a solved plan so trips between nearby places can start from it
+
+    Args:
+        start: Starting coordinates [lat, lon]
+        end: Destination coordinates [lat, lon]
+        vehicle: Vehicle class from vehicle_class()
+        charging_stops: Charging stops of the plan
+        routes: Route segments, one more than there are stops
+        soc_values: SOC along each segment
+    """
+    if not charging_stops or len(routes) != len(charging_stops) + 1:
+        return
+    plan = SolvedPlan(
+        start=(float(start[0]), float(start[1])),
+        end=(float(end[0]), float(end[1])),
+        stations=[stop["station"] for stop in charging_stops],
+        departure_socs=[segment_soc[0] for segment_soc in soc_values[1:]],
+        legs=list(routes)
+    )
+    key = (encode(*plan.start, SNAP_PRECISION), encode(*plan.end, SNAP_PRECISION), vehicle)
+
+    with _lock:
+        others = [stored for stored in _plans.get(key) or ()
+                  if haversine(stored.start, plan.start) >= SAME_TRIP_KM
+                  or haversine(stored.end, plan.end) >= SAME_TRIP_KM]
+        _plans.set(key, (plan,) + tuple(others[:MAX_PLANS_PER_CELL - 1]))
+
+
+def nearest_plan(start: List[str], end: List[str], vehicle: Tuple) -> Optional[SolvedPlan]:
+    """
+    Solved plan of the same vehicle class whose endpoints are closest to a trip's
+
+    Args:
+        start: Starting coordinates [lat, lon]
+        end: Destination coordinates [lat, lon]
+        vehicle: Vehicle class from vehicle_class()
+
+    Returns:
+        The plan with the smallest combined endpoint offset within MAX_OFFSET_KM
+        at both ends, or None
+    """
+    start = (float(start[0]), float(start[1]))
+    end = (float(end[0]), float(end[1]))
+    best, best_offset = None, float('inf')
+    for origin_cell in _nearby_cells(start):
+        for destination_cell in _nearby_cells(end):
+            for plan in _plans.get((origin_cell, destination_cell, vehicle)) or ():
+                start_offset, end_offset = haversine(start, plan.start), haversine(end, plan.end)
+                if start_offset <= MAX_OFFSET_KM and end_offset <= MAX_OFFSET_KM \
+                        and start_offset + end_offset < best_offset:
+                    best, best_offset = plan, start_offset + end_offset
+    return best
+
+
+def _nearby_cells(point: Tuple[float, float]) -> List[str]:
+    """Snapping cells within MAX_OFFSET_KM of a point"""
+    lat_radius = MAX_OFFSET_KM / KM_PER_DEGREE
+    lon_radius = lat_radius / max(math.cos(math.radians(point[0])), 0.01)
+    return covering_cells(point[0] - lat_radius, point[1] - lon_radius,
+                          point[0] + lat_radius, point[1] + lon_radius, SNAP_PRECISION)
+
+
+def warm_start_plan(start: List[str], end: List[str], vehicle: Tuple, initial_soc: float,
+                    battery_capacity: float, energy_consumption: float,
+                    geometry: GeometryStore) -> Optional[Dict]:
+    """
+    Plan a trip on the charger sequence of the nearest solved plan
+
+    Only the legs from the start to the first charger and from the last
+    charger to the destination are routed; the legs between chargers are
+    reused. Every leg's SOC is validated, and the last charge is raised if
+    the new final leg needs it.
+
+    Args:
+        start: Starting coordinates [lat, lon]
+        end: Destination coordinates [lat, lon]
+        vehicle: Vehicle class from vehicle_class()
+        initial_soc: Initial state of charge as percentage
+        battery_capacity: Battery capacity in kWh
+        energy_consumption: Energy consumption in kWh per km
+        geometry: Geometry store of the request
+
+    Returns:
+        Dictionary with routes, soc_values and charging_stops, or None if no
+        solved plan is near enough or it does not work for this trip
+    """
+    plan = nearest_plan(start, end, vehicle)
+    if plan is None:
+        return None
+    start = [float(start[0]), float(start[1])]
+    end = [float(end[0]), float(end[1])]
+
+    first_leg = geometry.get_route(start, plan.stations[0]["location"])
+    last_leg = geometry.get_route(plan.stations[-1]["location"], end)
+
+    # A new endpoint beyond the first/last charger would mean driving back to it
+    for new_leg, stored_leg, offset in ((first_leg, plan.legs[0], haversine(start, plan.start)),
+                                        (last_leg, plan.legs[-1], haversine(end, plan.end))):
+        if new_leg.length_km > stored_leg.length_km + 2 * offset:
+            logger.info("Nearest solved plan does not fit the trip, planning from scratch")
+            return None
+
+    legs = [first_leg] + plan.legs[1:-1] + [last_leg]
+    routes = []
+    soc_values = []
+    charging_stops = []
+    soc = initial_soc
+    for index, leg in enumerate(legs):
+        leg_soc = simulate_soc(leg, soc, battery_capacity, energy_consumption)
+        if min(leg_soc) <= 10:  # 10% safety buffer
+            logger.info("Nearest solved plan is not feasible for this trip, planning from scratch")
+            return None
+        routes.append(leg)
+        soc_values.append(leg_soc)
+        if index == len(plan.stations):
+            break
+
+        # Leave with the stored plan's charge, adding at least 10%, and enough
+        # (with a 15% buffer) for the new final leg after the last charger
+        arrival_soc = leg_soc[-1]
+        departure_soc = min(max(plan.departure_socs[index], arrival_soc + 10), 100)
+        if index == len(plan.stations) - 1:
+            soc_needed = (last_leg.length_km * energy_consumption / battery_capacity) * 100
+            if departure_soc < soc_needed + 10:
+                departure_soc = min(soc_needed + 15, 100)
+
+        station = plan.stations[index]
+        charging_stops.append({
+            "station": station,
+            "charge_time": charge_time_minutes(battery_capacity, station["power"], arrival_soc, departure_soc),
+            "charge_amount": departure_soc - arrival_soc,
+            "route_index": len(leg) - 1
+        })
+        soc = departure_soc
+
+    logger.info(f"Warm-started plan with {len(charging_stops)} stops from a solved trip "
+                f"using {geometry.fetch_count} OSRM requests")
+    return {
+        "routes": routes,
+        "soc_values": soc_values,
+        "charging_stops": charging_stops
+    }
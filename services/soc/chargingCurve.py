@@ -0,0 +1,126 @@
+# Standard library imports
+from functools import lru_cache
+from typing import List, Tuple
+
+# Vehicle charge acceptance as a fraction of peak power, by SOC percentage.
+# Flat up to ~50%, tapering towards full as typical for Li-ion packs.
+DEFAULT_TAPER: Tuple[Tuple[float, float], ...] = (
+    (0, 1.0),
+    (50, 1.0),
+    (60, 0.85),
+    (70, 0.7),
+    (80, 0.5),
+    (90, 0.25),
+    (100, 0.1),
+)
+
+# Peak charging power the vehicle accepts, as a C-rate of the pack (kW per kWh)
+DEFAULT_PEAK_C_RATE = 2.0
+
+# SOC resolution of the precomputed tables in percent
+SOC_STEP = 0.5
+
+
+class ChargingCurve:
+    """
+    Precomputed cumulative charge-time table for one vehicle/charger pair
+
+    The table holds the minutes needed to charge from 0% to every SOC step,
+    so the time between any two SOC values is the difference of two lookups.
+    """
+
+    def __init__(self, battery_capacity: float, charger_power: float,
+                 peak_c_rate: float = DEFAULT_PEAK_C_RATE,
+                 taper: Tuple[Tuple[float, float], ...] = DEFAULT_TAPER):
+        """
+        Build the cumulative time-vs-SOC table
+
+        Args:
+            battery_capacity: Battery capacity in kWh
+            charger_power: Charger power in kW
+            peak_c_rate: Peak vehicle charging power as a multiple of the capacity
+            taper: (SOC, fraction of peak power) points describing the taper
+        """
+        self.battery_capacity = battery_capacity
+        self.charger_power = charger_power
+        self.peak_power = min(charger_power, battery_capacity * peak_c_rate)
+
+        steps = int(round(100 / SOC_STEP))
+        energy_per_step = battery_capacity * SOC_STEP / 100  # kWh
+
+        self.table: List[float] = [0.0]
+        for i in range(steps):
+            # Use the acceptance at the middle of the step
+            power = self.peak_power * _interpolate_taper(taper, (i + 0.5) * SOC_STEP)
+            self.table.append(self.table[-1] + energy_per_step / power * 60)
+
+    def minutes_to(self, soc: float) -> float:
+        """
+        Minutes needed to charge from 0% to the given SOC
+
+        Args:
+            soc: Target state of charge as percentage
+
+        Returns:
+            Cumulative charge time in minutes
+        """
+        soc = min(max(soc, 0.0), 100.0)
+        position = soc / SOC_STEP
+        index = min(int(position), len(self.table) - 2)
+        fraction = position - index
+        return self.table[index] + (self.table[index + 1] - self.table[index]) * fraction
+
+    def charge_time(self, from_soc: float, to_soc: float) -> float:
+        """
+        Minutes needed to charge between two SOC values
+
+        Args:
+            from_soc: Arrival state of charge as percentage
+            to_soc: Departure state of charge as percentage
+
+        Returns:
+            Charge time in minutes (0 if no charging is needed)
+        """
+        if to_soc <= from_soc:
+            return 0.0
+        return self.minutes_to(to_soc) - self.minutes_to(from_soc)
+
+
+def _interpolate_taper(taper: Tuple[Tuple[float, float], ...], soc: float) -> float:
+    """Linearly interpolate the acceptance fraction at a SOC"""
+    for (soc_a, frac_a), (soc_b, frac_b) in zip(taper, taper[1:]):
+        if soc <= soc_b:
+            return frac_a + (frac_b - frac_a) * (soc - soc_a) / (soc_b - soc_a)
+    return taper[-1][1]
+
+
+@lru_cache(maxsize=512)
+def get_charging_curve(battery_capacity: float, charger_power: float) -> ChargingCurve:
+    """
+    Get the (cached) charging curve for a vehicle/charger pair
+
+    Args:
+        battery_capacity: Battery capacity in kWh
+        charger_power: Charger power in kW
+
+    Returns:
+        ChargingCurve with a precomputed time table
+    """
+    return ChargingCurve(float(battery_capacity), float(charger_power))
+
+
+def charge_time_minutes(battery_capacity: float, charger_power: float,
+                        from_soc: float, to_soc: float) -> float:
+    """
+    Charge time in minutes between two SOC values using the tapered curve
+
+    Args:
+        battery_capacity: Battery capacity in kWh
+        charger_power: Charger power in kW
+        from_soc: Arrival state of charge as percentage
+        to_soc: Departure state of charge as percentage
+
+    Returns:
+        Charge time in minutes
+    """
+    return get_charging_curve(battery_capacity, charger_power).charge_time(from_soc, to_soc)
@@ -1,6 +1,8 @@
 from typing import List
 
-from services.route.haversine import haversine
+import numpy as np
+
+from services.route.routeGeometry import as_route
 
 
 
@@ -9,7 +11,7 @@ def simulate_soc(route, initial_soc, battery_capacity, energy_consumption):
     Simulate State of Charge (SOC) along a route
     
     Args:
-        route: List of [lat, lon] coordinates
+        route: Route or list of [lat, lon] coordinates
         initial_soc: Starting SOC percentage (0-100)
         battery_capacity: Battery capacity in kWh
         energy_consumption: Energy consumption in kWh/km
@@ -17,23 +19,46 @@ def simulate_soc(route, initial_soc, battery_capacity, energy_consumption):
     Returns:
         List of SOC values corresponding to each point in the route
     """
-    soc_values = [initial_soc]
-    current_soc = initial_soc
-    
-    for i in range(len(route) - 1):
-        # Calculate distance between consecutive points
-        distance = haversine(route[i], route[i+1])
-        
-        # Calculate energy consumed
-        energy_used = distance * energy_consumption
-        
-        # Calculate SOC drop
-        soc_drop = (energy_used / battery_capacity) * 100
-        
-        # Update current SOC
-        current_soc -= soc_drop
-        current_soc = max(0, current_soc)  # SOC can't go below 0
-        
-        soc_values.append(current_soc)
-    
-    return soc_values
\ No newline at end of file
+    # SOC only decreases along a route, so clipping the cumulative drop at 0
+    # matches clipping step by step
+    return soc_after_distance(as_route(route).distances, initial_soc,
+                              battery_capacity, energy_consumption).tolist()
+
+
+def soc_after_distance(distances, initial_soc, battery_capacity, energy_consumption):
+    """
+    Vectorized SOC remaining after driving the given distances
+
+    Same energy model as simulate_soc, evaluated for any array of distances
+    (and broadcast over array-valued SOC, capacity or consumption).
+
+    Args:
+        distances: Array of driven distances in km
+        initial_soc: Starting SOC percentage (0-100)
+        battery_capacity: Battery capacity in kWh
+        energy_consumption: Energy consumption in kWh/km
+
+    Returns:
+        Array of SOC values, clipped at 0
+    """
+    energy_used = np.asarray(distances, dtype=float) * energy_consumption
+    return np.maximum(initial_soc - (energy_used / battery_capacity) * 100, 0)
+
+
+def simulate_soc_grid(distances, initial_socs, battery_capacities, energy_consumption):
+    """
+    Simulate SOC along a route for every battery/initial-SOC combination at once
+
+    Args:
+        distances: Cumulative along-route distances in km, shape (N,)
+        initial_socs: Starting SOC percentages, shape (S,)
+        battery_capacities: Battery capacities in kWh, shape (B,)
+        energy_consumption: Energy consumption in kWh/km
+
+    Returns:
+        Array of SOC values with shape (B, S, N)
+    """
+    distances = np.asarray(distances, dtype=float)[None, None, :]
+    initial_socs = np.asarray(initial_socs, dtype=float)[None, :, None]
+    battery_capacities = np.asarray(battery_capacities, dtype=float)[:, None, None]
+    return soc_after_distance(distances, initial_socs, battery_capacities, energy_consumption)
@@ -1,9 +1,8 @@
 from typing import Dict, List
 
-from services.route.haversine import haversine
+from services.route.routeGeometry import as_route
 
-def calculate_total_time(routes: List[List[List[float]]], charging_stops: List[Dict], speed: float) -> float:
-   def calculate_total_time(routes, charging_stops, avg_speed):
+def calculate_total_time(routes: List[List[List[float]]], charging_stops: List[Dict], avg_speed: float) -> float:
     """
     Calculate total journey time including driving and charging
     
@@ -18,7 +17,7 @@ def calculate_total_time(routes: List[List[List[float]]], charging_stops: List[D
     # Calculate driving time
     total_driving_time = 0
     for route in routes:
-        distance = sum(haversine(route[i], route[i+1]) for i in range(len(route)-1))
+        distance = as_route(route).length_km
         segment_time = (distance / avg_speed) * 60  # Convert to minutes
         total_driving_time += segment_time
     
@@ -0,0 +1,95 @@
+# Standard library imports
+import asyncio
+import logging
+import os
+import time
+import weakref
+from typing import Optional
+
+# Third-party imports
+import httpx
+
+# Local module imports
+from services.profiling.requestProfiler import record_upstream_call, record_upstream_wait
+from services.route.planningBudget import record_external_call
+from services.upstream.rateLimiter import MAX_RETRIES, backoff_after_throttling, reserve_token
+
+logger = logging.getLogger(__name__)
+# httpx logs every request at INFO
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+MAX_CONNECTIONS = int(os.environ.get('UPSTREAM_CONNECTIONS', 20))  # Open upstream connections per event loop
+DEFAULT_TIMEOUT = 10  # seconds
+
+# One pooled client per event loop; clients cannot be shared across loops
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+# Requests waiting for a connection queue here rather than in httpx's pool,
+# whose bookkeeping grows with (queued requests x connections)
+_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Shared HTTP client of the running event loop, created on first use
+
+    Returns:
+        Connection-pooling httpx.AsyncClient
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _clients[loop] = httpx.AsyncClient(
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS)
+        )
+        _slots[loop] = asyncio.Semaphore(MAX_CONNECTIONS)
+    return client
+
+
+async def close_async_client() -> None:
+    """Close the running event loop's shared client (on server shutdown)"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def async_throttled_get(backend: str, url: str, params: Optional[dict] = None,
+                              timeout: Optional[float] = None) -> httpx.Response:
+    """
+    GET an upstream URL within the backend's rate limit without blocking the event loop
+
+    Shares the token buckets of throttled_get, so sync and async callers in one
+    process stay within one limit together. Tokens are reserved rather than
+    waited for, so async callers are served in arrival order regardless of
+    their traffic class. Every attempt counts against the active planning budget.
+
+    Args:
+        backend: Backend name in BACKEND_LIMITS ('osrm' or 'ocm')
+        url: Request URL
+        params: Query parameters
+        timeout: Request timeout in seconds (default DEFAULT_TIMEOUT)
+
+    Returns:
+        The response (possibly still a 429 after the last retry)
+
+    Raises:
+        httpx.HTTPError: If no token was available in time, or the request failed
+    """
+    client = get_async_client()
+    slots = _slots[asyncio.get_running_loop()]
+    for attempt in range(MAX_RETRIES + 1):
+        delay = reserve_token(backend)
+        if delay is None:
+            raise httpx.HTTPError(f"Timed out waiting for the {backend} rate limit")
+        if delay > 0:
+            await asyncio.sleep(delay)
+        record_upstream_wait(backend, delay)
+        record_external_call()
+        async with slots:
+            sent = time.monotonic()
+            response = await client.get(url, params=params, timeout=timeout or DEFAULT_TIMEOUT)
+            record_upstream_call(backend, time.monotonic() - sent, response.status_code)
+        if response.status_code != 429 or attempt == MAX_RETRIES:
+            return response
+        backoff_after_throttling(backend, response.headers.get("Retry-After", ""), attempt)
+    return response
@@ -0,0 +1,219 @@
+# Standard library imports
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+# Third-party imports
+import requests
+
+# Local module imports
+from services.profiling.requestProfiler import record_upstream_call, record_upstream_wait
+from services.route.planningBudget import record_external_call
+
+logger = logging.getLogger(__name__)
+
+# Traffic classes; lower values are served first when a backend is saturated
+INTERACTIVE = 0
+BATCH = 1
+
+MAX_WAIT = {INTERACTIVE: 30, BATCH: 300}  # seconds a caller waits for a token before giving up
+MAX_RETRIES = 2  # Retries of a throttled (HTTP 429) request
+DEFAULT_BACKOFF = 1.0  # seconds to pause a backend after a 429 without Retry-After
+
+# Sustained requests per second and burst size per backend, overridable via env
+BACKEND_LIMITS = {
+    "osrm": (float(os.environ.get('OSRM_RATE', 10)), int(os.environ.get('OSRM_BURST', 30))),
+    "ocm": (float(os.environ.get('OCM_RATE', 20)), int(os.environ.get('OCM_BURST', 50))),
+}
+
+# Traffic class of the code currently running (copied into worker threads with the context)
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("upstream_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def priority_scope(priority: int) -> Iterator[None]:
+    """
+    Run the enclosed code's upstream requests in a traffic class
+
+    Args:
+        priority: INTERACTIVE or BATCH
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter whose waiters are served by priority
+
+    Tokens refill continuously at 'rate' per second up to 'burst'. When
+    callers have to wait, interactive callers get tokens before batch
+    callers, and callers of one class are served in arrival order.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        """
+        Initialize the bucket full
+
+        Args:
+            rate: Tokens added per second
+            burst: Maximum number of tokens
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiters = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority: int = INTERACTIVE, timeout: Optional[float] = None) -> bool:
+        """
+        Take one token, waiting for it if necessary
+
+        Args:
+            priority: INTERACTIVE or BATCH
+            timeout: Seconds to wait at most (None waits forever)
+
+        Returns:
+            True if a token was taken, False on timeout
+        """
+        entry = (priority, next(self._counter))
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    is_next = self._waiters[0] == entry
+                    if is_next and self._tokens >= 1 and now >= self._paused_until:
+                        self._tokens -= 1
+                        return True
+                    if deadline is not None and now >= deadline:
+                        return False
+                    # The next waiter sleeps until its token is due (or a pause ends);
+                    # the others until the waiter ahead of them leaves
+                    wait = max((1 - self._tokens) / self.rate, self._paused_until - now, 0.001) if is_next else None
+                    if deadline is not None:
+                        wait = deadline - now if wait is None else min(wait, deadline - now)
+                    self._condition.wait(wait)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._condition.notify_all()
+
+    def reserve(self, timeout: Optional[float] = None) -> Optional[float]:
+        """
+        Take one token now and return how long to wait before using it
+
+        For callers that cannot block a thread (asyncio); they sleep for the
+        returned delay themselves. Reservations are served in arrival order
+        and may run the bucket into debt, which later callers wait off.
+
+        Args:
+            timeout: Longest acceptable delay in seconds (None accepts any)
+
+        Returns:
+            Seconds to wait before sending, or None if that would exceed the timeout
+        """
+        with self._condition:
+            now = time.monotonic()
+            self._refill(now)
+            delay = max((1 - self._tokens) / self.rate, self._paused_until - now, 0.0)
+            if timeout is not None and delay > timeout:
+                return None
+            self._tokens -= 1
+            return delay
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stop handing out tokens for a while, after the backend signalled throttling
+
+        Args:
+            seconds: Pause length
+        """
+        with self._condition:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+_buckets: Dict[str, TokenBucket] = {name: TokenBucket(rate, burst) for name, (rate, burst) in BACKEND_LIMITS.items()}
+
+
+def throttled_get(backend: str, url: str, **kwargs) -> requests.Response:
+    """
+    GET an upstream URL within the backend's rate limit
+
+    Waits for a token in the current traffic class, and on HTTP 429 pauses
+    the backend (honouring Retry-After) and retries a bounded number of times.
+    Every attempt counts against the active planning budget.
+
+    Args:
+        backend: Backend name in BACKEND_LIMITS ('osrm' or 'ocm')
+        url: Request URL
+        **kwargs: Passed on to requests.get
+
+    Returns:
+        The response (possibly still a 429 after the last retry)
+
+    Raises:
+        requests.RequestException: If no token was available in time, or the request failed
+    """
+    bucket = _buckets[backend]
+    priority = _priority.get()
+    for attempt in range(MAX_RETRIES + 1):
+        waited = time.monotonic()
+        if not bucket.acquire(priority, MAX_WAIT[priority]):
+            raise requests.RequestException(f"Timed out waiting for the {backend} rate limit")
+        sent = time.monotonic()
+        record_upstream_wait(backend, sent - waited)
+        record_external_call()
+        response = requests.get(url, **kwargs)
+        record_upstream_call(backend, time.monotonic() - sent, response.status_code)
+        if response.status_code != 429 or attempt == MAX_RETRIES:
+            return response
+        backoff_after_throttling(backend, response.headers.get("Retry-After", ""), attempt)
+    return response
+
+
+def reserve_token(backend: str) -> Optional[float]:
+    """
+    Reserve a token of the backend for a caller that waits without blocking a thread
+
+    Args:
+        backend: Backend name in BACKEND_LIMITS
+
+    Returns:
+        Seconds to wait before sending, or None if longer than the current
+        traffic class may wait
+    """
+    return _buckets[backend].reserve(MAX_WAIT[_priority.get()])
+
+
+def backoff_after_throttling(backend: str, retry_after: str, attempt: int) -> None:
+    """
+    Pause a backend after it answered HTTP 429
+
+    Args:
+        backend: Backend name in BACKEND_LIMITS
+        retry_after: Value of the Retry-After header ('' if absent)
+        attempt: Number of the throttled attempt (0 for the first), lengthening the pause
+    """
+    backoff = float(retry_after) if retry_after.replace(".", "", 1).isdigit() else DEFAULT_BACKOFF
+    logger.warning(f"{backend} throttled the request, pausing {backoff:.1f}s")
+    _buckets[backend].pause(backoff * (attempt + 1))
@@ -0,0 +1,6 @@
+# Standard library imports
+import os
+import sys
+
+# The services package is imported from the repository root, as app.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,69 @@
+# Standard library imports
+import random
+
+# Local module imports
+from services.chargers.candidatePruning import branch_and_bound, lower_bound_road_km
+from services.route.getRoadRoute import _parse_road_route
+
+
+def _exhaustive(candidates, lower_bound, evaluate):
+    """Best (index, value) by evaluating every candidate, earliest on ties"""
+    best = None
+    for index, candidate in enumerate(candidates):
+        if lower_bound(candidate) is None:
+            continue
+        result = evaluate(candidate)
+        if result is not None and (best is None or result[0] < best[0]):
+            best = (result[0], index, result[1])
+    return None if best is None else (best[1], best[2])
+
+
+def test_branch_and_bound_matches_exhaustive_search():
+    for seed in range(200):
+        rng = random.Random(seed)
+        # Scores at or above their bound; a few candidates infeasible by bound or by evaluation
+        candidates = []
+        for number in range(rng.randint(0, 30)):
+            bound = rng.choice([None, rng.uniform(0, 100), rng.uniform(0, 100)])
+            score = None if bound is None or rng.random() < 0.1 else bound + rng.choice([0, rng.uniform(0, 50)])
+            candidates.append({"bound": bound, "score": score, "name": number})
+
+        def lower_bound(candidate):
+            return candidate["bound"]
+
+        def evaluate(candidate):
+            return None if candidate["score"] is None else (candidate["score"], candidate["name"])
+
+        assert branch_and_bound(candidates, lower_bound, evaluate) == _exhaustive(candidates, lower_bound, evaluate)
+
+
+def test_branch_and_bound_prunes_and_breaks_ties_like_min():
+    candidates = [(5, 5), (1, 3), (2, 3), (4, 9)]
+    evaluated = []
+
+    def evaluate(candidate):
+        evaluated.append(candidate)
+        return candidate[1], candidate
+
+    # Candidates with a bound above the best score are never evaluated
+    assert branch_and_bound(candidates, lambda candidate: candidate[0], evaluate) == (1, (1, 3))
+    assert sorted(evaluated) == [(1, 3), (2, 3)]
+
+
+def test_branch_and_bound_stops_when_asked():
+    candidates = [1, 2, 3]
+    assert branch_and_bound(candidates, float, lambda candidate: (candidate, candidate), max_evaluated=0) is None
+    assert branch_and_bound(candidates, float, lambda candidate: (candidate, candidate),
+                            should_stop=lambda: True) is None
+
+
+def test_lower_bound_holds_for_snapped_routes():
+    # OSRM snapped both ends ~2 km onto a road running east-west
+    start, end = [57.02, 12.0], [57.02, 12.3]
+    body = {
+        "routes": [{"geometry": {"coordinates": [[12.0, 57.0], [12.15, 57.0], [12.3, 57.0]]}}],
+        "waypoints": [{"distance": 2200.0}, {"distance": 2200.0}]
+    }
+    route = _parse_road_route(200, lambda: body, start, end)
+    assert route.length_km >= lower_bound_road_km(start, end)
+    assert route.points[0].tolist() == start and route.points[-1].tolist() == end
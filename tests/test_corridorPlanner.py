@@ -0,0 +1,55 @@
+# Standard library imports
+import random
+
+# Local module imports
+from services.chargers.corridorPlanner import (RESERVE_SOC, SOC_BUCKET, TARGET_SOC, plan_corridor_stops,
+                                               plan_corridor_stops_optimal)
+
+SPEED = 90
+
+
+def _random_trip(seed):
+    rng = random.Random(seed)
+    total_distance = rng.uniform(200, 900)
+    corridor = sorted(
+        ({"name": f"charger {number}", "location": [0.0, float(number)], "route_index": number,
+          "along_km": rng.uniform(0, total_distance), "offset_km": rng.uniform(0, 3),
+          "power": rng.choice([50, 150, 350])}
+         for number in range(rng.randint(3, 25))),
+        key=lambda charger: charger["along_km"]
+    )
+    return total_distance, corridor, rng.uniform(30, 100), rng.choice([50, 75, 100]), rng.uniform(0.15, 0.22)
+
+
+def test_optimal_plan_is_never_slower_than_greedy():
+    for seed in range(150):
+        total_distance, corridor, initial_soc, battery_capacity, energy_consumption = _random_trip(seed)
+        greedy = plan_corridor_stops(total_distance, corridor, initial_soc, battery_capacity,
+                                     energy_consumption, SPEED)
+        optimal = plan_corridor_stops_optimal(total_distance, corridor, initial_soc, battery_capacity,
+                                              energy_consumption, SPEED)
+        if not greedy["feasible"]:
+            continue
+        assert optimal["feasible"], seed
+        # Departures are rounded up to the SOC grid, which may cost a few seconds per stop
+        assert optimal["total_time"] <= greedy["total_time"] + 0.5, seed
+
+
+def test_optimal_plan_keeps_the_reserve():
+    for seed in range(150):
+        total_distance, corridor, initial_soc, battery_capacity, energy_consumption = _random_trip(seed)
+        plan = plan_corridor_stops_optimal(total_distance, corridor, initial_soc, battery_capacity,
+                                           energy_consumption, SPEED)
+        if not plan["feasible"]:
+            continue
+        soc_per_km = energy_consumption / battery_capacity * 100
+        by_name = {charger["name"]: charger for charger in corridor}
+        position, soc = 0.0, initial_soc
+        for stop in plan["charging_stops"]:
+            charger = by_name[stop["station"]["name"]]
+            arrival_soc = soc - (charger["along_km"] - position + charger["offset_km"]) * soc_per_km
+            assert arrival_soc >= RESERVE_SOC - 1e-5, seed
+            assert arrival_soc + stop["charge_amount"] < TARGET_SOC + SOC_BUCKET, seed
+            position = charger["along_km"]
+            soc = arrival_soc + stop["charge_amount"] - charger["offset_km"] * soc_per_km
+        assert soc - (total_distance - position) * soc_per_km >= RESERVE_SOC - 1e-5, seed
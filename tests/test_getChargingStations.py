@@ -0,0 +1,112 @@
+# Standard library imports
+import asyncio
+import random
+
+# Third-party imports
+import pytest
+
+# Local module imports
+from services.chargers import getChargingStations
+from services.chargers.geohash import bounding_box
+from services.route.haversine import haversine
+from services.route.planningBudget import PlanningBudget, budget_scope
+
+TILE = "u6sc"
+
+
+class FakeOpenChargeMap:
+    """OpenChargeMap stand-in answering tile queries nearest first, like the real API"""
+
+    def __init__(self, locations):
+        self.locations = locations
+        self.calls = 0
+
+    def pois(self, params):
+        self.calls += 1
+        center = (params["latitude"], params["longitude"])
+        nearest = sorted((haversine(center, location), location) for location in self.locations
+                         if haversine(center, location) <= params["distance"])
+        return [{"AddressInfo": {"Title": f"{lat:.6f},{lon:.6f}", "Latitude": lat, "Longitude": lon},
+                 "Connections": [{"PowerKW": 150}]}
+                for _, (lat, lon) in nearest[:params["maxresults"]]]
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+
+def _uniform(tile, count, seed=1):
+    rng = random.Random(seed)
+    min_lat, min_lon, max_lat, max_lon = bounding_box(tile)
+    return [(rng.uniform(min_lat, max_lat), rng.uniform(min_lon, max_lon)) for _ in range(count)]
+
+
+@pytest.fixture
+def ocm(monkeypatch):
+    fake = FakeOpenChargeMap([])
+
+    async def async_get(backend, url, params, timeout):
+        return FakeResponse(fake.pois(params))
+
+    monkeypatch.setattr(getChargingStations, "throttled_get",
+                        lambda backend, url, params, timeout: FakeResponse(fake.pois(params)))
+    monkeypatch.setattr(getChargingStations, "async_throttled_get", async_get)
+    getChargingStations._tile_cache.clear()
+    yield fake
+    getChargingStations._tile_cache.clear()
+
+
+def test_tile_below_the_limit_is_fetched_once(ocm):
+    ocm.locations = _uniform(TILE, 100)
+    assert len(getChargingStations._fetch_tile(TILE)) == 100
+    assert ocm.calls == 1
+
+
+def test_full_tile_is_split_until_every_station_is_found(ocm):
+    ocm.locations = _uniform(TILE, 2000)
+    stations = getChargingStations._fetch_tile(TILE)
+    assert sorted(tuple(station["location"]) for station in stations) == sorted(ocm.locations)
+    assert ocm.calls == 1 + 32
+
+
+def test_async_split_finds_the_same_stations(ocm):
+    ocm.locations = _uniform(TILE, 2000)
+    stations = asyncio.run(getChargingStations._fetch_tile_async(TILE))
+    assert sorted(tuple(station["location"]) for station in stations) == sorted(ocm.locations)
+
+
+def test_full_response_reaching_past_the_tile_is_not_split(ocm):
+    # The response is full of neighbours, but only beyond the tile's corners
+    min_lat, min_lon, max_lat, max_lon = bounding_box(TILE)
+    rng = random.Random(2)
+    ocm.locations = _uniform(TILE, 400) + [(max_lat + rng.uniform(0.15, 0.2), rng.uniform(min_lon, max_lon))
+                                           for _ in range(300)]
+    assert len(getChargingStations._fetch_tile(TILE)) == 400
+    assert ocm.calls == 1
+
+
+def test_split_stops_within_the_planning_budget(ocm):
+    ocm.locations = _uniform(TILE, 2000)
+    budget = PlanningBudget(60, 10)
+    with budget_scope(budget):
+        stations = getChargingStations._get_tile_stations(TILE)
+    # The nearest stations of the full response, without caching the partial tile
+    assert len(stations) == getChargingStations.TILE_MAX_RESULTS
+    assert ocm.calls == 1 and budget.cut_short
+    assert getChargingStations._tile_cache.get(TILE) is None
+
+
+def test_truncated_only_if_the_tile_can_still_be_split(ocm):
+    finest = TILE + "0" * (getChargingStations.MAX_SPLIT_PRECISION - len(TILE))
+    ocm.locations = _uniform(finest, 600)
+    pois = ocm.pois(getChargingStations._tile_params(finest))
+    assert len(pois) == getChargingStations.TILE_MAX_RESULTS
+    assert not getChargingStations._truncated(finest, pois)
+    assert getChargingStations._truncated(TILE, pois)
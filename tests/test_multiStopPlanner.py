@@ -0,0 +1,41 @@
+# Third-party imports
+import numpy as np
+import pytest
+
+# Local module imports
+from services.route import multiStopPlanner
+from services.route.routeGeometry import Route
+
+SPEED = 90
+
+
+def _straight_route(km):
+    """Route due north from the equator, about km long"""
+    return Route(np.column_stack([np.linspace(0, km / 111.195, 101), np.zeros(101)]))
+
+
+def _build(monkeypatch, km, initial_soc):
+    route = _straight_route(km)
+    monkeypatch.setattr(multiStopPlanner, "get_road_route_with_waypoints", lambda waypoints: {
+        "route": route,
+        "waypoint_indices": [0, len(route) - 1],
+        "distance": route.length_km,
+        "duration": 1.0  # OSRM's duration is not what the trip is timed with
+    })
+    # 100 kWh at 0.2 kWh/km: 1% SOC per 5 km
+    return multiStopPlanner._build_trip([0, 1], {}, [[0, 0], [km / 111.195, 0]], [], 2, initial_soc,
+                                        100, 0.2, SPEED)
+
+
+def test_trip_below_the_reserve_is_infeasible(monkeypatch):
+    # Arrives with ~5%: above empty, but below the 10% reserve
+    assert not _build(monkeypatch, 250, 55)["feasible"]
+
+
+def test_trip_keeping_the_reserve_is_feasible(monkeypatch):
+    assert _build(monkeypatch, 200, 55)["feasible"]
+
+
+def test_trip_is_timed_at_the_average_speed(monkeypatch):
+    trip = _build(monkeypatch, 200, 55)
+    assert trip["total_time"] == pytest.approx(trip["total_distance"] / SPEED * 60, rel=1e-3)
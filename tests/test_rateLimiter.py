@@ -0,0 +1,59 @@
+# Standard library imports
+import threading
+import time
+
+# Third-party imports
+import pytest
+
+# Local module imports
+from services.upstream.rateLimiter import BATCH, INTERACTIVE, TokenBucket
+
+
+def test_burst_is_available_at_once_then_callers_wait():
+    bucket = TokenBucket(rate=1, burst=3)
+    assert all(bucket.acquire(timeout=0) for _ in range(3))
+    assert not bucket.acquire(timeout=0.05)
+
+
+def test_tokens_refill_at_the_rate():
+    bucket = TokenBucket(rate=20, burst=1)
+    assert bucket.acquire(timeout=0)
+    started = time.monotonic()
+    assert bucket.acquire(timeout=1)
+    assert time.monotonic() - started == pytest.approx(0.05, abs=0.04)
+
+
+def test_interactive_waiters_are_served_before_batch_waiters():
+    bucket = TokenBucket(rate=10, burst=1)
+    assert bucket.acquire(timeout=0)
+    served = []
+
+    def wait(priority):
+        assert bucket.acquire(priority, timeout=2)
+        served.append(priority)
+
+    batch = threading.Thread(target=wait, args=(BATCH,))
+    batch.start()
+    time.sleep(0.02)  # The batch caller is queued first
+    interactive = threading.Thread(target=wait, args=(INTERACTIVE,))
+    interactive.start()
+    batch.join()
+    interactive.join()
+    assert served == [INTERACTIVE, BATCH]
+
+
+def test_reservations_run_the_bucket_into_debt():
+    bucket = TokenBucket(rate=10, burst=2)
+    delays = [bucket.reserve() for _ in range(4)]
+    assert delays[:2] == [0.0, 0.0]
+    assert delays[2] == pytest.approx(0.1, abs=0.02)
+    assert delays[3] == pytest.approx(0.2, abs=0.02)
+    # Too long a wait is refused without taking a token
+    assert bucket.reserve(timeout=0.1) is None
+
+
+def test_pause_empties_the_bucket():
+    bucket = TokenBucket(rate=100, burst=5)
+    bucket.pause(0.2)
+    assert not bucket.acquire(timeout=0.1)
+    assert bucket.reserve() >= 0.05
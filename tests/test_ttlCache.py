@@ -0,0 +1,70 @@
+# Third-party imports
+import pytest
+
+# Local module imports
+from services.cache import ttlCache
+from services.cache.ttlCache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic for the cache module"""
+    now = [1000.0]
+    monkeypatch.setattr(ttlCache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_entry_is_fresh_within_the_ttl(clock):
+    cache = TTLCache(maxsize=4, ttl=10, stale_ttl=20)
+    cache.set("key", "value")
+    clock[0] += 9
+    entry = cache.get_entry("key")
+    assert entry.value == "value" and not entry.stale and entry.age == pytest.approx(9)
+    assert cache.get("key") == "value"
+
+
+def test_expired_entry_is_served_stale_during_the_grace_period(clock):
+    cache = TTLCache(maxsize=4, ttl=10, stale_ttl=20)
+    cache.set("key", "value")
+    clock[0] += 15
+    entry = cache.get_entry("key")
+    assert entry.value == "value" and entry.stale
+    # Plain lookups only return fresh values
+    assert cache.get("key") is None
+
+
+def test_entry_is_dropped_after_the_grace_period(clock):
+    cache = TTLCache(maxsize=4, ttl=10, stale_ttl=20)
+    cache.set("key", "value")
+    clock[0] += 31
+    assert cache.get_entry("key") is None
+    assert cache.export() == []
+
+
+def test_refresh_restarts_the_ttl_and_keeps_the_hits(clock):
+    cache = TTLCache(maxsize=4, ttl=10, stale_ttl=20)
+    cache.set("key", "old")
+    cache.get_entry("key")
+    clock[0] += 15
+    cache.set("key", "new")
+    entry = cache.get_entry("key")
+    assert entry.value == "new" and not entry.stale and entry.hits == 2
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_restored_entries_keep_their_age(clock):
+    cache = TTLCache(maxsize=4, ttl=10, stale_ttl=20)
+    cache.set("key", "value")
+    clock[0] += 5
+    restored = TTLCache(maxsize=4, ttl=10, stale_ttl=20)
+    assert restored.restore(cache.export(), extra_age=6) == 1
+    assert restored.get_entry("key").stale
+    assert restored.restore(cache.export(), extra_age=30) == 0
@@ -0,0 +1,270 @@
+"""
+Load generator for the /calculate endpoint
+
+Starts the stub OSRM/OpenChargeMap servers, launches the app under
+gunicorn pointed at them (or targets an already running app with --url),
+then keeps --concurrency clients posting trips from a fixed mix across the
+routing strategies for --duration seconds. Reports throughput, latency
+percentiles and error rates overall and per strategy.
+
+Example:
+    python tools/loadtest/runLoadTest.py --workers 2 --concurrency 16 --duration 60 \\
+        --latency-ms 80 --error-rate 0.01 --jitter-km 2
+"""
+# Standard library imports
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+# Third-party imports
+import numpy as np
+import requests
+
+# Local module imports
+from stubServers import StubConfig, start_stub_servers
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+STRATEGIES = ["standard", "optimized_waypoints", "dijkstra", "time_efficient"]
+REQUEST_TIMEOUT = 300  # seconds
+
+# Trip mix: (start, end) city pairs of a few hundred km
+TRIPS = [
+    ((59.3293, 18.0686), (57.7089, 11.9746)),  # Stockholm - Gothenburg
+    ((59.3293, 18.0686), (55.6050, 13.0038)),  # Stockholm - Malmö
+    ((57.7089, 11.9746), (59.9139, 10.7522)),  # Gothenburg - Oslo
+    ((58.4108, 15.6214), (63.8258, 20.2630)),  # Linköping - Umeå
+    ((55.6761, 12.5683), (53.5511, 9.9937)),   # Copenhagen - Hamburg
+]
+
+
+def offset_point(point: Tuple[float, float], jitter_km: float, rng: random.Random) -> Tuple[float, float]:
+    """Move a point up to jitter_km in a random direction, so requests miss the caches"""
+    if jitter_km <= 0:
+        return point
+    distance = rng.uniform(0, jitter_km)
+    bearing = rng.uniform(0, 2 * math.pi)
+    return (point[0] + distance * math.cos(bearing) / 111.32,
+            point[1] + distance * math.sin(bearing) / (111.32 * math.cos(math.radians(point[0]))))
+
+
+def make_request(rng: random.Random, strategies: List[str], jitter_km: float) -> Dict:
+    """Random /calculate payload from the trip and vehicle mix"""
+    start, end = rng.choice(TRIPS)
+    start = offset_point(start, jitter_km, rng)
+    end = offset_point(end, jitter_km, rng)
+    return {
+        "start": f"{start[0]:.5f},{start[1]:.5f}",
+        "end": f"{end[0]:.5f},{end[1]:.5f}",
+        "battery": str(rng.choice([40, 60, 75, 100])),
+        "soc": str(rng.choice([50, 80, 100])),
+        "minKw": str(rng.choice([22, 50, 150])),
+        "maxKw": "350",
+        "routingStrategy": rng.choice(strategies)
+    }
+
+
+def start_app(port: int, workers: int, threads: int, osrm_url: str, ocm_url: str) -> subprocess.Popen:
+    """
+    Launch the app under gunicorn against the stub backends and wait until it is ready
+
+    Args:
+        port: Port to bind
+        workers: Gunicorn worker processes
+        threads: Threads per worker
+        osrm_url: Base URL of the OSRM stub
+        ocm_url: POI URL of the OpenChargeMap stub
+
+    Returns:
+        The gunicorn process
+    """
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        WEB_CONCURRENCY=str(workers),
+        GUNICORN_THREADS=str(threads),
+        OSRM_BASE_URL=osrm_url,
+        OCM_URL=ocm_url,
+        OPENCHARGE_KEY=os.environ.get("OPENCHARGE_KEY", "stub"),
+        CACHE_SNAPSHOT=""
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("gunicorn exited during startup")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/ready", timeout=1).status_code == 200:
+                return process
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("App did not become ready within 60 s")
+
+
+def run_load(url: str, concurrency: int, duration: float, strategies: List[str], jitter_km: float,
+             seed: int, warmup: float = 0) -> List[Dict]:
+    """
+    Drive /calculate from concurrent clients for a fixed time
+
+    Args:
+        url: Base URL of the app
+        concurrency: Number of clients with one request in flight each
+        duration: Seconds to measure
+        strategies: Strategy mix (uniform)
+        jitter_km: Random displacement of start and end points
+        seed: Seed of the request mix, per client
+        warmup: Seconds of load before measuring starts (not recorded)
+
+    Returns:
+        One record per measured request with strategy, status, latency and error
+    """
+    records = []
+    lock = threading.Lock()
+    started = time.monotonic()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    def client(index: int) -> None:
+        rng = random.Random(seed * 1000 + index)
+        session = requests.Session()
+        while time.monotonic() < stop_at:
+            payload = make_request(rng, strategies, jitter_km)
+            sent = time.monotonic()
+            error = None
+            try:
+                response = session.post(f"{url}/calculate", json=payload, timeout=REQUEST_TIMEOUT)
+                status = response.status_code
+                if status != 200:
+                    error = response.json().get("error", "") if response.headers.get(
+                        "Content-Type", "").startswith("application/json") else response.text[:200]
+            except requests.RequestException as e:
+                status, error = 0, str(e)
+            finished = time.monotonic()
+            if sent >= measure_from:
+                with lock:
+                    records.append({
+                        "strategy": payload["routingStrategy"],
+                        "status": status,
+                        "latency": finished - sent,
+                        "error": error
+                    })
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(client, i) for i in range(concurrency)]:
+            future.result()
+    return records
+
+
+def summarize(records: List[Dict], duration: float) -> Dict:
+    """
+    Throughput, latency percentiles and error rate of a set of request records
+
+    Args:
+        records: Records from run_load
+        duration: Measured seconds
+
+    Returns:
+        Summary overall and per strategy
+    """
+
+    def stats(subset: List[Dict]) -> Dict:
+        if not subset:
+            return {"requests": 0}
+        latencies = np.array([record["latency"] for record in subset])
+        errors = [record for record in subset if record["status"] != 200]
+        return {
+            "requests": len(subset),
+            "throughput_rps": len(subset) / duration,
+            "latency_ms": {
+                "p50": float(np.percentile(latencies, 50) * 1000),
+                "p95": float(np.percentile(latencies, 95) * 1000),
+                "p99": float(np.percentile(latencies, 99) * 1000),
+                "max": float(latencies.max() * 1000)
+            },
+            "error_rate": len(errors) / len(subset),
+            "errors_by_status": {str(status): sum(1 for e in errors if e["status"] == status)
+                                 for status in sorted({e["status"] for e in errors})}
+        }
+
+    strategies = sorted({record["strategy"] for record in records})
+    return {
+        "overall": stats(records),
+        "by_strategy": {strategy: stats([r for r in records if r["strategy"] == strategy])
+                        for strategy in strategies}
+    }
+
+
+def print_report(summary: Dict) -> None:
+    """Print a summary as a table"""
+    print(f"{'strategy':<22}{'requests':>9}{'rps':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}")
+    rows = [("overall", summary["overall"])] + list(summary["by_strategy"].items())
+    for name, row in rows:
+        if not row["requests"]:
+            continue
+        latency = row["latency_ms"]
+        print(f"{name:<22}{row['requests']:>9}{row['throughput_rps']:>8.2f}{latency['p50']:>10.0f}"
+              f"{latency['p95']:>10.0f}{latency['p99']:>10.0f}{row['error_rate']:>8.1%}")
+
+
+def main(argv: Optional[List[str]] = None) -> Dict:
+    parser = argparse.ArgumentParser(description="Load test /calculate against stub OSRM/OpenChargeMap servers")
+    parser.add_argument("--url", help="Target an already running app instead of starting gunicorn")
+    parser.add_argument("--port", type=int, default=8050, help="Port for the gunicorn app")
+    parser.add_argument("--workers", type=int, default=2, help="Gunicorn workers")
+    parser.add_argument("--threads", type=int, default=4, help="Threads per gunicorn worker")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Unmeasured seconds before measuring")
+    parser.add_argument("--strategies", default=",".join(STRATEGIES), help="Comma-separated strategy mix")
+    parser.add_argument("--jitter-km", type=float, default=0, help="Randomize start/end to defeat caching")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Stub backend latency")
+    parser.add_argument("--backend-jitter-ms", type=float, default=10, help="Stub backend latency jitter")
+    parser.add_argument("--error-rate", type=float, default=0, help="Share of stub requests failing with 429")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the summary to this file")
+    args = parser.parse_args(argv)
+
+    stub_config = StubConfig(args.latency_ms, args.backend_jitter_ms, args.error_rate, args.seed)
+    process = None
+    if args.url:
+        url = args.url.rstrip("/")
+    else:
+        osrm, ocm = start_stub_servers(0, 0, stub_config)
+        process = start_app(args.port, args.workers, args.threads,
+                            f"http://127.0.0.1:{osrm.server_port}",
+                            f"http://127.0.0.1:{ocm.server_port}/v3/poi/")
+        url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        records = run_load(url, args.concurrency, args.duration, args.strategies.split(","),
+                           args.jitter_km, args.seed, args.warmup)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    summary = summarize(records, args.duration)
+    summary["config"] = vars(args)
+    summary["backend"] = {"requests": stub_config.requests, "injected_errors": stub_config.errors}
+    print_report(summary)
+    print(f"backend requests: {stub_config.requests}, injected errors: {stub_config.errors}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+    return summary
+
+
+if __name__ == "__main__":
+    main()
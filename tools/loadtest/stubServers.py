@@ -0,0 +1,246 @@
+"""
+Stub OSRM and OpenChargeMap servers for load testing
+
+Both answer with synthetic but well-formed data: OSRM routes are straight
+lines sampled every ~1 km, tables use straight-line distance times a
+circuity factor, and OpenChargeMap returns a deterministic grid of
+stations. Every request waits for an injectable latency and fails with
+an injectable error rate (HTTP 429, as a throttling upstream would).
+
+Run standalone:
+    python tools/loadtest/stubServers.py --osrm-port 5001 --ocm-port 5002 --latency-ms 80 --error-rate 0.01
+"""
+# Standard library imports
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+EARTH_RADIUS = 6371  # km
+ROUTE_STEP = 1.0  # km between generated route points
+CIRCUITY = 1.25  # Road / straight-line distance of generated routes
+ROAD_SPEED = 80  # km/h of generated routes
+STATION_SPACING = 0.1  # degrees between stub charging stations
+STATION_POWERS = [22, 50, 150, 350]
+
+
+class StubConfig:
+    """Latency and failure injection shared by the stub handlers"""
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def delay_and_fail(self) -> bool:
+        """Sleep for the injected latency; return True if this request should fail"""
+        with self._lock:
+            self.requests += 1
+            delay = max(self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms), 0) / 1000
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        time.sleep(delay)
+        return fail
+
+
+def haversine(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    """Great-circle distance between two (lat, lon) points in km"""
+    dlat = math.radians(b[0] - a[0])
+    dlon = math.radians(b[1] - a[1])
+    h = math.sin(dlat / 2) ** 2 + math.cos(math.radians(a[0])) * math.cos(math.radians(b[0])) * math.sin(dlon / 2) ** 2
+    return EARTH_RADIUS * 2 * math.atan2(math.sqrt(h), math.sqrt(1 - h))
+
+
+def parse_coordinates(path: str) -> List[Tuple[float, float]]:
+    """
+    (lat, lon) points from the 'lon,lat;lon,lat' part of an OSRM path
+
+    Like OSRM, fewer than two coordinates is an invalid query, so a path cut
+    short by URL parsing fails loudly instead of routing a single point.
+    """
+    points = []
+    for pair in path.rsplit("/", 1)[-1].split(";"):
+        lon, lat = pair.split(",")
+        points.append((float(lat), float(lon)))
+    if len(points) < 2:
+        raise ValueError(f"Need at least 2 coordinates, got {len(points)}")
+    return points
+
+
+def osrm_route(points: List[Tuple[float, float]], alternatives: int) -> Dict:
+    """OSRM route response through the given waypoints"""
+
+    def build(waypoints: List[Tuple[float, float]], legs_from: List[Tuple[float, float]]) -> Dict:
+        coordinates = []
+        legs = []
+        distance = 0.0
+        for a, b in zip(waypoints, waypoints[1:]):
+            if a in legs_from:
+                legs.append({"annotation": {"distance": []}})
+            length = haversine(a, b)
+            steps = max(1, int(length / ROUTE_STEP))
+            for k in range(steps):
+                t = k / steps
+                coordinates.append([a[1] + (b[1] - a[1]) * t, a[0] + (b[0] - a[0]) * t])
+            # Like OSRM with annotations=true: one entry per geometry segment of the leg
+            legs[-1]["annotation"]["distance"].extend([length * CIRCUITY * 1000 / steps] * steps)
+            distance += length * CIRCUITY
+        coordinates.append([waypoints[-1][1], waypoints[-1][0]])
+        return {
+            "geometry": {"type": "LineString", "coordinates": coordinates},
+            "distance": distance * 1000,
+            "duration": distance / ROAD_SPEED * 3600,
+            "legs": legs
+        }
+
+    routes = [build(points, points[:-1])]
+    # Alternatives bend through a point off the straight line, one per side
+    for k in range(min(alternatives, 2)):
+        a, b = points[0], points[-1]
+        side = 1 if k == 0 else -1
+        offset = 0.15 * side
+        via = ((a[0] + b[0]) / 2 + offset * (b[1] - a[1]), (a[1] + b[1]) / 2 - offset * (b[0] - a[0]))
+        routes.append(build([a, via, b], [a]))
+    # The stub routes start and end exactly at the requested points
+    snapped = [{"location": [point[1], point[0]], "distance": 0.0} for point in points]
+    return {"code": "Ok", "routes": routes, "waypoints": snapped}
+
+
+def osrm_table(points: List[Tuple[float, float]], query: Dict[str, List[str]]) -> Dict:
+    """OSRM table response from straight-line distances"""
+    sources = [int(i) for i in query["sources"][0].split(";")] if "sources" in query else range(len(points))
+    destinations = ([int(i) for i in query["destinations"][0].split(";")]
+                    if "destinations" in query else range(len(points)))
+    distances = [[haversine(points[s], points[d]) * CIRCUITY for d in destinations] for s in sources]
+    return {
+        "code": "Ok",
+        "distances": [[km * 1000 for km in row] for row in distances],
+        "durations": [[km / ROAD_SPEED * 3600 for km in row] for row in distances]
+    }
+
+
+def ocm_stations(lat: float, lon: float, radius: float, max_results: int) -> List[Dict]:
+    """Stations on a fixed grid within a radius, nearest first, as OpenChargeMap POIs"""
+    span_lat = radius / 111.32
+    span_lon = radius / (111.32 * max(math.cos(math.radians(lat)), 0.01))
+    found = []
+    i = math.floor((lat - span_lat) / STATION_SPACING)
+    while i * STATION_SPACING <= lat + span_lat:
+        j = math.floor((lon - span_lon) / STATION_SPACING)
+        while j * STATION_SPACING <= lon + span_lon:
+            location = (round(i * STATION_SPACING, 6), round(j * STATION_SPACING, 6))
+            distance = haversine((lat, lon), location)
+            if distance <= radius:
+                found.append((distance, i, j, location))
+            j += 1
+        i += 1
+    found.sort()
+    return [
+        {
+            "AddressInfo": {"Title": f"Stub {i},{j}", "Latitude": location[0], "Longitude": location[1]},
+            "Connections": [{"PowerKW": STATION_POWERS[(i * 7 + j * 3) % len(STATION_POWERS)]}]
+        }
+        for _, i, j, location in found[:max_results]
+    ]
+
+
+def make_handler(kind: str, config: StubConfig):
+    """Request handler class for the 'osrm' or 'ocm' stub"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if config.delay_and_fail():
+                self._send(429, {"message": "Too Many Requests"})
+                return
+            url = urlsplit(self.path)
+            query = parse_qs(url.query)
+            try:
+                if kind == "osrm" and "/route/" in url.path:
+                    alternatives = query.get("alternatives", ["false"])[0]
+                    count = 0 if alternatives == "false" else (2 if alternatives == "true" else int(alternatives))
+                    body = osrm_route(parse_coordinates(url.path), count)
+                elif kind == "osrm" and "/table/" in url.path:
+                    body = osrm_table(parse_coordinates(url.path), query)
+                elif kind == "ocm":
+                    body = ocm_stations(float(query["latitude"][0]), float(query["longitude"][0]),
+                                        float(query.get("distance", ["20"])[0]),
+                                        int(query.get("maxresults", ["10"])[0]))
+                else:
+                    self._send(404, {"message": "Not found"})
+                    return
+            except (KeyError, ValueError) as e:
+                self._send(400, {"message": str(e)})
+                return
+            self._send(200, body)
+
+        def _send(self, status: int, body) -> None:
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class _StubServer(ThreadingHTTPServer):
+    """Threaded server with a listen backlog deep enough for hundreds of concurrent clients"""
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def start_stub_servers(osrm_port: int, ocm_port: int, config: StubConfig) -> List[ThreadingHTTPServer]:
+    """
+    Start both stub servers on background threads
+
+    Args:
+        osrm_port: Port of the OSRM stub (0 picks a free port)
+        ocm_port: Port of the OpenChargeMap stub (0 picks a free port)
+        config: Latency and failure injection
+
+    Returns:
+        The two running servers (OSRM, OpenChargeMap); read server_port for the ports
+    """
+    servers = []
+    for kind, port in (("osrm", osrm_port), ("ocm", ocm_port)):
+        server = _StubServer(("127.0.0.1", port), make_handler(kind, config))
+        threading.Thread(target=server.serve_forever, name=f"stub-{kind}", daemon=True).start()
+        servers.append(server)
+    return servers
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run stub OSRM and OpenChargeMap servers")
+    parser.add_argument("--osrm-port", type=int, default=5001)
+    parser.add_argument("--ocm-port", type=int, default=5002)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    stub_config = StubConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.seed)
+    osrm, ocm = start_stub_servers(args.osrm_port, args.ocm_port, stub_config)
+    print(f"OSRM_BASE_URL=http://127.0.0.1:{osrm.server_port}")
+    print(f"OCM_URL=http://127.0.0.1:{ocm.server_port}/v3/poi/")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass